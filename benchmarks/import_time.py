@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Start-up import-time benchmark and budget
+
+Imports each entry point in a fresh interpreter under ``python -X importtime``
+and reports the median import time plus the heaviest modules it pulled in.
+Modules the bare interpreter already loads (site, .pth hooks) are excluded,
+so the numbers are what the repo's own imports cost.
+
+With --check, each entry point is compared with benchmarks/import_budget.json:
+the median must stay under ``max_ms`` and none of its ``forbidden`` modules
+(cloud SDKs, HTTP clients) may be imported at all. The forbidden lists are
+the deterministic part of the budget; ``max_ms`` catches gradual creep.
+
+    python benchmarks/import_time.py --check
+    python benchmarks/import_time.py --entry runner --top 20
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = os.path.join(ROOT, 'scripts')
+BUDGET_FILE = os.path.join(ROOT, 'benchmarks', 'import_budget.json')
+
+ENTRY_POINTS = {
+    'runner': 'import ssl_check_runner',
+    'checker': 'import ssl_cert_checker',
+    'daemon': 'import ssl_check_daemon',
+    # The deployment-mode fast path: plan/manifest parsing plus the Terraform extractors
+    'change_scope': 'import change_scope, discovery.discover_tf',
+    'history': 'import result_history'
+}
+
+def import_times(statement):
+    """{module: (self µs, cumulative µs)} for one fresh interpreter running statement"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=SCRIPTS,
+                             env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{process.stderr.strip()}")
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def measure(statement, repeat, baseline):
+    """(median ms, modules of the last run) excluding modules in baseline"""
+    totals = []
+    for _ in range(repeat):
+        modules = {name: t for name, t in import_times(statement).items() if name not in baseline}
+        totals.append(sum(self_us for self_us, _ in modules.values()) / 1000)
+    return statistics.median(totals), modules
+
+def forbidden_imports(modules, forbidden):
+    """The forbidden packages that any imported module belongs to"""
+    return sorted(f for f in forbidden
+                  if any(name == f or name.startswith(f + '.') for name in modules))
+
+def load_budget():
+    with open(BUDGET_FILE) as f:
+        return json.load(f)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure start-up import time of each entry point')
+    parser.add_argument('--entry', action='append', choices=sorted(ENTRY_POINTS),
+                        help='Entry point to measure (repeatable, default: all)')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per entry point')
+    parser.add_argument('--top', type=int, default=8, help='Heaviest modules to list per entry point')
+    parser.add_argument('--check', action='store_true', help='Exit 1 if any entry point exceeds its budget')
+    parser.add_argument('--write-budget', action='store_true',
+                        help='Reset max_ms in the budget file to twice the measured medians')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    budget = load_budget() if args.check or args.write_budget else {}
+    baseline = set(import_times('pass'))
+    # Warm the bytecode cache so the first measured run is not also compiling
+    subprocess.run([sys.executable, '-m', 'compileall', '-q', SCRIPTS, os.path.join(ROOT, 'config.py')],
+                   stdout=subprocess.DEVNULL)
+
+    report, violations = {}, []
+    for entry in args.entry or list(ENTRY_POINTS):
+        median_ms, modules = measure(ENTRY_POINTS[entry], args.repeat, baseline)
+        heaviest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+        limits = budget.get(entry, {})
+        forbidden = forbidden_imports(modules, limits.get('forbidden', []))
+        report[entry] = {'median_ms': round(median_ms, 1), 'modules': len(modules),
+                         'heaviest': [(name, round(cumulative / 1000, 1)) for name, (_, cumulative) in heaviest],
+                         'forbidden': forbidden}
+        if args.check:
+            if limits.get('max_ms') is not None and median_ms > limits['max_ms']:
+                violations.append(f"{entry}: {median_ms:.1f}ms exceeds budget of {limits['max_ms']}ms")
+            if forbidden:
+                violations.append(f"{entry}: imports {', '.join(forbidden)} at start-up")
+        if args.write_budget:
+            budget.setdefault(entry, {})['max_ms'] = math.ceil(median_ms * 2)
+
+    if args.write_budget:
+        with open(BUDGET_FILE, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for entry, result in report.items():
+            print(f"{entry:<14} {result['median_ms']:>7.1f} ms  {result['modules']:>4} modules")
+            for name, cumulative_ms in result['heaviest']:
+                print(f"    {cumulative_ms:>7.1f} ms  {name}")
+
+    for violation in violations:
+        print(f"❌ {violation}", file=sys.stderr)
+    sys.exit(1 if violations else 0)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Probe throughput and tail latency benchmark
+
+Starts the local TLS farm, then drives the async checker and/or the full
+runner against it and reports hosts/sec, p50/p99 per-host latency, peak RSS
+and wall time. Runs fully offline on Linux:
+
+    python benchmarks/run_benchmark.py --listeners 2000 \\
+        --mix ok=0.9,slow=0.04,reset=0.03,blackhole=0.03 --latency-ms 20
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'scripts'))
+from tracing import load_trace
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def run_measured(command, cwd, env, ok_codes=(0,)):
+    """Run command to completion; returns (wall seconds, peak RSS MB, stdout).
+
+    Exits the benchmark when the command's exit code is not in ok_codes, so
+    a crashed run is never reported as a result row.
+    """
+    start = time.perf_counter()
+    # stderr goes to a file so a chatty process cannot block on a full pipe while stdout is read
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=stderr)
+        stdout = process.stdout.read()
+        # wait4 reports the peak RSS of the process and of any children it waited for
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode not in ok_codes:
+            stderr.seek(0)
+            sys.stderr.write(stderr.read().decode(errors='replace')[-2000:])
+    if process.returncode not in ok_codes:
+        sys.exit(f"❌ {os.path.basename(command[1])} exited with {process.returncode}")
+    return time.perf_counter() - start, usage.ru_maxrss / 1024, stdout
+
+def summarise(target, results, wall, rss, extra=None):
+    latencies = [r['probe_ms'] for r in results if r.get('probe_ms') is not None]
+    row = {
+        'target': target,
+        'hosts': len(results),
+        'errors': sum(1 for r in results if r.get('status') in ('ERROR', 'UNREACHABLE')),
+        'wall_s': round(wall, 2),
+        'hosts_per_s': round(len(results) / wall, 1) if wall else None,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'peak_rss_mb': round(rss, 1)
+    }
+    row.update(extra or {})
+    return row
+
+def bench_checker(hosts_file, args, workdir):
+    command = [sys.executable, os.path.join(ROOT, 'scripts', 'ssl_cert_checker.py'),
+               '--hosts-file', hosts_file, '--mode', 'async', '--resolve',
+               '--concurrency', str(args.concurrency), '--timeout', str(args.timeout)]
+    # The checker exits 1 when any certificate fails, which the farm always serves
+    wall, rss, stdout = run_measured(command, workdir, os.environ.copy(), ok_codes=(0, 1))
+    results = [json.loads(line) for line in stdout.decode().splitlines() if line.strip()]
+    with open(hosts_file) as f:
+        expected = sum(1 for line in f if line.strip())
+    if len(results) != expected:
+        # A crash also exits 1; it shows as missing results
+        sys.exit(f"❌ ssl_cert_checker.py returned {len(results)} of {expected} results")
+    return summarise('checker', results, wall, rss)
+
+def bench_runner(hosts_file, args, workdir):
+    env = dict(os.environ,
+               SSL_PROVIDERS='static',
+               STATIC_HOSTS_FILE=hosts_file,
+               PIPELINE_MODE='manual',
+               FAIL_ON_EXPIRY='false',
+               SSL_CHECK_CONCURRENCY=str(args.concurrency),
+               SSL_CHECK_TIMEOUT=str(args.timeout),
+               SSL_CACHE_PATH='',
+               INVENTORY_INDEX_PATH='',
+               SSL_TRACE_PATH=os.path.join(workdir, 'trace.jsonl'),
+               # The runner finds its dashboards and alerts in-process, so every sink is switched
+               # off here: nothing leaves the machine and no network time lands in wall_s
+               SLACK_WEBHOOK_URL='',
+               JIRA_AUTH_BASIC='',
+               PROMETHEUS_PUSHGATEWAY='',
+               PROMETHEUS_TEXTFILE='',
+               SSL_HISTORY_PATH='',
+               CLOUDWATCH_ENABLED='false')
+    # State files the runner still writes (alert state, export state) land in the scratch directory
+    wall, rss, _ = run_measured([sys.executable, os.path.join(ROOT, 'scripts', 'ssl_check_runner.py')],
+                                workdir, env)
+    with open(os.path.join(workdir, 'cert-results.json')) as f:
+        results = [json.loads(line) for line in f if line.strip()]
+    stages = {s['span']: s['duration_ms'] for s in load_trace(env['SSL_TRACE_PATH']) if s.get('span') != 'host'}
+    return summarise('runner', results, wall, rss, {'checks_s': round(stages.get('checks', 0) / 1000, 2)})
+
+def start_farm(args, hosts_file):
+    command = [sys.executable, os.path.join(ROOT, 'benchmarks', 'tls_farm.py'),
+               '--listeners', str(args.listeners), '--workers', str(args.workers),
+               '--mix', args.mix, '--latency-ms', str(args.latency_ms),
+               '--slow-delay', str(args.slow_delay), '--hosts-file', hosts_file]
+    farm = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    ready = farm.stdout.readline()
+    if not ready.startswith('READY'):
+        farm.kill()
+        sys.exit("TLS farm failed to start")
+    print(f"🏭 {ready.strip()}")
+    return farm
+
+def main():
+    parser = argparse.ArgumentParser(description='SSL checker benchmark against a local TLS farm')
+    parser.add_argument('--listeners', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--mix', default='ok=0.9,slow=0.04,reset=0.03,blackhole=0.03')
+    parser.add_argument('--latency-ms', type=float, default=10)
+    parser.add_argument('--slow-delay', type=float, default=3)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--timeout', type=int, default=5)
+    parser.add_argument('--targets', default='checker,runner', help='Comma-separated: checker, runner')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--json', metavar='FILE', help='Also write the result rows as JSON')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='ssl-bench-')
+    hosts_file = os.path.join(workdir, 'hosts.txt')
+    farm = start_farm(args, hosts_file)
+
+    benches = {'checker': bench_checker, 'runner': bench_runner}
+    rows = []
+    try:
+        for _ in range(args.repeat):
+            for target in args.targets.split(','):
+                row = benches[target](hosts_file, args, workdir)
+                rows.append(row)
+                print(json.dumps(row))
+    finally:
+        farm.send_signal(signal.SIGINT)
+        farm.wait(timeout=10)
+
+    print(f"\n{'target':<8} {'hosts':>6} {'errors':>6} {'wall_s':>7} {'hosts/s':>8} "
+          f"{'p50_ms':>7} {'p99_ms':>8} {'rss_mb':>7}")
+    for row in rows:
+        print(f"{row['target']:<8} {row['hosts']:>6} {row['errors']:>6} {row['wall_s']:>7} "
+              f"{row['hosts_per_s']:>8} {row['p50_ms'] or '-':>7} {row['p99_ms'] or '-':>8} {row['peak_rss_mb']:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Local TLS server farm for benchmarking the checker
+
+Serves N loopback listeners with generated self-signed certificates of
+varying expiry. Each listener has a behaviour drawn from --mix:
+
+  ok         complete the handshake after --latency-ms (jittered)
+  slow       wait --slow-delay seconds before the handshake
+  reset      accept, then reset the connection (RST)
+  blackhole  accept and never answer, so the client times out
+
+Listening sockets are bound up front and split across --workers processes.
+The host list (127.0.0.1:port per line) is written to --hosts-file and
+READY is printed once every socket is listening. Linux only, fully offline.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import ssl
+import struct
+import subprocess
+import sys
+import tempfile
+
+BEHAVIOURS = ('ok', 'slow', 'reset', 'blackhole')
+
+def parse_mix(value):
+    """Parse 'ok=0.9,slow=0.05,...' into (behaviours, weights)"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in BEHAVIOURS:
+            raise argparse.ArgumentTypeError(f"Unknown behaviour {name!r}, expected one of {', '.join(BEHAVIOURS)}")
+        mix[name] = float(weight)
+    return list(mix), list(mix.values())
+
+def generate_certs(directory, count, min_days, max_days):
+    """Create `count` self-signed EC certs spread between min_days and max_days of validity"""
+    certs = []
+    for i in range(count):
+        days = min_days + (max_days - min_days) * i // max(1, count - 1)
+        cert = os.path.join(directory, f"farm-{i}.pem")
+        key = os.path.join(directory, f"farm-{i}.key")
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                        '-nodes', '-keyout', key, '-out', cert, '-days', str(days),
+                        '-subj', f"/CN=farm-{i}.localhost",
+                        '-addext', f"subjectAltName=DNS:farm-{i}.localhost,DNS:localhost,IP:127.0.0.1"],
+                       check=True, capture_output=True)
+        certs.append((cert, key))
+    return certs
+
+class FarmProtocol(asyncio.Protocol):
+    """One connection to a farm listener, behaving as its listener was configured"""
+
+    tasks = set()
+
+    def __init__(self, behaviour, context, latency, slow_delay):
+        self.behaviour = behaviour
+        self.context = context
+        self.delay = slow_delay if behaviour == 'slow' else random.uniform(0.5, 1.5) * latency
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.behaviour == 'reset':
+            sock = transport.get_extra_info('socket')
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            transport.abort()
+        elif self.behaviour != 'blackhole':  # a blackhole reads and discards until the client gives up
+            # Leave the ClientHello in the kernel buffer until the TLS layer takes over
+            transport.pause_reading()
+            task = asyncio.get_running_loop().create_task(self.handshake())
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def handshake(self):
+        await asyncio.sleep(self.delay)
+        try:
+            tls = await asyncio.get_running_loop().start_tls(self.transport, self, self.context, server_side=True)
+        except Exception:
+            self.transport.close()
+            return
+        tls.close()
+
+def serve(listeners, certs, latency, slow_delay):
+    """Worker process: serve the given (socket, behaviour, cert index) listeners forever"""
+    contexts = []
+    for cert, key in certs:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        contexts.append(context)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        for sock, behaviour, cert_index in listeners:
+            context = contexts[cert_index]
+            await loop.create_server(lambda b=behaviour, c=context: FarmProtocol(b, c, latency, slow_delay),
+                                     sock=sock)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+def main():
+    parser = argparse.ArgumentParser(description='Local TLS server farm')
+    parser.add_argument('--listeners', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--mix', type=parse_mix, default='ok=1',
+                        help="Behaviour weights, e.g. ok=0.9,slow=0.04,reset=0.03,blackhole=0.03")
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mean delay before an ok handshake')
+    parser.add_argument('--slow-delay', type=float, default=3, help='Seconds before a slow handshake')
+    parser.add_argument('--certs', type=int, default=16, help='Distinct certificates to generate')
+    parser.add_argument('--min-days', type=int, default=1)
+    parser.add_argument('--max-days', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hosts-file', required=True)
+    args = parser.parse_args()
+
+    limit = raise_fd_limit()
+    if args.listeners + 1000 > limit:
+        sys.exit(f"--listeners {args.listeners} needs more file descriptors than the limit of {limit}")
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='tls-farm-')
+    certs = generate_certs(workdir, args.certs, args.min_days, args.max_days)
+
+    behaviours, weights = args.mix
+    listeners = []
+    for i in range(args.listeners):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1024)
+        sock.setblocking(False)
+        listeners.append((sock, rng.choices(behaviours, weights)[0], i % len(certs)))
+
+    with open(args.hosts_file, 'w') as f:
+        for sock, _, _ in listeners:
+            f.write(f"127.0.0.1:{sock.getsockname()[1]}\n")
+
+    # Forked workers inherit the bound sockets
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=serve, daemon=True,
+                               args=(listeners[i::args.workers], certs, args.latency_ms / 1000, args.slow_delay))
+               for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    counts = {b: sum(1 for _, behaviour, _ in listeners if behaviour == b) for b in behaviours}
+    print(f"READY {args.listeners} listeners on {args.workers} workers: "
+          + ', '.join(f"{b}={n}" for b, n in counts.items()), flush=True)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -4,12 +4,16 @@ from typing import List
 # ------------------------------------------------------------------------------
 # 🔁 Load env vars from .sslchecker.env first, fallback to .env
 # ------------------------------------------------------------------------------
-try:
-    from dotenv import load_dotenv
-    load_dotenv('.sslchecker.env', override=True)
-    load_dotenv('.env', override=False)
-except ImportError:
-    pass
+# python-dotenv is only imported when there is a file for it to load
+ENV_FILES = [(path, override) for path, override in (('.sslchecker.env', True), ('.env', False))
+             if os.path.isfile(path)]
+if ENV_FILES:
+    try:
+        from dotenv import load_dotenv
+        for path, override in ENV_FILES:
+            load_dotenv(path, override=override)
+    except ImportError:
+        pass
 
 # ------------------------------------------------------------------------------
 # ⚙️ Central Configuration Class
@@ -20,38 +24,138 @@ class SSLConfig:
     # Provider Configuration
     PROVIDERS = os.getenv('SSL_PROVIDERS', 'k8s,tf').split(',')
 
+    # Discovery Configuration
+    DISCOVERY_TIMEOUT = int(os.getenv('DISCOVERY_TIMEOUT', '60'))
+
     # AWS Configuration
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
     AWS_ACCOUNT_ID = os.getenv('AWS_ACCOUNT_ID')
+    AWS_REGIONS = os.getenv('AWS_REGIONS', AWS_REGION).split(',')
+    AWS_ASSUME_ROLE_ARNS = os.getenv('AWS_ASSUME_ROLE_ARNS', '').split(',')
+    ACM_DESCRIBE_WORKERS = int(os.getenv('ACM_DESCRIBE_WORKERS', '16'))
 
     # Azure Configuration
     AZURE_SUBSCRIPTION_ID = os.getenv('AZURE_SUBSCRIPTION_ID')
     AZURE_TENANT_ID = os.getenv('AZURE_TENANT_ID')
+    # '*' discovers every subscription the credential can see; empty falls back like unset
+    AZURE_SUBSCRIPTION_IDS = (os.getenv('AZURE_SUBSCRIPTION_IDS') or AZURE_SUBSCRIPTION_ID or '*').split(',')
+    AZURE_DISCOVERY_SURFACES = os.getenv('AZURE_DISCOVERY_SURFACES', 'app_service,app_gateway,front_door').split(',')
+    AZURE_DISCOVERY_WORKERS = int(os.getenv('AZURE_DISCOVERY_WORKERS', '16'))
 
     # GCP Configuration
     GCP_PROJECT = os.getenv('GCP_PROJECT')
     GCP_REGION = os.getenv('GCP_REGION', 'us-central1')
+    # '*' discovers every project the credentials can see; empty falls back like unset
+    GCP_PROJECTS = (os.getenv('GCP_PROJECTS') or GCP_PROJECT or '*').split(',')
+    GCP_DISCOVERY_SURFACES = os.getenv('GCP_DISCOVERY_SURFACES', 'compute,certificate_manager').split(',')
+    GCP_DISCOVERY_WORKERS = int(os.getenv('GCP_DISCOVERY_WORKERS', '16'))
 
     # Terraform Configuration
     TF_STATE_BUCKET = os.getenv('TF_STATE_BUCKET')
     TF_STATE_KEY = os.getenv('TF_STATE_KEY', 'terraform.tfstate')
+    TF_STATE_KEYS = os.getenv('TF_STATE_KEYS', TF_STATE_KEY).split(',')
+    TF_STATE_WORKERS = int(os.getenv('TF_STATE_WORKERS', '8'))
+    TF_STATE_CACHE = os.getenv('TF_STATE_CACHE', 'tf-state-cache.json')
 
     # Kubernetes Configuration
     K8S_CONTEXT = os.getenv('K8S_CONTEXT', 'default')
+    K8S_CONTEXTS = os.getenv('K8S_CONTEXTS', K8S_CONTEXT).split(',')
+    K8S_PAGE_SIZE = int(os.getenv('K8S_PAGE_SIZE', '500'))
+    K8S_WATCH_SECONDS = int(os.getenv('K8S_WATCH_SECONDS', '5'))
+    K8S_INDEX_CACHE = os.getenv('K8S_INDEX_CACHE', 'k8s-ingress-index.json')
+
+    # Offline Certificate Files Configuration
+    CERT_PATHS = os.getenv('CERT_PATHS', '').split(',')
+
+    # Static host list (one host or host:port per line)
+    STATIC_HOSTS_FILE = os.getenv('STATIC_HOSTS_FILE')
 
     # SSL Check Configuration
     SSL_THRESHOLD_DAYS = int(os.getenv('SSL_THRESHOLD_DAYS', '30'))
     SSL_CHECK_TIMEOUT = int(os.getenv('SSL_CHECK_TIMEOUT', '10'))
+    SSL_CHECK_CONCURRENCY = int(os.getenv('SSL_CHECK_CONCURRENCY', '200'))
+    SSL_CHECK_DEADLINE = int(os.getenv('SSL_CHECK_DEADLINE', '270'))
+    SSL_VERIFY_SAMPLE_RATE = float(os.getenv('SSL_VERIFY_SAMPLE_RATE', '0.0'))
+    SSL_CHECK_ALL_ADDRESSES = os.getenv('SSL_CHECK_ALL_ADDRESSES', 'false').lower() == 'true'
+    DNS_CACHE_TTL = int(os.getenv('DNS_CACHE_TTL', '300'))
+    DNS_CONCURRENCY = int(os.getenv('DNS_CONCURRENCY', '64'))
+    # Politeness per resolved IP and port, so shared ingresses and load balancers are not rate limited
+    SSL_ENDPOINT_CONCURRENCY = int(os.getenv('SSL_ENDPOINT_CONCURRENCY', '16'))
+    SSL_ENDPOINT_RATE = float(os.getenv('SSL_ENDPOINT_RATE', '25'))
+    SSL_ENDPOINT_BURST = int(os.getenv('SSL_ENDPOINT_BURST', '0')) or SSL_ENDPOINT_CONCURRENCY
+    SSL_PROBE_BACKLOG = int(os.getenv('SSL_PROBE_BACKLOG', '2000'))
+
+    # Per-host latency history and circuit breaker; empty disables adaptive timeouts
+    SSL_HEALTH_PATH = os.getenv('SSL_HEALTH_PATH', 'host-health.sqlite')
+    SSL_CHECK_RETRIES = int(os.getenv('SSL_CHECK_RETRIES', '2'))
+    SSL_CHECK_MIN_TIMEOUT = float(os.getenv('SSL_CHECK_MIN_TIMEOUT', '1'))
+    SSL_BREAKER_THRESHOLD = int(os.getenv('SSL_BREAKER_THRESHOLD', '3'))
+    SSL_BREAKER_HOURS = float(os.getenv('SSL_BREAKER_HOURS', '24'))
+    SSL_BREAKER_MAX_HOURS = float(os.getenv('SSL_BREAKER_MAX_HOURS', '168'))
+
+    # Timing spans for every runner stage and probed host (JSONL); empty disables
+    SSL_TRACE_PATH = os.getenv('SSL_TRACE_PATH', 'ssl-check-trace.jsonl')
+    # cProfile stats for the runner (and <path>.checker for the checker); empty disables
+    SSL_PROFILE_PATH = os.getenv('SSL_PROFILE_PATH', '')
+
+    # Deployment fast path: only hosts touched by the change (plus near-threshold cached hosts)
+    # are checked when PIPELINE_MODE=deployment and any of these is set
+    SSL_CHANGE_TF_PLAN = os.getenv('SSL_CHANGE_TF_PLAN')
+    SSL_CHANGE_MANIFESTS = [p.strip() for p in os.getenv('SSL_CHANGE_MANIFESTS', '').split(',') if p.strip()]
+    SSL_CHANGE_BASE_REF = os.getenv('SSL_CHANGE_BASE_REF')
+    # Merged results of the last scheduled run, written by --merge; the fast path also checks
+    # hosts it found near the threshold, since scheduled shards keep their own result caches
+    SSL_SCHEDULED_RESULTS_PATH = os.getenv('SSL_SCHEDULED_RESULTS_PATH', 'scheduled-results.json')
+
+    # Append-only columnar history of every full run's results; empty disables
+    SSL_HISTORY_PATH = os.getenv('SSL_HISTORY_PATH', 'ssl-history')
+    SSL_HISTORY_RETENTION_DAYS = int(os.getenv('SSL_HISTORY_RETENTION_DAYS', '400'))
+
+    # Inventory index of served certificates; hosts sharing an endpoint and cert are probed once
+    INVENTORY_INDEX_PATH = os.getenv('INVENTORY_INDEX_PATH', 'inventory-index.json')
+    # Group members are still probed directly within this many hours (jittered down to half)
+    INVENTORY_REVERIFY_HOURS = float(os.getenv('INVENTORY_REVERIFY_HOURS', '168'))
+
+    # Result Cache Configuration
+    SSL_CACHE_PATH = os.getenv('SSL_CACHE_PATH', 'cert-cache.sqlite')
+    SSL_CACHE_TTL_DAYS = int(os.getenv('SSL_CACHE_TTL_DAYS', '30'))
+    SSL_CACHE_MAX_ENTRIES = int(os.getenv('SSL_CACHE_MAX_ENTRIES', '100000'))
+    SSL_CACHE_NEAR_DAYS = int(os.getenv('SSL_CACHE_NEAR_DAYS', '7'))
+    SSL_CACHE_MAX_INTERVAL_HOURS = int(os.getenv('SSL_CACHE_MAX_INTERVAL_HOURS', '168'))
+
+    # Daemon Configuration
+    DAEMON_DISCOVERY_INTERVAL = int(os.getenv('DAEMON_DISCOVERY_INTERVAL', '3600'))
+    DAEMON_MIN_INTERVAL = int(os.getenv('DAEMON_MIN_INTERVAL', '3600'))
+    DAEMON_STARTUP_SPREAD = int(os.getenv('DAEMON_STARTUP_SPREAD', '300'))
+    DAEMON_METRICS_PORT = int(os.getenv('DAEMON_METRICS_PORT', '9219'))
 
     # Monitoring Configuration
     PROMETHEUS_PUSHGATEWAY = os.getenv('PROMETHEUS_PUSHGATEWAY')
+    PROMETHEUS_JOB = os.getenv('PROMETHEUS_JOB', 'ssl_cert_checker')
+    # node_exporter textfile collector output (must end in .prom); written instead of or as well as pushes
+    PROMETHEUS_TEXTFILE = os.getenv('PROMETHEUS_TEXTFILE')
+    # Last pushed series per group; only groups that changed since are pushed again
+    PROMETHEUS_STATE_PATH = os.getenv('PROMETHEUS_STATE_PATH', 'prometheus-export-state.json')
+    PROMETHEUS_PUSH_GROUPS = int(os.getenv('PROMETHEUS_PUSH_GROUPS', '16'))
+    PROMETHEUS_PUSH_WORKERS = int(os.getenv('PROMETHEUS_PUSH_WORKERS', '8'))
+    PROMETHEUS_REFRESH_HOURS = float(os.getenv('PROMETHEUS_REFRESH_HOURS', '24'))
+    PROMETHEUS_HANDSHAKE_DEADBAND = float(os.getenv('PROMETHEUS_HANDSHAKE_DEADBAND', '0.5'))
+    CLOUDWATCH_ENABLED = os.getenv('CLOUDWATCH_ENABLED', 'true').lower() == 'true'
     CLOUDWATCH_NAMESPACE = os.getenv('CLOUDWATCH_NAMESPACE', 'SSLChecker')
+    CLOUDWATCH_BATCH_SIZE = int(os.getenv('CLOUDWATCH_BATCH_SIZE', '1000'))
+    CLOUDWATCH_WORKERS = int(os.getenv('CLOUDWATCH_WORKERS', '8'))
 
     # Alerting Configuration
     SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
     JIRA_URL = os.getenv('JIRA_URL')
     JIRA_AUTH_BASIC = os.getenv('JIRA_AUTH_BASIC')
     JIRA_PROJECT_KEY = os.getenv('JIRA_PROJECT_KEY', 'CERT')
+    # Last alert per sink and host; hosts are re-alerted only on a change or a crossed escalation threshold
+    ALERT_STATE_PATH = os.getenv('ALERT_STATE_PATH', 'alert-state.sqlite')
+    ALERT_ESCALATION_DAYS = [int(d) for d in os.getenv('ALERT_ESCALATION_DAYS', '7,1').split(',') if d.strip()]
+    ALERT_WORKERS = int(os.getenv('ALERT_WORKERS', '8'))
+    ALERT_MAX_RETRIES = int(os.getenv('ALERT_MAX_RETRIES', '5'))
+    ALERT_MAX_RETRY_WAIT = int(os.getenv('ALERT_MAX_RETRY_WAIT', '60'))
 
     # Pipeline Configuration
     PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'scheduled')
@@ -71,23 +175,23 @@ class SSLConfig:
                 if not os.getenv('AWS_SECRET_ACCESS_KEY'):
                     missing.append('AWS_SECRET_ACCESS_KEY')
             elif p == 'azure':
-                if not cls.AZURE_SUBSCRIPTION_ID:
-                    missing.append('AZURE_SUBSCRIPTION_ID')
                 if not cls.AZURE_TENANT_ID:
                     missing.append('AZURE_TENANT_ID')
             elif p == 'gcp':
-                if not cls.GCP_PROJECT:
-                    missing.append('GCP_PROJECT')
-                if not cls.GCP_REGION:
-                    missing.append('GCP_REGION')
                 if not os.getenv('GCP_CREDENTIALS_JSON'):
                     missing.append('GCP_CREDENTIALS_JSON')
             elif p == 'tf':
                 if not cls.TF_STATE_BUCKET:
                     missing.append('TF_STATE_BUCKET')
-            elif p == 'k8s':
+            elif p in ('k8s', 'k8s_secrets'):
                 if not cls.K8S_CONTEXT:
                     missing.append('K8S_CONTEXT')
+            elif p == 'files':
+                if not any(path.strip() for path in cls.CERT_PATHS):
+                    missing.append('CERT_PATHS')
+            elif p == 'static':
+                if not cls.STATIC_HOSTS_FILE:
+                    missing.append('STATIC_HOSTS_FILE')
 
         if cls.PIPELINE_MODE == 'scheduled':
             if not cls.SLACK_WEBHOOK_URL:
@@ -102,22 +206,37 @@ class SSLConfig:
         return {
             'aws': {
                 'region': cls.AWS_REGION,
-                'account_id': cls.AWS_ACCOUNT_ID
+                'regions': cls.AWS_REGIONS,
+                'account_id': cls.AWS_ACCOUNT_ID,
+                'assume_role_arns': [arn for arn in cls.AWS_ASSUME_ROLE_ARNS if arn]
             },
             'azure': {
                 'subscription_id': cls.AZURE_SUBSCRIPTION_ID,
+                'subscription_ids': cls.AZURE_SUBSCRIPTION_IDS,
                 'tenant_id': cls.AZURE_TENANT_ID
             },
             'gcp': {
                 'project': cls.GCP_PROJECT,
+                'projects': cls.GCP_PROJECTS,
                 'region': cls.GCP_REGION
             },
             'tf': {
                 'state_bucket': cls.TF_STATE_BUCKET,
-                'state_key': cls.TF_STATE_KEY
+                'state_key': cls.TF_STATE_KEY,
+                'state_keys': cls.TF_STATE_KEYS
             },
             'k8s': {
-                'context': cls.K8S_CONTEXT
+                'context': cls.K8S_CONTEXT,
+                'contexts': cls.K8S_CONTEXTS
+            },
+            'k8s_secrets': {
+                'contexts': cls.K8S_CONTEXTS
+            },
+            'files': {
+                'paths': cls.CERT_PATHS
+            },
+            'static': {
+                'hosts_file': cls.STATIC_HOSTS_FILE
             }
         }.get(provider, {})
 
@@ -0,0 +1,156 @@
+"""
+Stateful alert dispatch
+
+Remembers, per sink and host, the certificate and escalation level last
+alerted on (and the Jira ticket raised), so a failing host is alerted once
+when it starts failing, again only when it crosses an ALERT_ESCALATION_DAYS
+threshold or serves a different certificate, and once more when it is
+renewed. Sinks are sent to concurrently, each over its own pooled session.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SSLConfig
+from alerting.slack_alert import SlackSink
+from alerting.jira_alert import JiraSink
+
+DAY = 86400
+
+def alert_level(result: Dict[str, Any], escalation_days: List[int]) -> int:
+    """0 for a host that should not be alerted on, else 1 plus escalation thresholds crossed"""
+    days_left = result.get('chain_days_left') if result.get('fail_reason') == 'chain' else result.get('days_left')
+    if result.get('status') != 'FAIL' or days_left is None:
+        return 0
+    return 1 + sum(1 for days in escalation_days if days_left <= days)
+
+class AlertState:
+    """SQLite store of the last alert sent per (sink, hostname)"""
+
+    def __init__(self, path: str, ttl_days: int = 30):
+        self.ttl_days = ttl_days
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS alerts (
+                sink TEXT NOT NULL,
+                hostname TEXT NOT NULL,
+                fingerprint TEXT,
+                level INTEGER NOT NULL,
+                days_left INTEGER,
+                ticket_key TEXT,
+                last_alerted REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (sink, hostname)
+            )
+        """)
+        self.conn.commit()
+
+    def load(self, sink: str) -> Dict[str, Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT hostname, fingerprint, level, ticket_key FROM alerts WHERE sink = ?", (sink,))
+        return {row[0]: {'fingerprint': row[1], 'level': row[2], 'ticket_key': row[3]} for row in rows}
+
+    def update(self, sink: str, events: List[Dict[str, Any]], delivered: Dict[str, Optional[str]],
+               seen: List[str], now: Optional[float] = None) -> None:
+        """Record delivered events and mark still-failing hosts as seen"""
+        now = time.time() if now is None else now
+        for event in events:
+            if event['hostname'] not in delivered:
+                continue
+            if event['kind'] == 'resolved':
+                self.conn.execute("DELETE FROM alerts WHERE sink = ? AND hostname = ?", (sink, event['hostname']))
+            else:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (sink, event['hostname'], event.get('fingerprint'), event['level'], event['days_left'],
+                     delivered[event['hostname']], now, now))
+        self.conn.executemany("UPDATE alerts SET last_seen = ? WHERE sink = ? AND hostname = ?",
+                              [(now, sink, hostname) for hostname in seen])
+        self.conn.commit()
+
+    def close(self) -> None:
+        # Hosts that have not been seen failing for ttl_days have left the inventory
+        self.conn.execute("DELETE FROM alerts WHERE last_seen < ?", (time.time() - self.ttl_days * DAY,))
+        self.conn.commit()
+        self.conn.close()
+
+class AlertDispatcher:
+    def __init__(self, sinks: List[Any], state: AlertState, escalation_days: List[int]):
+        self.sinks = [sink for sink in sinks if sink.configured()]
+        self.state = state
+        self.escalation_days = escalation_days
+
+    @classmethod
+    def from_config(cls) -> 'AlertDispatcher':
+        sinks = [
+            SlackSink(SSLConfig.SLACK_WEBHOOK_URL, max_retries=SSLConfig.ALERT_MAX_RETRIES,
+                      max_wait=SSLConfig.ALERT_MAX_RETRY_WAIT),
+            JiraSink(SSLConfig.JIRA_URL, SSLConfig.JIRA_AUTH_BASIC, SSLConfig.JIRA_PROJECT_KEY,
+                     SSLConfig.ALERT_WORKERS, SSLConfig.ALERT_MAX_RETRIES, SSLConfig.ALERT_MAX_RETRY_WAIT)
+        ]
+        return cls(sinks, AlertState(SSLConfig.ALERT_STATE_PATH), SSLConfig.ALERT_ESCALATION_DAYS)
+
+    def plan(self, results: List[Dict[str, Any]], alerted: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Events for hosts whose alert state changed since the sink last heard about them"""
+        events = []
+        for result in results:
+            previous = alerted.get(result['hostname'])
+            level = alert_level(result, self.escalation_days)
+            if level:
+                if previous is None:
+                    kind = 'firing'
+                elif level > previous['level']:
+                    kind = 'escalated'
+                elif result.get('fingerprint') and result['fingerprint'] != previous['fingerprint']:
+                    kind = 'firing'
+                else:
+                    continue
+            elif previous is not None and result.get('status') == 'PASS':
+                kind = 'resolved'
+            else:
+                # ERROR and UNREACHABLE say nothing about the certificate; keep the state as is
+                continue
+            events.append(dict(result, kind=kind, level=level,
+                               ticket_key=previous['ticket_key'] if previous else None))
+        return events
+
+    def dispatch(self, results: List[Dict[str, Any]]) -> Dict[str, tuple]:
+        """Send to every sink concurrently; returns {sink: (events, delivered, error)}"""
+        # State is read and written on this thread only; the sinks just send
+        events = {sink.name: self.plan(results, self.state.load(sink.name)) for sink in self.sinks}
+        seen = [r['hostname'] for r in results if alert_level(r, self.escalation_days)]
+
+        outcome = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(self.sinks))) as executor:
+            futures = {sink.name: executor.submit(sink.send, events[sink.name])
+                       for sink in self.sinks if events[sink.name]}
+            for sink in self.sinks:
+                delivered, error = {}, None
+                if sink.name in futures:
+                    try:
+                        delivered = futures[sink.name].result()
+                    except Exception as e:
+                        error = e
+                self.state.update(sink.name, events[sink.name], delivered, seen)
+                outcome[sink.name] = (len(events[sink.name]), len(delivered), error)
+        return outcome
+
+    def close(self) -> None:
+        self.state.close()
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as f:
+        results = [json.loads(line) for line in f if line.strip()]
+
+    dispatcher = AlertDispatcher.from_config()
+    try:
+        for name, (events, delivered, error) in dispatcher.dispatch(results).items():
+            print(f"{name}: {error}" if error else f"{name}: {delivered}/{events} alerts sent")
+    finally:
+        dispatcher.close()
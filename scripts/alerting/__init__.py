@@ -0,0 +1,15 @@
+"""
+Alert sinks
+
+Each sink module exposes a class with a ``name``, a ``configured()`` check
+and ``send(events)``, which delivers a list of alert events and returns
+``{hostname: ticket_key}`` for every event it delivered (ticket_key is None
+for sinks without tickets). Deduplication and alert state are handled by
+alert_dispatcher, so sinks only ever see state transitions.
+"""
+
+def expiry_text(event):
+    """'expires in N days', naming the chain certificate when that is what fails"""
+    if event.get('fail_reason') == 'chain':
+        return f"serves {event['chain_expiring']}, which expires in {event['chain_days_left']} days"
+    return f"expires in {event['days_left']} days"
@@ -0,0 +1,58 @@
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+def make_session(pool_size=8, headers=None):
+    """A session whose connection pool is large enough for pool_size concurrent requests"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(headers or {})
+    return session
+
+def retry_after(response):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def post_with_backoff(session, url, max_retries=5, max_wait=60, timeout=10, idempotent=True, **kwargs):
+    """POST, retrying rate limits and gateway errors; honours Retry-After, else full jitter.
+
+    A gateway error or dropped connection may come after the server acted on
+    the request, so for a request that is not idempotent only failures where
+    it certainly was not are retried: 429s, responses with Retry-After and
+    connect timeouts.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.post(url, timeout=timeout, **kwargs)
+        except requests.ConnectionError as e:
+            if attempt == max_retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                raise
+            time.sleep(random.uniform(0, min(max_wait, 0.5 * 2 ** attempt)))
+            continue
+        wait = retry_after(response)
+        retryable = response.status_code in RETRY_STATUSES and (
+            idempotent or response.status_code == 429 or wait is not None)
+        if not retryable or attempt == max_retries:
+            response.raise_for_status()
+            return response
+        if wait is None:
+            wait = random.uniform(0, 0.5 * 2 ** attempt)
+        time.sleep(min(wait, max_wait))
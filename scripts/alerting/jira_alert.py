@@ -1,37 +1,69 @@
-import requests
-import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-JIRA_URL = "https://your-jira-instance.atlassian.net/rest/api/2/issue"
-JIRA_AUTH = os.getenv("JIRA_AUTH_BASIC")  # Base64-encoded user:token
-
-headers = {
-    "Content-Type": "application/json",
-    "Authorization": f"Basic {JIRA_AUTH}"
-}
-
-def create_jira_ticket(summary, description):
-    payload = {
-        "fields": {
-            "project": {"key": "CERT"},
-            "summary": summary,
-            "description": description,
-            "issuetype": {"name": "Bug"},
-            "priority": {"name": "High"}
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from alerting import expiry_text
+from alerting.delivery import make_session, post_with_backoff
+
+class JiraSink:
+    """One ticket per host; escalations and renewals are comments on that ticket"""
+
+    name = 'Jira'
+
+    def __init__(self, base_url, auth, project_key='CERT', workers=8, max_retries=5, max_wait=60):
+        self.api = f"{(base_url or '').rstrip('/')}/rest/api/2/issue"
+        self.auth = auth
+        self.project_key = project_key
+        self.workers = workers
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.session = make_session(workers, {
+            "Content-Type": "application/json",
+            "Authorization": f"Basic {auth}"
+        })
+
+    def configured(self):
+        return bool(self.auth) and self.api.startswith('http')
+
+    def _post(self, url, payload, idempotent=True):
+        return post_with_backoff(self.session, url, self.max_retries, self.max_wait,
+                                 idempotent=idempotent, json=payload)
+
+    def create_ticket(self, event):
+        payload = {
+            "fields": {
+                "project": {"key": self.project_key},
+                "summary": f"SSL Certificate Expiry: {event['hostname']}",
+                "description": f"{event['hostname']} {expiry_text(event)} "
+                               f"({event.get('chain_expiry_date') or event.get('expiry_date')})",
+                "issuetype": {"name": "Bug"},
+                "priority": {"name": "High"}
+            }
         }
-    }
-    response = requests.post(JIRA_URL, headers=headers, json=payload)
-    return response.status_code, response.json()
-
-if __name__ == "__main__":
-    with open(sys.argv[1]) as f:
-        results = [json.loads(line) for line in f if line.strip()]
-    failing = [r for r in results if r['status'] == 'FAIL']
-
-    if failing:
-        summary = f"SSL Certificate Expiry: {len(failing)} host(s)"
-        description = "\n".join(
-            f"{r['hostname']} expires in {r['days_left']} days" for r in failing
-        )
-        create_jira_ticket(summary, description)
+        # Retrying a create that timed out at the gateway could open a second ticket
+        return self._post(self.api, payload, idempotent=False).json()['key']
+
+    def comment(self, ticket_key, body):
+        self._post(f"{self.api}/{ticket_key}/comment", {"body": body})
+        return ticket_key
+
+    def deliver(self, event):
+        ticket_key = event.get('ticket_key')
+        if event['kind'] == 'resolved':
+            return self.comment(ticket_key, f"Certificate renewed: {event['hostname']} now expires in "
+                                            f"{event['days_left']} days") if ticket_key else None
+        if not ticket_key:
+            return self.create_ticket(event)
+        return self.comment(ticket_key, f"Escalation: {event['hostname']} {expiry_text(event)}")
+
+    def send(self, events):
+        delivered = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.deliver, event): event for event in events}
+            for future, event in futures.items():
+                try:
+                    delivered[event['hostname']] = future.result()
+                except Exception as e:
+                    print(f"Failed to update Jira for {event['hostname']}: {e}", file=sys.stderr)
+        return delivered
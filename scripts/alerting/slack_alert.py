@@ -1,22 +1,46 @@
-import requests
-import json
 import os
 import sys
 
-SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK_URL")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from alerting import expiry_text
+from alerting.delivery import make_session, post_with_backoff
 
-def send_slack_alert(message):
-    payload = {"text": message}
-    response = requests.post(SLACK_WEBHOOK, json=payload)
-    return response.status_code
+HEADINGS = {
+    'firing': "*SSL Cert Expiry Alert:*",
+    'escalated': "*SSL Cert Expiry Escalation:*",
+    'resolved': "*SSL Certs Renewed:*"
+}
 
-if __name__ == "__main__":
-    with open(sys.argv[1]) as f:
-        results = [json.loads(line) for line in f if line.strip()]
-    failing = [r for r in results if r['status'] == 'FAIL']
+def format_event(event):
+    if event['kind'] == 'resolved':
+        return f"{event['hostname']} now expires in {event['days_left']} days"
+    return f"{event['hostname']} {expiry_text(event)}"
 
-    if failing:
-        msg = "*SSL Cert Expiry Alert:*\n" + "\n".join(
-            f"{r['hostname']} expires in {r['days_left']} days" for r in failing
-        )
-        send_slack_alert(msg)
+class SlackSink:
+    """Posts one message per run covering every new, escalated and resolved host"""
+
+    name = 'Slack'
+
+    def __init__(self, webhook, session=None, max_retries=5, max_wait=60):
+        self.webhook = webhook
+        self.session = session or make_session(1)
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+
+    def configured(self):
+        return bool(self.webhook)
+
+    def build_message(self, events):
+        sections = []
+        for kind, heading in HEADINGS.items():
+            lines = [format_event(e) for e in events if e['kind'] == kind]
+            if lines:
+                sections.append(heading + "\n" + "\n".join(lines))
+        return "\n\n".join(sections)
+
+    def send(self, events):
+        if not events:
+            return {}
+        post_with_backoff(self.session, self.webhook, self.max_retries, self.max_wait,
+                          json={"text": self.build_message(events)})
+        return {e['hostname']: e.get('ticket_key') for e in events}
@@ -0,0 +1,223 @@
+"""
+Minimal X.509 certificate parser
+
+Decodes the handful of fields the checker needs straight from DER without
+any third-party dependency: validity, subject/issuer common names, DNS and
+IP subject alternative names, the public key type and size and the SHA-256
+fingerprint.
+"""
+
+import base64
+import hashlib
+import ipaddress
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+OID_COMMON_NAME = b'\x55\x04\x03'
+OID_SUBJECT_ALT_NAME = b'\x55\x1d\x11'
+OID_RSA_ENCRYPTION = b'\x2a\x86\x48\x86\xf7\x0d\x01\x01\x01'
+OID_EC_PUBLIC_KEY = b'\x2a\x86\x48\xce\x3d\x02\x01'
+KEY_ALGORITHMS = {
+    b'\x2b\x65\x70': 'Ed25519',
+    b'\x2b\x65\x71': 'Ed448'
+}
+EC_CURVES = {
+    b'\x2a\x86\x48\xce\x3d\x03\x01\x07': 256,  # P-256
+    b'\x2b\x81\x04\x00\x22': 384,  # P-384
+    b'\x2b\x81\x04\x00\x23': 521  # P-521
+}
+
+PEM_CERT_RE = re.compile(rb'-----BEGIN CERTIFICATE-----(.+?)-----END CERTIFICATE-----', re.S)
+
+def _element(der, offset):
+    """Return (tag, content_start, content_end) of the DER element at offset"""
+    tag = der[offset]
+    length = der[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(der[start:start + size], 'big')
+        start += size
+    return tag, start, start + length
+
+def _children(der, start, end):
+    """Yield (tag, content_start, content_end) for each element between start and end"""
+    while start < end:
+        tag, content_start, content_end = _element(der, start)
+        yield tag, content_start, content_end
+        start = content_end
+
+def _time(der, tag, start, end):
+    # Sliced by hand: strptime costs more than the rest of the parse put together
+    if tag == 0x17:  # UTCTime, two-digit years per RFC 5280
+        year = int(der[start:start + 2])
+        year += 1900 if year >= 50 else 2000
+        start += 2
+    else:  # GeneralizedTime
+        year = int(der[start:start + 4])
+        start += 4
+    return datetime(year, int(der[start:start + 2]), int(der[start + 2:start + 4]),
+                    int(der[start + 4:start + 6]), int(der[start + 6:start + 8]), int(der[start + 8:start + 10]))
+
+def _common_name(der, start, end):
+    for _, set_start, set_end in _children(der, start, end):
+        for _, attr_start, attr_end in _children(der, set_start, set_end):
+            (_, oid_start, oid_end), (_, value_start, value_end) = list(_children(der, attr_start, attr_end))[:2]
+            if der[oid_start:oid_end] == OID_COMMON_NAME:
+                return der[value_start:value_end].decode('utf-8', 'replace')
+    return None
+
+def _tbs_fields(der):
+    """Return the tbsCertificate children with the optional version tag removed"""
+    _, cert_start, cert_end = _element(der, 0)
+    _, tbs_start, tbs_end = _element(der, cert_start)
+    fields = list(_children(der, tbs_start, tbs_end))
+    if fields[0][0] == 0xa0:  # explicit version tag
+        fields = fields[1:]
+    return fields
+
+def not_after(der: bytes) -> datetime:
+    """Extract notAfter only; cheaper than a full parse_certificate"""
+    _, validity_start, validity_end = _tbs_fields(der)[3]
+    _, (tag, start, end) = _children(der, validity_start, validity_end)
+    return _time(der, tag, start, end)
+
+def parse_expiry(value):
+    """Parse an ISO-8601/RFC 3339 expiry timestamp into a naive UTC datetime"""
+    expiry_date = datetime.fromisoformat(value)
+    if expiry_date.tzinfo is not None:
+        expiry_date = expiry_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return expiry_date
+
+def evaluate_expiry(hostname, expiry_date, threshold_days):
+    days_left = (expiry_date - datetime.utcnow()).days
+    return {
+        'hostname': hostname,
+        'expiry_date': expiry_date.isoformat(),
+        'days_left': days_left,
+        'status': 'FAIL' if days_left < threshold_days else 'PASS',
+        'error': None
+    }
+
+def evaluate_chain(result, chain_expiry_date, chain_expiring, threshold_days):
+    """Add the chain's earliest expiry to an evaluate_expiry result, failing it within the threshold"""
+    chain_days_left = (chain_expiry_date - datetime.utcnow()).days
+    result.update(chain_expiry_date=chain_expiry_date.isoformat(), chain_days_left=chain_days_left,
+                  chain_expiring=chain_expiring)
+    if result['status'] == 'PASS' and chain_days_left < threshold_days:
+        # An intermediate expiring before the leaf breaks the host just the same
+        result.update(status='FAIL', fail_reason='chain')
+    return result
+
+def _subject_alt_names(der, start, end) -> List[str]:
+    names = []
+    for tag, name_start, name_end in _children(der, start, end):
+        if tag == 0x82:  # dNSName
+            names.append(der[name_start:name_end].decode('ascii', 'replace'))
+        elif tag == 0x87:  # iPAddress
+            names.append(str(ipaddress.ip_address(der[name_start:name_end])))
+    return names
+
+def _public_key(der, start, end):
+    """(key type, size in bits) of a subjectPublicKeyInfo, e.g. ('RSA', 2048) or ('EC', 256)"""
+    (_, algorithm_start, algorithm_end), (_, key_start, key_end) = _children(der, start, end)
+    algorithm = list(_children(der, algorithm_start, algorithm_end))
+    oid = der[algorithm[0][1]:algorithm[0][2]]
+    if oid == OID_RSA_ENCRYPTION:
+        # BIT STRING: unused-bits byte, then SEQUENCE { modulus, publicExponent }
+        _, rsa_start, rsa_end = _element(der, key_start + 1)
+        _, modulus_start, modulus_end = _element(der, rsa_start)
+        return 'RSA', int.from_bytes(der[modulus_start:modulus_end], 'big').bit_length()
+    if oid == OID_EC_PUBLIC_KEY:
+        return 'EC', EC_CURVES.get(der[algorithm[1][1]:algorithm[1][2]]) if len(algorithm) > 1 else None
+    if oid in KEY_ALGORITHMS:
+        return KEY_ALGORITHMS[oid], None
+    return oid.hex(), None
+
+def parse_certificate(der: bytes) -> Dict[str, Any]:
+    """Decode the interesting fields of a DER-encoded X.509 certificate"""
+    fields = _tbs_fields(der)
+    serial, _, issuer, validity, subject, public_key = fields[:6]
+
+    (nb_tag, nb_start, nb_end), (na_tag, na_start, na_end) = _children(der, validity[1], validity[2])
+
+    sans = []
+    for tag, start, end in fields[6:]:
+        if tag != 0xa3:  # [3] extensions
+            continue
+        _, exts_start, exts_end = _element(der, start)
+        for _, ext_start, ext_end in _children(der, exts_start, exts_end):
+            parts = list(_children(der, ext_start, ext_end))
+            oid, value = parts[0], parts[-1]
+            if der[oid[1]:oid[2]] == OID_SUBJECT_ALT_NAME:
+                _, names_start, names_end = _element(der, value[1])
+                sans = _subject_alt_names(der, names_start, names_end)
+
+    key_type, key_bits = _public_key(der, public_key[1], public_key[2])
+    return {
+        'fingerprint': hashlib.sha256(der).hexdigest(),
+        'serial': der[serial[1]:serial[2]].hex(),
+        'subject_cn': _common_name(der, subject[1], subject[2]),
+        'issuer_cn': _common_name(der, issuer[1], issuer[2]),
+        'sans': sans,
+        'not_before': _time(der, nb_tag, nb_start, nb_end),
+        'not_after': _time(der, na_tag, na_start, na_end),
+        'key_type': key_type,
+        'key_bits': key_bits,
+        # Same name bytes on both sides: a root, which clients take from their own trust store
+        'self_issued': der[issuer[1]:issuer[2]] == der[subject[1]:subject[2]]
+    }
+
+class ParseCache:
+    """Bounded LRU of parsed certificates keyed by SHA-256 fingerprint.
+
+    Wildcards and intermediates are served by many hosts, so most lookups
+    cost a hash instead of a parse. Entries are shared between callers and
+    must not be modified. Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def parse(self, der: bytes) -> Dict[str, Any]:
+        fingerprint = hashlib.sha256(der).hexdigest()
+        with self.lock:
+            cert = self.entries.get(fingerprint)
+            if cert is not None:
+                self.hits += 1
+                self.entries.move_to_end(fingerprint)
+                return cert
+            self.misses += 1
+        # Parsed outside the lock; two threads racing on one certificate just both parse it
+        cert = parse_certificate(der)
+        with self.lock:
+            self.entries[fingerprint] = cert
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return cert
+
+def pem_to_der(data: bytes) -> List[bytes]:
+    """Return every certificate in a PEM bundle as DER"""
+    return [base64.b64decode(b''.join(body.split())) for body in PEM_CERT_RE.findall(data)]
+
+def load_certificates(data: bytes) -> List[bytes]:
+    """Return the DER certificates in PEM text, or data itself if it is a single DER certificate"""
+    if b'-----BEGIN' in data:
+        return pem_to_der(data)
+    return [data] if data[:1] == b'\x30' else []
+
+def certificate_domains(cert: Dict[str, Any], **provenance) -> List[Dict[str, Any]]:
+    """Inventory records for every name a parsed certificate covers, with its expiry"""
+    names = cert['sans'] or [cert['subject_cn']]
+    return [dict({
+        "hostname": name,
+        "expires_at": cert['not_after'].isoformat(),
+        "fingerprint": cert['fingerprint']
+    }, **provenance) for name in names if name]
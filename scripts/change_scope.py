@@ -0,0 +1,152 @@
+"""
+Change-scoped host selection for deployment checks
+
+Works out which TLS hostnames a change touches, from a Terraform plan
+(`terraform show -json plan.out`), rendered Kubernetes manifests, or a git
+diff, so a pre-deploy gate only probes those hosts instead of the whole
+estate.
+"""
+
+import fnmatch
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import List, Dict, Any, Iterable
+
+from inventory_index import normalize_hostname, san_matches
+
+# Planned actions that leave no host to check
+IGNORED_ACTIONS = (['no-op'], ['read'], ['delete'])
+
+# Changed files worth reading in a git diff
+MANIFEST_PATTERNS = ('*.yaml', '*.yml', '*.json')
+TERRAFORM_PATTERNS = ('*.tf', '*.tfvars')
+# Terraform attributes that carry hostnames, e.g. domain_name = "api.example.com"
+TF_HOST_ATTRIBUTES = re.compile(r'\b(domain_name|subject_alternative_names|aliases|hosts?|hostnames?|'
+                                r'dns_names|domains)\b')
+QUOTED_HOSTNAME = re.compile(r'"((?:\*\.)?(?:[A-Za-z0-9-]+\.)+[A-Za-z]{2,}\.?)"')
+
+def _module_resources(module: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    yield from module.get('resources', [])
+    for child in module.get('child_modules', []):
+        yield from _module_resources(child)
+
+def hosts_from_tf_plan(path: str) -> List[Dict[str, Any]]:
+    """Domains of resources a Terraform plan creates or updates"""
+    # Imported here so changes without a Terraform plan skip the extractors and the cert parser
+    from discovery.discover_tf import DOMAIN_EXTRACTORS, LISTENER_TYPES, LOAD_BALANCER_TYPES, extract_domains
+
+    with open(path) as f:
+        plan = json.load(f)
+
+    # Load balancers from the prior state let changed listeners resolve their DNS name
+    resources = [
+        {'type': r['type'], 'name': r['name'], 'instances': [{'attributes': r.get('values') or {}}]}
+        for r in _module_resources(plan.get('prior_state', {}).get('values', {}).get('root_module', {}))
+        if r.get('type') in LOAD_BALANCER_TYPES
+    ]
+    for change in plan.get('resource_changes', []):
+        actions = change.get('change', {}).get('actions', [])
+        if actions in IGNORED_ACTIONS:
+            continue
+        if change['type'] in DOMAIN_EXTRACTORS or change['type'] in LISTENER_TYPES:
+            resources.append({'type': change['type'], 'name': change['name'],
+                              'instances': [{'attributes': change['change'].get('after') or {}}]})
+    return extract_domains(resources, f"plan:{path}")
+
+def _manifest_hosts(doc: Dict[str, Any]) -> List[str]:
+    kind = doc.get('kind')
+    spec = doc.get('spec') or {}
+    if kind == 'List':
+        return [host for item in doc.get('items') or [] for host in _manifest_hosts(item)]
+    if kind == 'Ingress':
+        return [host for tls in spec.get('tls') or [] for host in tls.get('hosts') or []]
+    if kind == 'Certificate':  # cert-manager
+        return list(spec.get('dnsNames') or [])
+    if kind == 'Gateway':  # Gateway API
+        return [listener['hostname'] for listener in spec.get('listeners') or []
+                if listener.get('protocol') in ('HTTPS', 'TLS') and listener.get('hostname')]
+    return []
+
+def hosts_from_manifests(paths: List[str]) -> List[Dict[str, Any]]:
+    """TLS hosts of Ingress, cert-manager Certificate and Gateway objects in rendered manifests"""
+    import yaml
+
+    domains = []
+    for path in paths:
+        try:
+            with open(path) as f:
+                docs = [doc for doc in yaml.safe_load_all(f) if isinstance(doc, dict)]
+        except (OSError, yaml.YAMLError) as e:
+            print(f"Error reading manifest {path}: {e}", file=sys.stderr)
+            continue
+        for doc in docs:
+            meta = doc.get('metadata') or {}
+            for host in _manifest_hosts(doc):
+                domains.append({"hostname": host, "source": "manifest", "kind": doc.get('kind'),
+                                "namespace": meta.get('namespace'), "name": meta.get('name'),
+                                "manifest": path})
+    return domains
+
+def _expand_manifest_paths(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names)
+                             if any(fnmatch.fnmatch(name, p) for p in MANIFEST_PATTERNS))
+        else:
+            files.append(path)
+    return files
+
+def hosts_from_git_diff(base_ref: str, repo: str = '.') -> List[Dict[str, Any]]:
+    """Hosts named in manifests changed since base_ref, and in changed Terraform host attributes"""
+    changed = subprocess.run(['git', 'diff', '--name-only', '--diff-filter=AMR', base_ref, '--'],
+                             cwd=repo, capture_output=True, text=True, check=True).stdout.split()
+    manifests = [os.path.join(repo, path) for path in changed
+                 if any(fnmatch.fnmatch(path, p) for p in MANIFEST_PATTERNS)]
+    domains = hosts_from_manifests(manifests)
+
+    terraform = [path for path in changed if any(fnmatch.fnmatch(path, p) for p in TERRAFORM_PATTERNS)]
+    if terraform:
+        diff = subprocess.run(['git', 'diff', '--unified=0', base_ref, '--'] + terraform,
+                              cwd=repo, capture_output=True, text=True, check=True).stdout
+        path = None
+        for line in diff.splitlines():
+            if line.startswith('+++ '):
+                path = line[6:] if line.startswith('+++ b/') else None
+            elif line.startswith('+') and TF_HOST_ATTRIBUTES.search(line):
+                domains.extend({"hostname": host, "source": "git_diff", "file": path}
+                               for host in QUOTED_HOSTNAME.findall(line))
+    return domains
+
+def expand_wildcards(domains: List[Dict[str, Any]], known_hosts: Iterable[str]) -> List[Dict[str, Any]]:
+    """Replace wildcard names, which cannot be probed, with the known hosts they cover"""
+    known_hosts = list(known_hosts)
+    expanded = []
+    for domain in domains:
+        hostname = normalize_hostname(domain['hostname'])
+        if not hostname.startswith('*.'):
+            expanded.append(dict(domain, hostname=hostname))
+            continue
+        expanded.extend(dict(domain, hostname=host, wildcard=hostname)
+                        for host in known_hosts if san_matches(hostname, host))
+    return expanded
+
+def changed_domains(tf_plan: str = None, manifests: List[str] = None, base_ref: str = None,
+                    known_hosts: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """Every host touched by the given change sources, one record per hostname"""
+    domains = []
+    if tf_plan:
+        domains.extend(hosts_from_tf_plan(tf_plan))
+    if manifests:
+        domains.extend(hosts_from_manifests(_expand_manifest_paths(manifests)))
+    if base_ref:
+        domains.extend(hosts_from_git_diff(base_ref))
+
+    unique = {}
+    for domain in expand_wildcards(domains, known_hosts):
+        unique.setdefault(domain['hostname'], domain)
+    return list(unique.values())
@@ -1,19 +1,74 @@
 import boto3
 import json
+import os
+import random
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
-cloudwatch = boto3.client('cloudwatch')
-
-with open(sys.argv[1]) as f:
-    results = [json.loads(line) for line in f if line.strip()]
-
-for cert in results:
-    cloudwatch.put_metric_data(
-        Namespace='SSLChecker',
-        MetricData=[{
-            'MetricName': 'DaysToExpiry',
-            'Dimensions': [{'Name': 'Host', 'Value': cert['hostname']}],
-            'Value': cert['days_left'],
-            'Unit': 'Count'
-        }]
-    )
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+
+THROTTLING_ERRORS = {'Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException'}
+
+def build_metric_data(results):
+    """One DaysToExpiry datum per host; ERROR rows have no days_left and are skipped"""
+    return [{
+        'MetricName': 'DaysToExpiry',
+        'Dimensions': [{'Name': 'Host', 'Value': cert['hostname']}],
+        'Value': cert['days_left'],
+        'Unit': 'Count'
+    } for cert in results if cert.get('days_left') is not None]
+
+def put_batch(client, namespace, batch, max_retries=5):
+    """Send one PutMetricData call, backing off with full jitter when throttled"""
+    for attempt in range(max_retries + 1):
+        try:
+            client.put_metric_data(Namespace=namespace, MetricData=batch)
+            return len(batch)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS or attempt == max_retries:
+                raise
+            time.sleep(random.uniform(0, min(20, 0.5 * 2 ** attempt)))
+
+def publish_metrics(results, namespace=None, batch_size=None, workers=None, endpoint_url=None):
+    """Publish metrics in maximum-size batches sent concurrently; returns (sent, failed) datum counts"""
+    namespace = namespace or SSLConfig.CLOUDWATCH_NAMESPACE
+    batch_size = batch_size or SSLConfig.CLOUDWATCH_BATCH_SIZE
+    workers = workers or SSLConfig.CLOUDWATCH_WORKERS
+
+    # Retries are handled in put_batch so backoff is shared across the pool
+    client = boto3.client('cloudwatch', region_name=SSLConfig.AWS_REGION,
+                          endpoint_url=endpoint_url or os.getenv('CLOUDWATCH_ENDPOINT_URL'),
+                          config=Config(max_pool_connections=workers, retries={'total_max_attempts': 1}))
+
+    data = build_metric_data(results)
+    batches = [data[i:i + batch_size] for i in range(0, len(data), batch_size)]
+
+    sent = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(put_batch, client, namespace, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                sent += future.result()
+            except Exception as e:
+                failed += len(futures[future])
+                print(f"Failed to publish {len(futures[future])} metrics: {e}", file=sys.stderr)
+    return sent, failed
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as f:
+        results = [json.loads(line) for line in f if line.strip()]
+
+    if not SSLConfig.CLOUDWATCH_ENABLED:
+        print("CloudWatch publishing disabled (CLOUDWATCH_ENABLED=false)", file=sys.stderr)
+        sys.exit(0)
+
+    sent, failed = publish_metrics(results)
+    print(f"Published {sent} CloudWatch metrics to {SSLConfig.CLOUDWATCH_NAMESPACE}"
+          f" ({len(results) - sent - failed} skipped, {failed} failed)")
+    if failed:
+        sys.exit(1)
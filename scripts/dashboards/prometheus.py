@@ -1,16 +1,227 @@
-from prometheus_client import CollectorRegistry, Gauge, push_to_gateway
+from prometheus_client import CollectorRegistry, Gauge, Histogram, delete_from_gateway, push_to_gateway, write_to_textfile
+import hashlib
 import json
 import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timezone
 
-PUSHGATEWAY_URL = "http://your-pushgateway:9091"
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from cert_parser import parse_expiry
+from tracing import HOST_PHASES, load_trace
 
-registry = CollectorRegistry()
-g = Gauge('ssl_cert_days_remaining', 'Days remaining SSL cert', ['host'], registry=registry)
+PHASE_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+STAGE_BUCKETS = (.1, .5, 1, 5, 10, 30, 60, 120, 300, 600)
 
-with open(sys.argv[1]) as f:
-    results = [json.loads(line) for line in f if line.strip()]
+HOST_GAUGES = {
+    'ssl_cert_days_remaining': ('Days remaining SSL cert', ('host', 'source')),
+    'ssl_cert_expiry_timestamp_seconds': ('Unix time the served certificate expires', ('host', 'source')),
+    'ssl_cert_chain_expiry_timestamp_seconds': ('Unix time the first certificate in the served chain expires',
+                                                ('host', 'source')),
+    'ssl_cert_check_status': ('Outcome of the last check; 1 for the status that applies',
+                              ('host', 'source', 'status')),
+    'ssl_cert_handshake_seconds': ('TLS handshake duration of the last probe', ('host', 'source'))
+}
+# Timing gauges only count as changed when they move by more than the deadband
+DEADBAND_GAUGES = ('ssl_cert_handshake_seconds',)
 
-for cert in results:
-    g.labels(host=cert['hostname']).set(cert['days_left'])
+# ------------------------------------------------------------------------------
+# Series per host, grouped for the Pushgateway
+# ------------------------------------------------------------------------------
+def host_series(result):
+    """(metric, labels, value) for every gauge a result has a value for"""
+    labels = (result['hostname'], result.get('source') or 'unknown')
+    series = [('ssl_cert_check_status', labels + (result.get('status') or 'ERROR',), 1)]
+    if result.get('days_left') is not None:
+        series.append(('ssl_cert_days_remaining', labels, result['days_left']))
+    if result.get('expiry_date'):
+        expiry = parse_expiry(result['expiry_date']).replace(tzinfo=timezone.utc)
+        series.append(('ssl_cert_expiry_timestamp_seconds', labels, int(expiry.timestamp())))
+    if result.get('chain_expiry_date'):
+        chain_expiry = parse_expiry(result['chain_expiry_date']).replace(tzinfo=timezone.utc)
+        series.append(('ssl_cert_chain_expiry_timestamp_seconds', labels, int(chain_expiry.timestamp())))
+    if result.get('handshake_ms') is not None:
+        series.append(('ssl_cert_handshake_seconds', labels, result['handshake_ms'] / 1000))
+    return series
 
-push_to_gateway(PUSHGATEWAY_URL, job='ssl_cert_checker', registry=registry)
+def series_id(metric, labels):
+    return '|'.join((metric,) + labels)
+
+def group_name(source, shard):
+    return f"{source}/{shard}"
+
+def push_shard(hostname, shards):
+    """1-based push group of a host; a fixed hash, since a new group count re-pushes everything anyway"""
+    return int.from_bytes(hashlib.blake2b(hostname.encode(), digest_size=8).digest(), 'big') % shards + 1
+
+def build_groups(results, shards):
+    """{group: {series id: value}}; a group is one source's share of the hashed hosts.
+
+    Hosts never move between groups as others come and go, so a changed host
+    only makes its own group be pushed again.
+    """
+    groups = {}
+    for result in results:
+        shard = push_shard(result['hostname'], shards)
+        for metric, labels, value in host_series(result):
+            group = groups.setdefault(group_name(labels[1], shard), {})
+            group[series_id(metric, labels)] = value
+    return groups
+
+def group_changed(previous, current, deadband):
+    if previous is None or previous.keys() != current.keys():
+        return True
+    for key, value in current.items():
+        old = previous[key]
+        if key.startswith(DEADBAND_GAUGES):
+            if abs(value - old) > deadband * max(abs(old), 1e-3):
+                return True
+        elif value != old:
+            return True
+    return False
+
+def host_registry(series):
+    """A registry holding the given series ids"""
+    registry = CollectorRegistry()
+    gauges = {name: Gauge(name, doc, labels, registry=registry) for name, (doc, labels) in HOST_GAUGES.items()}
+    for key, value in series.items():
+        metric, *labels = key.split('|')
+        gauges[metric].labels(*labels).set(value)
+    return registry
+
+def run_registry(results, registry=None):
+    """Per-run histograms and counts, which change every run"""
+    registry = registry or CollectorRegistry()
+    phases = Histogram('ssl_check_phase_seconds', 'Per-host probe phase duration',
+                       ['phase'], buckets=PHASE_BUCKETS, registry=registry)
+    stages = Histogram('ssl_check_stage_seconds', 'Runner stage duration',
+                       ['stage'], buckets=STAGE_BUCKETS, registry=registry)
+    statuses = Gauge('ssl_check_results', 'Hosts per check status in the last run', ['status'], registry=registry)
+    Gauge('ssl_check_last_run_timestamp_seconds', 'Unix time of the last exported run',
+          registry=registry).set(time.time())
+
+    counts = {}
+    for cert in results:
+        counts[cert.get('status') or 'ERROR'] = counts.get(cert.get('status') or 'ERROR', 0) + 1
+        for phase in HOST_PHASES:
+            if cert.get(phase) is not None:
+                phases.labels(phase=phase[:-len('_ms')]).observe(cert[phase] / 1000)
+    for status, count in counts.items():
+        statuses.labels(status=status).set(count)
+
+    if SSLConfig.SSL_TRACE_PATH:
+        for span in load_trace(SSLConfig.SSL_TRACE_PATH):
+            if span.get('span') != 'host':
+                stage = f"{span['span']}_{span['provider']}" if span.get('provider') else span['span']
+                stages.labels(stage=stage).observe(span['duration_ms'] / 1000)
+    return registry
+
+# ------------------------------------------------------------------------------
+# Outputs
+# ------------------------------------------------------------------------------
+def write_textfile(results, path):
+    """Write every series to a node_exporter textfile, replacing it atomically"""
+    registry = host_registry({series_id(metric, labels): value
+                              for result in results for metric, labels, value in host_series(result)})
+    write_to_textfile(path, run_registry(results, registry))
+
+def _load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+def push_changes(results, gateway, state_path=None, full=False):
+    """Push only the groups whose series changed since the last export; returns (pushed, unchanged, failed).
+
+    Each group is PUT under its own grouping key (source, shard), so it
+    replaces exactly its previous contents; groups with no hosts left are
+    deleted. Groups are also re-pushed after PROMETHEUS_REFRESH_HOURS so a
+    restarted gateway is repopulated. Only successful pushes update the
+    state, so failed groups are retried on the next run.
+    """
+    job = SSLConfig.PROMETHEUS_JOB
+    state = _load_state(state_path) if state_path else {}
+    previous = state.get('groups', {})
+    if state.get('shards') != SSLConfig.PROMETHEUS_PUSH_GROUPS:
+        # A new group count re-buckets every host; groups that no longer exist are still deleted
+        full = True
+    current = build_groups(results, SSLConfig.PROMETHEUS_PUSH_GROUPS)
+    stale_after = time.time() - SSLConfig.PROMETHEUS_REFRESH_HOURS * 3600
+
+    to_push = [group for group, series in current.items()
+               if full or group not in previous or previous[group]['pushed_at'] < stale_after
+               or group_changed(previous[group]['series'], series, SSLConfig.PROMETHEUS_HANDSHAKE_DEADBAND)]
+    to_delete = [group for group in previous if group not in current]
+
+    def push(group):
+        source, shard = group.rsplit('/', 1)
+        push_to_gateway(gateway, job=job, registry=host_registry(current[group]),
+                        grouping_key={'source': source, 'shard': shard})
+
+    def delete(group):
+        source, shard = group.rsplit('/', 1)
+        delete_from_gateway(gateway, job=job, grouping_key={'source': source, 'shard': shard})
+
+    groups = dict(previous)
+    pushed = failed = 0
+    with ThreadPoolExecutor(max_workers=SSLConfig.PROMETHEUS_PUSH_WORKERS) as executor:
+        futures = {executor.submit(push, group): group for group in to_push}
+        futures.update({executor.submit(delete, group): group for group in to_delete})
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Failed to export Prometheus group {group}: {e}", file=sys.stderr)
+                continue
+            if group in current:
+                groups[group] = {'series': current[group], 'pushed_at': time.time()}
+                pushed += 1
+            else:
+                groups.pop(group, None)
+
+    # Run-level metrics go to the bare job group, replacing the pre-grouping per-host gauges there
+    try:
+        push_to_gateway(gateway, job=job, registry=run_registry(results))
+    except Exception as e:
+        failed += 1
+        print(f"Failed to export Prometheus run metrics: {e}", file=sys.stderr)
+
+    if state_path and (to_push or to_delete or state.get('shards') != SSLConfig.PROMETHEUS_PUSH_GROUPS):
+        _save_state(state_path, {'shards': SSLConfig.PROMETHEUS_PUSH_GROUPS, 'groups': groups})
+    return pushed, len(current) - len(to_push), failed
+
+if __name__ == '__main__':
+    full = '--full' in sys.argv[1:]
+    paths = [arg for arg in sys.argv[1:] if arg != '--full']
+    with open(paths[0]) as f:
+        results = [json.loads(line) for line in f if line.strip()]
+
+    if not SSLConfig.PROMETHEUS_TEXTFILE and not SSLConfig.PROMETHEUS_PUSHGATEWAY:
+        print("PROMETHEUS_PUSHGATEWAY or PROMETHEUS_TEXTFILE not configured", file=sys.stderr)
+        sys.exit(0)
+
+    if SSLConfig.PROMETHEUS_TEXTFILE:
+        write_textfile(results, SSLConfig.PROMETHEUS_TEXTFILE)
+        print(f"Wrote {len(results)} hosts to {SSLConfig.PROMETHEUS_TEXTFILE}")
+
+    if SSLConfig.PROMETHEUS_PUSHGATEWAY:
+        pushed, unchanged, failed = push_changes(results, SSLConfig.PROMETHEUS_PUSHGATEWAY,
+                                                 SSLConfig.PROMETHEUS_STATE_PATH, full=full)
+        print(f"Pushed {pushed} changed Prometheus groups to {SSLConfig.PROMETHEUS_PUSHGATEWAY}"
+              f" ({unchanged} unchanged, {failed} failed)")
+        if failed:
+            sys.exit(1)
@@ -0,0 +1,67 @@
+"""
+Discovery provider plugins
+
+Each provider module exposes a ``discover()`` callable that returns a list of
+domain dicts with at least a ``hostname`` key. Modules are imported on first
+use so only the SDKs of configured providers are ever loaded, and cloud
+credentials are resolved once per process and shared by every provider that
+talks to the same cloud (e.g. ``aws`` and the S3 reader of ``tf``).
+"""
+
+import importlib
+import threading
+
+PROVIDER_MODULES = {
+    'k8s': 'discover_k8s',
+    'k8s_secrets': 'discover_k8s_secrets',
+    'files': 'discover_files',
+    'static': 'discover_static',
+    'tf': 'discover_tf',
+    'aws': 'discover_aws',
+    'azure': 'discover_azure',
+    'gcp': 'discover_gcp'
+}
+
+def _aws_credentials():
+    import boto3
+    return boto3.Session()
+
+def _azure_credentials():
+    from azure.identity import DefaultAzureCredential
+    return DefaultAzureCredential()
+
+def _gcp_credentials():
+    import google.auth
+    credentials, _ = google.auth.default()
+    return credentials
+
+CREDENTIAL_FACTORIES = {
+    'aws': _aws_credentials,
+    'azure': _azure_credentials,
+    'gcp': _gcp_credentials
+}
+
+_credentials = {}
+_credentials_lock = threading.Lock()
+
+def shared_credentials(cloud):
+    """Resolve a cloud's credentials on first use and return the same object afterwards.
+
+    Providers run on concurrent threads, so resolution is serialised: the
+    second caller waits for the first instead of walking the credential
+    chain (env, profile, metadata endpoint) again.
+    """
+    with _credentials_lock:
+        if cloud not in _credentials:
+            _credentials[cloud] = CREDENTIAL_FACTORIES[cloud]()
+        return _credentials[cloud]
+
+def aws_client(session, service, **kwargs):
+    """Create a client from a boto3 session, which is not itself thread-safe"""
+    with _credentials_lock:
+        return session.client(service, **kwargs)
+
+def load_provider(provider):
+    """Import a provider module and return its discover() callable"""
+    module = importlib.import_module(f"{__name__}.{PROVIDER_MODULES[provider]}")
+    return module.discover
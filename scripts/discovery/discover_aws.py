@@ -1,20 +1,92 @@
-import boto3
 import json
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-region = os.getenv('AWS_REGION', 'us-east-1')
-client = boto3.client('acm', region_name=region)
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from discovery import aws_client, shared_credentials
 
-def get_cert_domains():
-    certs = []
+def _sessions():
+    """Yield (account, session) for the ambient credentials or for each assume-role target"""
+    import boto3
+    base = shared_credentials('aws')
+    role_arns = [arn.strip() for arn in SSLConfig.AWS_ASSUME_ROLE_ARNS if arn.strip()]
+    if not role_arns:
+        yield SSLConfig.AWS_ACCOUNT_ID or 'default', base
+        return
+
+    sts = aws_client(base, 'sts')
+    for role_arn in role_arns:
+        try:
+            credentials = sts.assume_role(RoleArn=role_arn, RoleSessionName='ssl-cert-check')['Credentials']
+        except Exception as e:
+            print(f"Error assuming {role_arn}: {e}", file=sys.stderr)
+            continue
+        yield role_arn.split(':')[4], boto3.Session(
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken'])
+
+def _list_arns(client):
     paginator = client.get_paginator('list_certificates')
-    for page in paginator.paginate(CertificateStatuses=['ISSUED']):
-        for cert in page['CertificateSummaryList']:
-            details = client.describe_certificate(CertificateArn=cert['CertificateArn'])
-            domain = details['Certificate']['DomainName']
-            expiry = details['Certificate']['NotAfter'].isoformat()
-            certs.append({"hostname": domain, "expires_at": expiry})
-    return certs
+    return [cert['CertificateArn']
+            for page in paginator.paginate(CertificateStatuses=['ISSUED'])
+            for cert in page['CertificateSummaryList']]
+
+def _describe(client, arn, account, region):
+    details = client.describe_certificate(CertificateArn=arn)['Certificate']
+    return {
+        "hostname": details['DomainName'],
+        "expires_at": details['NotAfter'].isoformat(),
+        "source": "aws",
+        "account": account,
+        "region": region
+    }
+
+def iter_cert_domains():
+    """Yield ACM certificates from every configured account and region as they are described.
+
+    One client per account/region is shared by a bounded worker pool, with a
+    connection pool sized to match. botocore's adaptive retry mode slows the
+    client-side send rate whenever ACM returns throttling errors.
+    """
+    from botocore.config import Config
+
+    workers = SSLConfig.ACM_DESCRIBE_WORKERS
+    client_config = Config(max_pool_connections=workers,
+                           retries={'mode': 'adaptive', 'max_attempts': 10})
+    regions = [region.strip() for region in SSLConfig.AWS_REGIONS if region.strip()]
+    clients = [(account, region, aws_client(session, 'acm', region_name=region, config=client_config))
+               for account, session in _sessions()
+               for region in regions]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        listings = {executor.submit(_list_arns, client): (account, region, client)
+                    for account, region, client in clients}
+        describes = {}
+        for listing in as_completed(listings):
+            account, region, client = listings[listing]
+            try:
+                arns = listing.result()
+            except Exception as e:
+                print(f"Error listing ACM certificates in {account}/{region}: {e}", file=sys.stderr)
+                continue
+            for arn in arns:
+                describes[executor.submit(_describe, client, arn, account, region)] = arn
+
+        for future in as_completed(describes):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"Error describing {describes[future]}: {e}", file=sys.stderr)
+
+def get_cert_domains():
+    return list(iter_cert_domains())
+
+discover = get_cert_domains
 
 if __name__ == '__main__':
     print(json.dumps(get_cert_domains()))
@@ -1,18 +1,132 @@
-from azure.identity import DefaultAzureCredential
-from azure.mgmt.web import WebSiteManagementClient
-import os
 import json
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from discovery import shared_credentials
+
+# ------------------------------------------------------------------------------
+# Domain extractors per surface
+# ------------------------------------------------------------------------------
+# Each takes a management client, so it can be driven by recorded API responses.
+
+def _record(hostname, subscription, surface, expires_at=None, **extra):
+    record = {"hostname": hostname, "source": "azure", "subscription": subscription, "surface": surface}
+    if expires_at:
+        record["expires_at"] = expires_at
+    record.update(extra)
+    return record
+
+def _resource_group(resource_id):
+    parts = resource_id.split('/')
+    lowered = [part.lower() for part in parts]
+    return parts[lowered.index('resourcegroups') + 1]
+
+def app_service_domains(client, subscription):
+    """App Service certificates (WebSiteManagementClient), one record per host name"""
+    return [_record(host, subscription, 'app_service',
+                    cert.expiration_date.isoformat() if cert.expiration_date else None,
+                    certificate=cert.name, thumbprint=cert.thumbprint)
+            for cert in client.certificates.list()
+            for host in cert.host_names or []]
+
+def app_gateway_domains(client, subscription):
+    """HTTPS listener host names of Application Gateways (NetworkManagementClient).
+
+    Listener certificates are only exposed as PKCS#7 blobs, so these hosts
+    carry no expiry and are probed.
+    """
+    domains = []
+    for gateway in client.application_gateways.list_all():
+        for listener in gateway.http_listeners or []:
+            if (listener.protocol or '').lower() != 'https':
+                continue
+            for host in listener.host_names or ([listener.host_name] if listener.host_name else []):
+                domains.append(_record(host, subscription, 'app_gateway', gateway=gateway.name))
+    return domains
+
+def front_door_domains(client, subscription):
+    """Custom domains of Front Door Standard/Premium profiles (CdnManagementClient), with secret expiry"""
+    domains = []
+    for profile in client.profiles.list():
+        if not (profile.sku and 'AzureFrontDoor' in (profile.sku.name or '')):
+            continue
+        resource_group = _resource_group(profile.id)
+        expiry = {}
+        for secret in client.secrets.list_by_profile(resource_group, profile.name):
+            expiration_date = getattr(secret.parameters, 'expiration_date', None)
+            expiry[secret.id.lower()] = expiration_date.isoformat() if expiration_date else None
+        for domain in client.afd_custom_domains.list_by_profile(resource_group, profile.name):
+            secret = domain.tls_settings.secret if domain.tls_settings else None
+            domains.append(_record(domain.host_name, subscription, 'front_door',
+                                   expiry.get(secret.id.lower()) if secret and secret.id else None,
+                                   profile=profile.name))
+    return domains
+
+# ------------------------------------------------------------------------------
+# Clients, imported per surface so only the SDKs in use are loaded
+# ------------------------------------------------------------------------------
+def _web_client(credential, subscription):
+    from azure.mgmt.web import WebSiteManagementClient
+    return WebSiteManagementClient(credential, subscription)
+
+def _network_client(credential, subscription):
+    from azure.mgmt.network import NetworkManagementClient
+    return NetworkManagementClient(credential, subscription)
+
+def _cdn_client(credential, subscription):
+    from azure.mgmt.cdn import CdnManagementClient
+    return CdnManagementClient(credential, subscription)
+
+SURFACES = {
+    'app_service': (_web_client, app_service_domains),
+    'app_gateway': (_network_client, app_gateway_domains),
+    'front_door': (_cdn_client, front_door_domains)
+}
+
+def _subscriptions(credential):
+    """AZURE_SUBSCRIPTION_IDS, or every enabled subscription the credential can see when it is '*'"""
+    configured = [s.strip() for s in SSLConfig.AZURE_SUBSCRIPTION_IDS if s.strip()]
+    if configured != ['*']:
+        return configured
+    from azure.mgmt.resource import SubscriptionClient
+    return [s.subscription_id for s in SubscriptionClient(credential).subscriptions.list()
+            if s.state in (None, 'Enabled')]
+
+def _discover(surface, credential, subscription):
+    make_client, extract = SURFACES[surface]
+    return extract(make_client(credential, subscription), subscription)
+
+def iter_cert_domains(credential=None):
+    """Yield domains from every surface of every subscription as each listing completes.
+
+    One task per (subscription, surface) runs on a pool of
+    AZURE_DISCOVERY_WORKERS threads sharing a single credential, so wall
+    time stays close to the slowest listing as subscriptions are added.
+    """
+    if credential is None:
+        credential = shared_credentials('azure')
 
-subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID")
-credential = DefaultAzureCredential()
-client = WebSiteManagementClient(credential, subscription_id)
+    surfaces = [s.strip() for s in SSLConfig.AZURE_DISCOVERY_SURFACES if s.strip() in SURFACES]
+    with ThreadPoolExecutor(max_workers=SSLConfig.AZURE_DISCOVERY_WORKERS) as executor:
+        futures = {executor.submit(_discover, surface, credential, subscription): (subscription, surface)
+                   for subscription in _subscriptions(credential)
+                   for surface in surfaces}
+        for future in as_completed(futures):
+            subscription, surface = futures[future]
+            try:
+                yield from future.result()
+            except Exception as e:
+                print(f"Error listing Azure {surface} in {subscription}: {e}", file=sys.stderr)
 
-certs = []
+def get_cert_domains():
+    return list(iter_cert_domains())
 
-for cert in client.certificates.list():
-    certs.append({
-        "hostname": cert.host_names[0] if cert.host_names else "unknown",
-        "expires_at": cert.expiration_date.isoformat()
-    })
+discover = get_cert_domains
 
-print(json.dumps(certs))
+if __name__ == '__main__':
+    print(json.dumps(get_cert_domains()))
@@ -0,0 +1,44 @@
+import json
+import sys
+import os
+
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from cert_parser import ParseCache, certificate_domains, load_certificates
+
+CERT_EXTENSIONS = ('.pem', '.crt', '.cer', '.der')
+
+def _cert_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(CERT_EXTENSIONS):
+                        yield os.path.join(root, name)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            print(f"Certificate path not found: {path}", file=sys.stderr)
+
+def discover_file_domains():
+    """Read leaf certificates from PEM/DER files or directories, without network I/O"""
+    parsed = ParseCache()
+    domains = []
+    for path in _cert_files(p.strip() for p in SSLConfig.CERT_PATHS if p.strip()):
+        try:
+            with open(path, 'rb') as f:
+                certs = load_certificates(f.read())
+            if certs:
+                # The first certificate of a bundle is the leaf
+                domains.extend(certificate_domains(parsed.parse(certs[0]), source="file", path=path))
+        except Exception as e:
+            print(f"Error reading certificate {path}: {e}", file=sys.stderr)
+    return domains
+
+discover = discover_file_domains
+
+if __name__ == '__main__':
+    domains = discover_file_domains()
+    print(json.dumps(domains))
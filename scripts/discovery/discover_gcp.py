@@ -1,15 +1,108 @@
-from google.cloud import compute_v1
-import os
 import json
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from discovery import shared_credentials
+
+# ------------------------------------------------------------------------------
+# Domain extractors per surface
+# ------------------------------------------------------------------------------
+# Each takes an API client, so it can be driven by recorded API responses.
+
+def _record(hostname, project, surface, expires_at=None, **extra):
+    record = {"hostname": hostname, "source": "gcp", "project": project, "surface": surface}
+    if expires_at:
+        record["expires_at"] = expires_at
+    record.update(extra)
+    return record
+
+def ssl_certificate_domains(client, project):
+    """Global and regional Compute SSL certificates in one aggregated listing.
+
+    Managed certificates report their configured domains, self-managed ones
+    their SANs. Managed certs still provisioning have no expire_time yet and
+    are probed.
+    """
+    domains = []
+    for scope, scoped in client.aggregated_list(project=project):
+        for cert in scoped.ssl_certificates:
+            names = list(cert.managed.domains) if cert.type_ == 'MANAGED' else []
+            for name in names or list(cert.subject_alternative_names):
+                domains.append(_record(name, project, 'compute', cert.expire_time or None,
+                                       certificate=cert.name, scope=scope))
+    return domains
+
+def certificate_manager_domains(client, project):
+    """Certificate Manager certificates in every location"""
+    return [_record(name, project, 'certificate_manager',
+                    cert.expire_time.isoformat() if cert.expire_time else None,
+                    certificate=cert.name)
+            for cert in client.list_certificates(parent=f"projects/{project}/locations/-")
+            for name in list(cert.san_dnsnames) or list(cert.managed.domains)]
+
+# ------------------------------------------------------------------------------
+# Clients, imported per surface so only the SDKs in use are loaded
+# ------------------------------------------------------------------------------
+def _compute_client(credentials):
+    from google.cloud import compute_v1
+    return compute_v1.SslCertificatesClient(credentials=credentials)
+
+def _certificate_manager_client(credentials):
+    from google.cloud import certificate_manager_v1
+    return certificate_manager_v1.CertificateManagerClient(credentials=credentials)
+
+SURFACES = {
+    'compute': (_compute_client, ssl_certificate_domains),
+    'certificate_manager': (_certificate_manager_client, certificate_manager_domains)
+}
+
+def _projects(credentials):
+    """GCP_PROJECTS, or every active project the credentials can see when it is '*'"""
+    configured = [p.strip() for p in SSLConfig.GCP_PROJECTS if p.strip()]
+    if configured != ['*']:
+        return configured
+    from google.cloud import resourcemanager_v3
+    client = resourcemanager_v3.ProjectsClient(credentials=credentials)
+    return [project.project_id for project in client.search_projects(query='state:ACTIVE')]
+
+def iter_cert_domains(credentials=None):
+    """Yield domains from every surface of every project as each listing completes.
+
+    Clients are thread-safe and built once per surface; one task per
+    (project, surface) runs on a pool of GCP_DISCOVERY_WORKERS threads, so
+    wall time stays close to the slowest listing as projects are added.
+    """
+    if credentials is None:
+        credentials = shared_credentials('gcp')
+
+    clients = {}
+    for surface in (s.strip() for s in SSLConfig.GCP_DISCOVERY_SURFACES):
+        if surface in SURFACES:
+            try:
+                clients[surface] = SURFACES[surface][0](credentials)
+            except Exception as e:
+                print(f"Error creating GCP {surface} client: {e}", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=SSLConfig.GCP_DISCOVERY_WORKERS) as executor:
+        futures = {executor.submit(SURFACES[surface][1], client, project): (project, surface)
+                   for project in _projects(credentials)
+                   for surface, client in clients.items()}
+        for future in as_completed(futures):
+            project, surface = futures[future]
+            try:
+                yield from future.result()
+            except Exception as e:
+                print(f"Error listing GCP {surface} certificates in {project}: {e}", file=sys.stderr)
 
-project = os.getenv("GCP_PROJECT")
-client = compute_v1.SslCertificatesClient()
+def get_cert_domains():
+    return list(iter_cert_domains())
 
-certs = []
-for cert in client.list(project=project):
-    certs.append({
-        "hostname": cert.name,
-        "expires_at": cert.expire_time  # RFC3339 format
-    })
+discover = get_cert_domains
 
-print(json.dumps(certs))
+if __name__ == '__main__':
+    print(json.dumps(get_cert_domains()))
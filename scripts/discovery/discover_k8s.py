@@ -1,35 +1,160 @@
-from kubernetes import client, config
 import json
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 # Import configuration
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config import SSLConfig
 
+class _Expired(Exception):
+    """The stored resourceVersion is too old to watch from; a relist is needed"""
+
+class IngressIndex:
+    """In-memory namespace/name -> TLS hosts index for one kube context.
+
+    The first sync lists every ingress page by page. Later syncs watch from
+    the stored resourceVersion so only ingresses changed since then are
+    processed.
+    """
+
+    def __init__(self, context, hosts=None, resource_version=None):
+        self.context = context
+        self.hosts = hosts or {}
+        self.resource_version = resource_version
+
+    @staticmethod
+    def _tls_hosts(ingress):
+        return [host for tls in ingress.spec.tls or [] for host in tls.hosts or []]
+
+    def relist(self, api, page_size):
+        hosts = {}
+        _continue = None
+        while True:
+            page = api.list_ingress_for_all_namespaces(limit=page_size, _continue=_continue)
+            for ingress in page.items:
+                hosts[f"{ingress.metadata.namespace}/{ingress.metadata.name}"] = self._tls_hosts(ingress)
+            _continue = page.metadata._continue
+            if not _continue:
+                break
+        self.hosts = hosts
+        self.resource_version = page.metadata.resource_version
+        return len(hosts)
+
+    def apply(self, event_type, ingress):
+        key = f"{ingress.metadata.namespace}/{ingress.metadata.name}"
+        if event_type == 'DELETED':
+            self.hosts.pop(key, None)
+        elif event_type in ('ADDED', 'MODIFIED'):
+            self.hosts[key] = self._tls_hosts(ingress)
+        self.resource_version = ingress.metadata.resource_version
+
+    def watch(self, api, timeout_seconds):
+        """Apply changes since resource_version until the watch times out; returns the change count"""
+        from kubernetes import watch
+        from kubernetes.client.rest import ApiException
+
+        changes = 0
+        stream = watch.Watch().stream(api.list_ingress_for_all_namespaces,
+                                      resource_version=self.resource_version,
+                                      timeout_seconds=timeout_seconds,
+                                      allow_watch_bookmarks=True)
+        try:
+            for event in stream:
+                if event['type'] == 'ERROR':
+                    raise _Expired(event['raw_object'].get('message'))
+                if event['type'] == 'BOOKMARK':
+                    self.resource_version = event['object'].metadata.resource_version
+                    continue
+                self.apply(event['type'], event['object'])
+                changes += 1
+        except ApiException as e:
+            if e.status == 410:
+                raise _Expired(e.reason)
+            raise
+        return changes
+
+    def sync(self, api, page_size, watch_seconds):
+        if self.resource_version and watch_seconds > 0:
+            try:
+                changes = self.watch(api, watch_seconds)
+                print(f"  {self.context}: {changes} ingress changes since last sync", file=sys.stderr)
+                return
+            except _Expired:
+                pass
+        count = self.relist(api, page_size)
+        print(f"  {self.context}: listed {count} ingresses", file=sys.stderr)
+
+    def domains(self):
+        domains = []
+        for key, hosts in self.hosts.items():
+            namespace, name = key.split('/', 1)
+            for host in hosts:
+                domains.append({
+                    "hostname": host,
+                    "source": "kubernetes",
+                    "context": self.context,
+                    "namespace": namespace,
+                    "ingress": name
+                })
+        return domains
+
+    def to_dict(self):
+        return {'resource_version': self.resource_version, 'hosts': self.hosts}
+
+# Indexes survive between calls in long-running processes such as the daemon
+_indexes = {}
+
+def _load_indexes():
+    if _indexes or not SSLConfig.K8S_INDEX_CACHE:
+        return
+    try:
+        with open(SSLConfig.K8S_INDEX_CACHE) as f:
+            for context, state in json.load(f).items():
+                _indexes[context] = IngressIndex(context, state['hosts'], state['resource_version'])
+    except (OSError, ValueError, KeyError):
+        pass
+
+def _save_indexes():
+    if not SSLConfig.K8S_INDEX_CACHE:
+        return
+    tmp = f"{SSLConfig.K8S_INDEX_CACHE}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({context: index.to_dict() for context, index in _indexes.items()}, f)
+    os.replace(tmp, SSLConfig.K8S_INDEX_CACHE)
+
+def _sync_context(context):
+    # Imported here so the runner can load this module without the kubernetes client
+    from kubernetes import client, config
+
+    api = client.NetworkingV1Api(config.new_client_from_config(context=context))
+    index = _indexes.get(context) or IngressIndex(context)
+    index.sync(api, SSLConfig.K8S_PAGE_SIZE, SSLConfig.K8S_WATCH_SECONDS)
+    return index
+
 def discover_k8s_domains():
     try:
-        config.load_kube_config(context=SSLConfig.K8S_CONTEXT)
-        v1 = client.NetworkingV1Api()
-        ingresses = v1.list_ingress_for_all_namespaces()
-        
+        contexts = [c.strip() for c in SSLConfig.K8S_CONTEXTS if c.strip()]
+        _load_indexes()
+
         domains = []
-        for ingress in ingresses.items:
-            if ingress.spec.tls:
-                for tls in ingress.spec.tls:
-                    for host in tls.hosts:
-                        domains.append({
-                            "hostname": host,
-                            "source": "kubernetes",
-                            "namespace": ingress.metadata.namespace,
-                            "ingress": ingress.metadata.name
-                        })
-        
+        with ThreadPoolExecutor(max_workers=max(1, len(contexts))) as executor:
+            for context, future in [(c, executor.submit(_sync_context, c)) for c in contexts]:
+                try:
+                    _indexes[context] = future.result()
+                except Exception as e:
+                    print(f"Error discovering Kubernetes domains in {context}: {e}", file=sys.stderr)
+                    continue
+                domains.extend(_indexes[context].domains())
+
+        _save_indexes()
         return domains
     except Exception as e:
         print(f"Error discovering Kubernetes domains: {e}", file=sys.stderr)
         return []
 
+discover = discover_k8s_domains
+
 if __name__ == '__main__':
     domains = discover_k8s_domains()
     print(json.dumps(domains))
@@ -0,0 +1,65 @@
+import base64
+import json
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from cert_parser import ParseCache, certificate_domains, load_certificates
+
+def _tls_secrets(context):
+    """Yield every kubernetes.io/tls secret in a context, page by page"""
+    from kubernetes import client, config
+
+    api = client.CoreV1Api(config.new_client_from_config(context=context))
+    _continue = None
+    while True:
+        page = api.list_secret_for_all_namespaces(field_selector='type=kubernetes.io/tls',
+                                                  limit=SSLConfig.K8S_PAGE_SIZE, _continue=_continue)
+        yield from page.items
+        _continue = page.metadata._continue
+        if not _continue:
+            return
+
+def _context_domains(context, parsed):
+    domains = []
+    for secret in _tls_secrets(context):
+        data = (secret.data or {}).get('tls.crt')
+        if not data:
+            continue
+        certs = load_certificates(base64.b64decode(data))
+        if not certs:
+            continue
+        cert = parsed.parse(certs[0])
+        domains.extend(certificate_domains(cert,
+                                           source="kubernetes-secret", context=context,
+                                           namespace=secret.metadata.namespace,
+                                           secret=secret.metadata.name))
+    return domains
+
+def discover_secret_domains():
+    """Decode certificates from TLS secrets offline, parsing each distinct cert once"""
+    try:
+        contexts = [c.strip() for c in SSLConfig.K8S_CONTEXTS if c.strip()]
+        parsed = ParseCache()
+
+        domains = []
+        with ThreadPoolExecutor(max_workers=max(1, len(contexts))) as executor:
+            for context, future in [(c, executor.submit(_context_domains, c, parsed)) for c in contexts]:
+                try:
+                    domains.extend(future.result())
+                except Exception as e:
+                    print(f"Error reading TLS secrets in {context}: {e}", file=sys.stderr)
+        return domains
+    except Exception as e:
+        print(f"Error reading Kubernetes TLS secrets: {e}", file=sys.stderr)
+        return []
+
+discover = discover_secret_domains
+
+if __name__ == '__main__':
+    domains = discover_secret_domains()
+    print(json.dumps(domains))
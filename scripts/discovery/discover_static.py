@@ -0,0 +1,23 @@
+import json
+import sys
+import os
+
+# Import configuration
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config import SSLConfig
+
+def discover_static_domains():
+    """Hosts listed one per line (host or host:port) in STATIC_HOSTS_FILE"""
+    try:
+        with open(SSLConfig.STATIC_HOSTS_FILE) as f:
+            return [{"hostname": line.strip(), "source": "static"}
+                    for line in f if line.strip() and not line.startswith('#')]
+    except Exception as e:
+        print(f"Error reading static hosts: {e}", file=sys.stderr)
+        return []
+
+discover = discover_static_domains
+
+if __name__ == '__main__':
+    domains = discover_static_domains()
+    print(json.dumps(domains))
@@ -1,41 +1,315 @@
-import boto3
+import codecs
+import fnmatch
 import json
+import re
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Import configuration
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config import SSLConfig
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from cert_parser import parse_certificate, pem_to_der
+from discovery import aws_client, shared_credentials
+
+# ------------------------------------------------------------------------------
+# Domain extractors per resource type
+# ------------------------------------------------------------------------------
+# Expiry dates in state are deliberately ignored: ACM and Google-managed certs
+# renew outside Terraform, so not_after/expire_time go stale until a refresh.
+
+def _acm_domains(attributes):
+    return [attributes.get('domain_name')] + list(attributes.get('subject_alternative_names') or [])
+
+def _cloudfront_domains(attributes):
+    return list(attributes.get('aliases') or [])
+
+def _google_managed_domains(attributes):
+    return [domain for managed in attributes.get('managed') or [] for domain in managed.get('domains') or []]
+
+def _google_ssl_domains(attributes):
+    domains = []
+    for der in pem_to_der((attributes.get('certificate') or '').encode()):
+        cert = parse_certificate(der)
+        domains.extend(cert['sans'] or [cert['subject_cn']])
+    return domains
+
+DOMAIN_EXTRACTORS = {
+    'aws_acm_certificate': _acm_domains,
+    'aws_cloudfront_distribution': _cloudfront_domains,
+    'google_compute_managed_ssl_certificate': _google_managed_domains,
+    'google_compute_ssl_certificate': _google_ssl_domains
+}
+
+# Listeners carry no domain of their own; HTTPS/TLS ones are joined to their
+# load balancer's DNS name once the whole state has been read
+LISTENER_TYPES = {'aws_lb_listener', 'aws_alb_listener'}
+LOAD_BALANCER_TYPES = {'aws_lb', 'aws_alb'}
+STATE_TYPES = set(DOMAIN_EXTRACTORS) | LISTENER_TYPES | LOAD_BALANCER_TYPES
+
+# ------------------------------------------------------------------------------
+# Streaming state parser
+# ------------------------------------------------------------------------------
+class _JSONStream:
+    """Incrementally decode JSON values from a byte stream.
+
+    Only the text of the value being decoded is buffered; consumed input is
+    dropped as the buffer is refilled. Values that are not wanted can be
+    skipped by scanning brackets and strings, without building objects.
+    """
+
+    WHITESPACE = ' \t\n\r'
+    # Whole strings, brackets, or a lone quote opening a string that runs past the buffer
+    TOKENS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"', re.S)
+
+    def __init__(self, stream, chunk_size=1 << 20):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size):
+        chunk = self.stream.read(size)
+        self.buf = self.buf[self.pos:] + self.utf8.decode(chunk or b'', final=not chunk)
+        self.pos = 0
+        self.eof = not chunk
+        return bool(chunk)
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in self.WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.chunk_size):
+                raise ValueError("Unexpected end of Terraform state")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in Terraform state at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may still be truncated
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow reads geometrically so a huge value is re-scanned O(log n) times
+            self._fill(size)
+            size *= 2
+
+    def skip(self):
+        """Move past the next value without decoding it"""
+        if self.peek() not in '{[':
+            self.value()  # scalars and strings are decoded in one call anyway
+            return
+        depth = 0
+        size = self.chunk_size
+        while True:
+            for match in self.TOKENS.finditer(self.buf, self.pos):
+                token = match.group()
+                if token == '"':
+                    # A string cut off by the end of the buffer; re-scan it once more is read,
+                    # growing reads so a huge string is re-scanned O(log n) times
+                    self.pos = match.start()
+                    size *= 2
+                    break
+                if token in '{[':
+                    depth += 1
+                elif token in '}]':
+                    depth -= 1
+                    if depth == 0:
+                        self.pos = match.end()
+                        return
+            else:
+                self.pos = len(self.buf)
+                size = self.chunk_size
+            if not self._fill(size):
+                raise ValueError("Unexpected end of Terraform state")
+
+    def resource(self, types):
+        """Decode one resource object, or skip the rest of it once its type is not in types"""
+        self.expect('{')
+        resource = {}
+        while self.peek() != '}':
+            if resource:
+                self.expect(',')
+            key = self.value()
+            self.expect(':')
+            if 'type' in resource and resource['type'] not in types:
+                self.skip()
+            else:
+                resource[key] = self.value()
+        self.pos += 1
+        return resource if resource.get('type') in types else None
+
+def iter_state_resources(stream, types=STATE_TYPES, chunk_size=1 << 20):
+    """Yield the top-level "resources" entries of the given types one at a time.
+
+    Other top-level values, such as outputs, and resources of other types are
+    skipped without being decoded. Terraform writes a resource's "type" before
+    its "instances", so an unwanted resource's instances are never built.
+    """
+    state = _JSONStream(stream, chunk_size)
+    state.expect('{')
+    if state.peek() == '}':
+        return
+    while True:
+        key = state.value()
+        state.expect(':')
+        if key != 'resources':
+            state.skip()
+        else:
+            state.expect('[')
+            if state.peek() == ']':
+                return
+            while True:
+                resource = state.resource(types)
+                if resource is not None:
+                    yield resource
+                if state.peek() == ']':
+                    return
+                state.expect(',')
+        if state.peek() == '}':
+            return
+        state.expect(',')
+
+def extract_domains(resources, state_key):
+    domains = []
+    load_balancers = {}
+    listeners = []
+
+    for resource in resources:
+        resource_type = resource.get('type')
+        instances = resource.get('instances', [])
+        if resource_type in LOAD_BALANCER_TYPES:
+            for instance in instances:
+                attributes = instance.get('attributes', {})
+                load_balancers[attributes.get('arn')] = attributes.get('dns_name')
+        elif resource_type in LISTENER_TYPES:
+            for instance in instances:
+                attributes = instance.get('attributes', {})
+                if attributes.get('protocol') in ('HTTPS', 'TLS'):
+                    listeners.append((resource, attributes))
+        elif resource_type in DOMAIN_EXTRACTORS:
+            for instance in instances:
+                for domain_name in DOMAIN_EXTRACTORS[resource_type](instance.get('attributes', {})):
+                    if domain_name:
+                        domains.append({
+                            "hostname": domain_name,
+                            "source": "terraform",
+                            "resource_type": resource_type,
+                            "resource_name": resource['name'],
+                            "state_key": state_key
+                        })
+
+    for resource, attributes in listeners:
+        dns_name = load_balancers.get(attributes.get('load_balancer_arn'))
+        if dns_name:
+            port = int(attributes.get('port') or 443)
+            domains.append({
+                # The checker probes host:port targets, so each listener is its own host
+                "hostname": dns_name if port == 443 else f"{dns_name}:{port}",
+                "port": port,
+                "source": "terraform",
+                "resource_type": resource['type'],
+                "resource_name": resource['name'],
+                "state_key": state_key
+            })
+    return domains
+
+# ------------------------------------------------------------------------------
+# State fetching with ETag cache
+# ------------------------------------------------------------------------------
+def _state_keys(s3, bucket):
+    """Expand TF_STATE_KEYS entries, which may be glob patterns, into object keys"""
+    keys = []
+    for pattern in (p.strip() for p in SSLConfig.TF_STATE_KEYS if p.strip()):
+        if not any(char in pattern for char in '*?['):
+            keys.append(pattern)
+            continue
+        prefix = pattern[:min(pattern.find(char) for char in '*?[' if char in pattern)]
+        for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+            keys.extend(obj['Key'] for obj in page.get('Contents', []) if fnmatch.fnmatchcase(obj['Key'], pattern))
+    return keys
+
+def _load_cache():
+    try:
+        with open(SSLConfig.TF_STATE_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache):
+    tmp = f"{SSLConfig.TF_STATE_CACHE}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, SSLConfig.TF_STATE_CACHE)
+
+def _fetch_state_domains(s3, bucket, key, cached):
+    """Return (etag, domains) for one state, or the cached entry if unchanged"""
+    request = {'Bucket': bucket, 'Key': key}
+    if cached:
+        request['IfNoneMatch'] = cached['etag']
+    try:
+        response = s3.get_object(**request)
+    except s3.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('304', 'NotModified'):
+            return cached['etag'], cached['domains']
+        raise
+    body = response['Body']
+    try:
+        return response['ETag'], extract_domains(iter_state_resources(body), key)
+    finally:
+        body.close()
 
 def discover_tf_domains():
     try:
         if not SSLConfig.TF_STATE_BUCKET:
             print("TF_STATE_BUCKET not configured", file=sys.stderr)
             return []
-        
-        s3 = boto3.client('s3', region_name=SSLConfig.AWS_REGION)
-        state_file = s3.get_object(Bucket=SSLConfig.TF_STATE_BUCKET, Key=SSLConfig.TF_STATE_KEY)['Body'].read()
-        state_json = json.loads(state_file)
-        
+
+        # boto3 loads with the session here, so plan parsing (change_scope) stays light
+        s3 = aws_client(shared_credentials('aws'), 's3', region_name=SSLConfig.AWS_REGION)
+        bucket = SSLConfig.TF_STATE_BUCKET
+        keys = _state_keys(s3, bucket)
+        cache = _load_cache() if SSLConfig.TF_STATE_CACHE else {}
+        fresh_cache = {}
+
         domains = []
-        for resource in state_json.get('resources', []):
-            if resource['type'] == 'aws_acm_certificate':
-                for instance in resource['instances']:
-                    attributes = instance.get('attributes', {})
-                    domain_name = attributes.get('domain_name')
-                    if domain_name:
-                        domains.append({
-                            "hostname": domain_name,
-                            "source": "terraform",
-                            "resource_type": resource['type'],
-                            "resource_name": resource['name']
-                        })
-        
+        with ThreadPoolExecutor(max_workers=SSLConfig.TF_STATE_WORKERS) as executor:
+            futures = {executor.submit(_fetch_state_domains, s3, bucket, key, cache.get(key)): key for key in keys}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    etag, state_domains = future.result()
+                except Exception as e:
+                    print(f"Error retrieving Terraform state {key}: {e}", file=sys.stderr)
+                    continue
+                fresh_cache[key] = {'etag': etag, 'domains': state_domains}
+                domains.extend(state_domains)
+
+        if SSLConfig.TF_STATE_CACHE:
+            _save_cache(fresh_cache)
         return domains
     except Exception as e:
         print(f"Error retrieving Terraform state: {e}", file=sys.stderr)
         return []
 
+discover = discover_tf_domains
+
 if __name__ == '__main__':
     domains = discover_tf_domains()
     print(json.dumps(domains))
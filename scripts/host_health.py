@@ -0,0 +1,136 @@
+"""
+Per-host probe health
+
+Keeps a smoothed connect and handshake latency per host, the way TCP
+estimates its retransmission timeout, and a consecutive-failure count that
+drives a circuit breaker. State lives in SQLite and is held in memory for
+the duration of a run; call save() to persist it.
+"""
+
+import sqlite3
+import time
+from typing import Dict, Any, Optional, Tuple
+
+HOUR = 3600
+# Latency samples needed before timeouts are tightened below the base timeout
+MIN_SAMPLES = 3
+
+COLUMNS = ('hostname', 'connect_srtt', 'connect_rttvar', 'handshake_srtt', 'handshake_rttvar',
+           'samples', 'failures', 'next_probe', 'last_error', 'updated')
+
+def _smooth(srtt: Optional[float], rttvar: Optional[float], sample: float) -> Tuple[float, float]:
+    """RFC 6298 smoothing of a latency sample in ms"""
+    if srtt is None:
+        return sample, sample / 2
+    return 0.875 * srtt + 0.125 * sample, 0.75 * rttvar + 0.25 * abs(srtt - sample)
+
+class HostHealth:
+    """Latency history and circuit breaker state for every probed host.
+
+    Timeouts are three times srtt + 4 * rttvar, clamped between
+    min_timeout and base_timeout. After failure_threshold consecutive
+    failed runs a host's breaker opens. It is then probed only every
+    breaker_hours, doubling per further failure up to max_breaker_hours,
+    until a probe succeeds again.
+    """
+
+    def __init__(self, path: str, base_timeout: float, min_timeout: float = 1.0,
+                 failure_threshold: int = 3, breaker_hours: float = 24, max_breaker_hours: float = 168,
+                 ttl_days: int = 30):
+        self.ttl_days = ttl_days
+        self.base_timeout = base_timeout
+        self.min_timeout = min(min_timeout, base_timeout)
+        self.failure_threshold = failure_threshold
+        self.breaker_hours = breaker_hours
+        self.max_breaker_hours = max_breaker_hours
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS health (
+                hostname TEXT PRIMARY KEY,
+                connect_srtt REAL,
+                connect_rttvar REAL,
+                handshake_srtt REAL,
+                handshake_rttvar REAL,
+                samples INTEGER NOT NULL,
+                failures INTEGER NOT NULL,
+                next_probe REAL,
+                last_error TEXT,
+                updated REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.hosts: Dict[str, Dict[str, Any]] = {
+            row[0]: dict(zip(COLUMNS, row))
+            for row in self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM health")
+        }
+        self.dirty = set()
+
+    def _timeout(self, srtt: Optional[float], rttvar: Optional[float]) -> float:
+        if srtt is None:
+            return self.base_timeout
+        return max(self.min_timeout, min(self.base_timeout, 3 * (srtt + 4 * rttvar) / 1000))
+
+    def timeouts(self, hostname: str) -> Tuple[Optional[float], Optional[float]]:
+        """(connect, handshake) timeouts in seconds, or (None, None) without enough history"""
+        health = self.hosts.get(hostname)
+        if not health or health['samples'] < MIN_SAMPLES:
+            return None, None
+        return (self._timeout(health['connect_srtt'], health['connect_rttvar']),
+                self._timeout(health['handshake_srtt'], health['handshake_rttvar']))
+
+    def is_open(self, hostname: str) -> bool:
+        health = self.hosts.get(hostname)
+        return bool(health) and health['failures'] >= self.failure_threshold
+
+    def allows(self, hostname: str, now: Optional[float] = None) -> bool:
+        """Whether the host may be probed now; false while its breaker is open and not yet due"""
+        if not self.is_open(hostname):
+            return True
+        now = time.time() if now is None else now
+        return (self.hosts[hostname]['next_probe'] or 0) <= now
+
+    def get(self, hostname: str) -> Optional[Dict[str, Any]]:
+        return self.hosts.get(hostname)
+
+    def record(self, hostname: str, result: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Fold one check result into the host's latency history and failure count"""
+        now = time.time() if now is None else now
+        health = self.hosts.setdefault(hostname, dict(dict.fromkeys(COLUMNS), hostname=hostname,
+                                                      samples=0, failures=0))
+
+        if result.get('expiry_date'):
+            if result.get('connect_ms') is not None:
+                health['connect_srtt'], health['connect_rttvar'] = _smooth(
+                    health['connect_srtt'], health['connect_rttvar'], result['connect_ms'])
+            if result.get('handshake_ms') is not None:
+                health['handshake_srtt'], health['handshake_rttvar'] = _smooth(
+                    health['handshake_srtt'], health['handshake_rttvar'], result['handshake_ms'])
+            health['samples'] += 1
+            health['failures'] = 0
+            health['next_probe'] = None
+            health['last_error'] = None
+        else:
+            health['failures'] += 1
+            health['last_error'] = result.get('error')
+            if health['failures'] >= self.failure_threshold:
+                backoff = self.breaker_hours * 2 ** (health['failures'] - self.failure_threshold)
+                health['next_probe'] = now + min(backoff, self.max_breaker_hours) * HOUR
+
+        health['updated'] = now
+        self.dirty.add(hostname)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO health ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [tuple(self.hosts[hostname][c] for c in COLUMNS) for hostname in self.dirty])
+        self.conn.commit()
+        self.dirty.clear()
+
+    def close(self) -> None:
+        self.save()
+        # Hosts not checked for ttl_days have left the inventory
+        self.conn.execute("DELETE FROM health WHERE updated < ?", (time.time() - self.ttl_days * 86400,))
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,219 @@
+"""
+SAN-aware inventory index
+
+Merges discovery records for the same host from every provider, and
+remembers which certificate each host served on which endpoint. Hosts
+that were last seen serving the same certificate from the same endpoint
+form a group; only one representative per group is probed and its result
+is fanned out to the rest. Members are still probed directly now and then,
+so one that starts serving its own certificate leaves the group.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from cert_parser import parse_expiry
+
+def normalize_hostname(hostname: str) -> str:
+    """Lower-case, strip whitespace and the trailing root dot, and IDNA-encode"""
+    hostname = hostname.strip().rstrip('.').lower()
+    try:
+        return hostname.encode('idna').decode('ascii')
+    except UnicodeError:
+        return hostname
+
+def split_target(target, default_port=443):
+    """Split 'host', 'host:port' or '[v6]:port' into (host, port)"""
+    if target.startswith('['):
+        host, _, rest = target[1:].partition(']')
+        return host, int(rest[1:]) if rest.startswith(':') else default_port
+    if target.count(':') == 1:
+        host, port = target.split(':')
+        return host, int(port)
+    return target, default_port
+
+def san_matches(san: str, hostname: str) -> bool:
+    """Whether a certificate SAN covers hostname; wildcards match one left-most label"""
+    if san == hostname:
+        return True
+    if san.startswith('*.'):
+        label, _, rest = hostname.partition('.')
+        return bool(label) and label != '*' and rest == san[2:]
+    return False
+
+def _earliest(records: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The record reporting the earliest parseable expires_at, if any"""
+    dated = []
+    for record in records:
+        try:
+            dated.append((parse_expiry(record['expires_at']), record))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return min(dated, key=lambda pair: pair[0])[1] if dated else None
+
+class InventoryIndex:
+    """Hostname -> merged provenance, plus hostname -> (endpoint, fingerprint) and fingerprint -> SANs"""
+
+    def __init__(self, path: Optional[str] = None, reverify_hours: float = 168):
+        self.path = path
+        self.reverify_hours = reverify_hours
+        self.served: Dict[str, Dict[str, str]] = {}
+        self.certs: Dict[str, List[str]] = {}
+        if path:
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+                self.served = state['served']
+                self.certs = state['certs']
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def merge(self, domains: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One record per normalised hostname, listing every source that reported it.
+
+        Where several providers report an expiry, the earliest is kept.
+        """
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for domain in domains:
+            hostname = normalize_hostname(domain.get('hostname') or '')
+            if hostname:
+                grouped.setdefault(hostname, []).append(domain)
+
+        # Hosts that left the inventory no longer anchor a group
+        self.served = {h: served for h, served in self.served.items() if h in grouped}
+
+        merged = []
+        for hostname, records in grouped.items():
+            record = dict(records[0], hostname=hostname)
+            record['sources'] = [{k: v for k, v in r.items() if k != 'hostname'} for r in records]
+            earliest = _earliest(records)
+            if earliest:
+                record['expires_at'] = earliest['expires_at']
+                record['fingerprint'] = earliest.get('fingerprint')
+            merged.append(record)
+        return merged
+
+    def plan(self, domains: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]], List[Dict[str, Any]]]:
+        """Split hosts due for a probe into (to_probe, members_by_representative, wildcards).
+
+        Hosts never probed before are probed themselves, as are members not
+        verified directly within reverify_hours. Wildcard names cannot be
+        connected to, so they are only covered by a probed certificate's SANs.
+        """
+        now = time.time()
+        to_probe = []
+        wildcards = []
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for domain in domains:
+            served = self.served.get(domain['hostname'])
+            if domain['hostname'].startswith('*.'):
+                wildcards.append(domain)
+            elif domain.get('verify_sample'):
+                to_probe.append(domain)  # sampled to check the served cert, so never covered by another host
+            elif served and self._covers(served['fingerprint'], domain['hostname']):
+                groups.setdefault((served['endpoint'], served['fingerprint']), []).append(domain)
+            else:
+                to_probe.append(domain)
+
+        members = {}
+        for group in groups.values():
+            group.sort(key=lambda d: d['hostname'])
+            to_probe.append(group[0])
+            covered = []
+            for domain in group[1:]:
+                (to_probe if self._reverify_due(domain['hostname'], now) else covered).append(domain)
+            if covered:
+                members[group[0]['hostname']] = covered
+        return to_probe, members, wildcards
+
+    def _reverify_due(self, hostname: str, now: float) -> bool:
+        """Whether a member's own certificate is due a direct look.
+
+        The interval is jittered per host between half and all of
+        reverify_hours, so a group formed in one run is re-verified a few
+        members at a time rather than all at once.
+        """
+        jitter = int.from_bytes(hashlib.blake2b(hostname.encode(), digest_size=2).digest(), 'big') / 0xffff
+        interval = self.reverify_hours * 3600 * (0.5 + jitter / 2)
+        return now - self.served[hostname].get('verified_at', 0) >= interval
+
+    def _covers(self, fingerprint: str, hostname: str) -> bool:
+        host = split_target(hostname)[0]
+        return any(san_matches(san, host) for san in self.certs.get(fingerprint, []))
+
+    def fan_out(self, results: List[Dict[str, Any]],
+                members: Dict[str, List[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Copy each representative's result to its group, returning (results, members_to_probe).
+
+        Members are only covered while the representative still serves the
+        certificate the group was formed on; otherwise they are probed.
+        Covered members are reported with checked_via 'representative' until
+        they are next verified directly.
+        """
+        fanned = []
+        stale = []
+        for result in results:
+            group = members.get(result['hostname'])
+            if not group:
+                continue
+            previous = self.served.get(result['hostname'], {}).get('fingerprint')
+            if result.get('fingerprint') is None or result['fingerprint'] != previous:
+                stale.extend(group)
+                continue
+            for domain in group:
+                fanned.append(dict(result, hostname=domain['hostname'], representative=result['hostname'],
+                                   checked_via='representative'))
+        return fanned, stale
+
+    def cover_wildcards(self, wildcards: List[Dict[str, Any]],
+                        results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Results for wildcard names, taken from a probed cert whose SANs list them"""
+        by_san = {}
+        for result in results:
+            for san in result.get('sans') or []:
+                by_san.setdefault(normalize_hostname(san), result)
+
+        covered = []
+        for domain in wildcards:
+            result = by_san.get(domain['hostname'])
+            if result:
+                covered.append(dict(result, hostname=domain['hostname'], representative=result['hostname']))
+            else:
+                covered.append({
+                    "hostname": domain['hostname'],
+                    "expiry_date": None,
+                    "days_left": None,
+                    "status": "ERROR",
+                    "error": "Wildcard name cannot be probed and no probed certificate covers it",
+                    "checked_via": "probe"
+                })
+        return covered
+
+    def record(self, results: List[Dict[str, Any]]) -> None:
+        """Remember the endpoint, fingerprint and SANs of every direct probe"""
+        now = time.time()
+        for result in results:
+            if result.get('representative') or not result.get('fingerprint') or not result.get('addresses'):
+                continue
+            address = result['addresses'][0]
+            port = split_target(result['hostname'])[1]
+            self.served[result['hostname']] = {
+                'endpoint': f"[{address}]:{port}" if ':' in address else f"{address}:{port}",
+                'fingerprint': result['fingerprint'],
+                'verified_at': now
+            }
+            self.certs[result['fingerprint']] = sorted({normalize_hostname(s) for s in result.get('sans') or []})
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        # Certificates no host serves any more are dropped
+        live = {served['fingerprint'] for served in self.served.values()}
+        self.certs = {fp: sans for fp, sans in self.certs.items() if fp in live}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'served': self.served, 'certs': self.certs}, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,168 @@
+"""
+Per-endpoint politeness for concurrent probing
+
+Many hostnames resolve to the same ingress controller or load balancer.
+The scheduler hands out handshake slots so that no endpoint (IP, port)
+sees more than `per_endpoint` concurrent handshakes or more than `rate`
+new handshakes per second, while the global `concurrency` limit is spent
+on whichever endpoints can take more work. Endpoints with waiting probes
+are served round-robin, so one crowded load balancer cannot starve the
+rest of the inventory.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+IDLE, READY, CAPPED, DELAYED = range(4)
+
+class _Endpoint:
+    __slots__ = ('waiters', 'active', 'tat', 'state')
+
+    def __init__(self):
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.active = 0
+        # Theoretical arrival time of the next handshake (GCRA)
+        self.tat = 0.0
+        self.state = IDLE
+
+class EndpointScheduler:
+    """Fair handshake slots within global and per-endpoint limits.
+
+    Endpoints are in one of four states: IDLE (nothing waiting), READY
+    (waiting only for a global slot, queued round-robin), CAPPED (at
+    `per_endpoint` in flight, woken by its own releases) or DELAYED (rate
+    limited, woken by a timer). Only READY endpoints are ever scanned, so
+    granting a slot is O(1) however many endpoints are blocked. The rate
+    is a generic cell rate algorithm allowing bursts of `burst` handshakes.
+    """
+
+    def __init__(self, concurrency: int = 100, per_endpoint: Optional[int] = None,
+                 rate: Optional[float] = None, burst: Optional[int] = None):
+        self.free = concurrency
+        self.per_endpoint = per_endpoint or None
+        self.interval = 1 / rate if rate else 0.0
+        self.slack = (max(1, burst or per_endpoint or 1) - 1) * self.interval
+        self.endpoints: Dict[Hashable, _Endpoint] = {}
+        self.ready: Deque[Hashable] = deque()
+        self.delayed: List[Tuple[float, int, Hashable]] = []
+        self.sequence = itertools.count()
+        self.timer = None
+        self.sweep_at = 1024
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: Hashable):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release(key)
+
+    async def acquire(self, key: Hashable) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        endpoint = self.endpoints.get(key)
+        if endpoint is None:
+            if len(self.endpoints) >= self.sweep_at:
+                self._sweep(now)
+            endpoint = self.endpoints[key] = _Endpoint()
+        # Nothing queued for this endpoint and nothing blocked on a global slot: go straight in
+        if endpoint.state == IDLE and self.free and not self._capped(endpoint) and self._eligible(endpoint, now):
+            self._grant(endpoint, now)
+            return
+
+        waiter = loop.create_future()
+        endpoint.waiters.append(waiter)
+        if endpoint.state == IDLE:
+            self._place(key, endpoint, now)
+        self._dispatch(now)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just before the cancellation landed; hand the slot back
+                self.release(key)
+            raise
+
+    def release(self, key: Hashable) -> None:
+        endpoint = self.endpoints[key]
+        endpoint.active -= 1
+        self.free += 1
+        now = asyncio.get_running_loop().time()
+        if endpoint.state == CAPPED:
+            self._place(key, endpoint, now)
+        elif endpoint.state == IDLE and not endpoint.active and endpoint.tat <= now:
+            del self.endpoints[key]
+        self._dispatch(now)
+
+    def _sweep(self, now: float) -> None:
+        """Forget idle endpoints whose rate history has lapsed; amortised over new endpoints"""
+        for key in [key for key, e in self.endpoints.items() if e.state == IDLE and not e.active and e.tat <= now]:
+            del self.endpoints[key]
+        self.sweep_at = max(1024, 2 * len(self.endpoints))
+
+    def _capped(self, endpoint: _Endpoint) -> bool:
+        return self.per_endpoint is not None and endpoint.active >= self.per_endpoint
+
+    def _eligible(self, endpoint: _Endpoint, now: float) -> bool:
+        return endpoint.tat - self.slack <= now
+
+    def _grant(self, endpoint: _Endpoint, now: float) -> None:
+        endpoint.active += 1
+        self.free -= 1
+        if self.interval:
+            endpoint.tat = max(endpoint.tat, now) + self.interval
+
+    def _place(self, key: Hashable, endpoint: _Endpoint, now: float) -> None:
+        """Move an endpoint to the state its next waiter is blocked in"""
+        while endpoint.waiters and endpoint.waiters[0].done():
+            endpoint.waiters.popleft()  # cancelled while queued
+        if not endpoint.waiters:
+            endpoint.state = IDLE
+        elif self._capped(endpoint):
+            endpoint.state = CAPPED
+        elif not self._eligible(endpoint, now):
+            endpoint.state = DELAYED
+            heapq.heappush(self.delayed, (endpoint.tat - self.slack, next(self.sequence), key))
+            self._arm()
+        else:
+            endpoint.state = READY
+            self.ready.append(key)
+
+    def _dispatch(self, now: float) -> None:
+        while self.free and self.ready:
+            key = self.ready.popleft()
+            endpoint = self.endpoints[key]
+            endpoint.state = IDLE
+            while endpoint.waiters:
+                waiter = endpoint.waiters.popleft()
+                if not waiter.done():
+                    self._grant(endpoint, now)
+                    waiter.set_result(None)
+                    break
+            # Back of the queue, so every ready endpoint gets a slot before this one gets another
+            self._place(key, endpoint, now)
+
+    def _arm(self) -> None:
+        if not self.delayed:
+            return
+        when = self.delayed[0][0]
+        if self.timer is not None and self.timer.when() <= when:
+            return
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = asyncio.get_running_loop().call_at(when, self._wake)
+
+    def _wake(self) -> None:
+        self.timer = None
+        now = asyncio.get_running_loop().time()
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, key = heapq.heappop(self.delayed)
+            endpoint = self.endpoints.get(key)
+            if endpoint is not None and endpoint.state == DELAYED:
+                self._place(key, endpoint, now)
+        self._dispatch(now)
+        self._arm()
@@ -0,0 +1,64 @@
+"""
+Concurrent hostname resolution with a TTL cache
+
+Runs ahead of the probe engine so that slow resolvers never hold a
+handshake slot, and so every A/AAAA record of a host can be probed.
+"""
+
+import asyncio
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+class Resolver:
+    """Resolve hostnames on a dedicated thread pool, caching the answers.
+
+    getaddrinfo() does not expose record TTLs, so answers are kept for a
+    fixed `ttl` and failures for `negative_ttl`. Concurrent lookups of the
+    same name share a single query.
+    """
+
+    def __init__(self, ttl: float = 300, concurrency: int = 64, timeout: float = 10,
+                 negative_ttl: float = 30):
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.negative_ttl = negative_ttl
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='resolver')
+        self.cache = {}
+        self.pending = {}
+
+    async def resolve(self, hostname: str, port: int = 443) -> Tuple[List[str], float]:
+        """Return (unique addresses in resolver order, lookup time in ms); 0 ms on a cache hit"""
+        key = (hostname.lower(), port)
+        cached = self.cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            if isinstance(cached[1], Exception):
+                raise cached[1]
+            return cached[1], 0.0
+
+        start = time.perf_counter()
+        future = self.pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, socket.getaddrinfo,
+                                          hostname, port, 0, socket.SOCK_STREAM)
+            self.pending[key] = future
+            future.add_done_callback(lambda _: self.pending.pop(key, None))
+
+        try:
+            infos = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"DNS timeout resolving {hostname}")
+        except OSError as e:
+            error = Exception(f"DNS resolution failed for {hostname}: {e}")
+            self.cache[key] = (time.monotonic() + self.negative_ttl, error)
+            raise error
+
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self.cache[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses, (time.perf_counter() - start) * 1000
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+"""
+Persistent SSL check result cache
+
+Stores the last probe result for every hostname:port in SQLite so scheduled
+runs only re-probe hosts that are due. How soon a host is due again depends
+on how far its certificate, or the earliest-expiring certificate in its
+chain, is from SSL_THRESHOLD_DAYS.
+"""
+
+import json
+import sqlite3
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from cert_parser import evaluate_chain, evaluate_expiry
+from inventory_index import split_target
+
+DAY = 86400
+# Scheduled runs start within minutes of each other, not to the second
+SCHEDULE_SLACK = 3600
+
+# Served-certificate details kept with each row so a cache hit reports what a probe would
+DETAIL_FIELDS = ('sans', 'issuer', 'key', 'chain_length')
+CHAIN_COLUMNS = (('chain_expiry_date', 'TEXT'), ('chain_expiring', 'TEXT'), ('details', 'TEXT'))
+
+def endpoint_key(hostname: str, default_port: int = 443) -> str:
+    """'host:port' for a 'host', 'host:port' or '[v6]:port' target"""
+    try:
+        host, port = split_target(hostname, default_port)
+    except ValueError:
+        return hostname  # not a valid target; probes of it only ever record an error
+    return f"[{host}]:{port}" if ':' in host else f"{host}:{port}"
+
+def next_due_at(days_left: Optional[int], threshold_days: int, now: float,
+                near_days: int = 7, max_interval_hours: int = 168) -> float:
+    """Epoch time at which a host should be probed again.
+
+    Errors and certs within near_days of the threshold are due on every run.
+    Beyond that a cert is re-checked after half its remaining margin, so it
+    is always seen at least twice before it can cross the threshold, capped
+    at max_interval_hours (weekly by default) less SCHEDULE_SLACK, so that a
+    host is due again on the next run of that schedule. now should be the
+    run's start time.
+    """
+    if days_left is None:
+        return now
+    margin = days_left - threshold_days
+    if margin <= near_days:
+        return now
+    return now + min(margin * DAY / 2, max(0, max_interval_hours * 3600 - SCHEDULE_SLACK))
+
+def _days_left(result: Dict[str, Any]) -> Optional[int]:
+    """Days until the first certificate the host relies on expires, leaf or chain"""
+    if result.get('days_left') is None or result.get('chain_days_left') is None:
+        return result.get('days_left')
+    return min(result['days_left'], result['chain_days_left'])
+
+class ResultCache:
+    """SQLite-backed cache of the latest probe result per endpoint"""
+
+    def __init__(self, path: str, ttl_days: int = 30, max_entries: int = 100000,
+                 near_days: int = 7, max_interval_hours: int = 168):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.max_entries = max_entries
+        self.near_days = near_days
+        self.max_interval_hours = max_interval_hours
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                endpoint TEXT PRIMARY KEY,
+                hostname TEXT NOT NULL,
+                fingerprint TEXT,
+                expiry_date TEXT,
+                status TEXT,
+                last_checked REAL NOT NULL,
+                next_due REAL NOT NULL
+            )
+        """)
+        # Caches written before chain capture lack these columns
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+        for name, kind in CHAIN_COLUMNS:
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE results ADD COLUMN {name} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_checked ON results (last_checked)")
+        self.conn.commit()
+
+    def split_due(self, domains: List[Dict[str, Any]], threshold_days: int,
+                  now: Optional[float] = None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (cached_results, due_domains).
+
+        Cached results are re-evaluated against threshold_days so a changed
+        threshold or the passage of time is reflected without a probe.
+        """
+        now = time.time() if now is None else now
+        fresh = {
+            row[0]: row[1:]
+            for row in self.conn.execute(
+                "SELECT endpoint, fingerprint, expiry_date, last_checked, chain_expiry_date, chain_expiring, details "
+                "FROM results "
+                "WHERE next_due > ? AND expiry_date IS NOT NULL", (now,))
+        }
+
+        cached = []
+        due = []
+        for domain in domains:
+            row = fresh.get(endpoint_key(domain['hostname']))
+            if row is None:
+                due.append(domain)
+                continue
+            fingerprint, expiry_date, last_checked, chain_expiry_date, chain_expiring, details = row
+            result = evaluate_expiry(domain['hostname'], datetime.fromisoformat(expiry_date), threshold_days)
+            result['fingerprint'] = fingerprint
+            result.update(json.loads(details) if details else {})
+            if chain_expiry_date:
+                evaluate_chain(result, datetime.fromisoformat(chain_expiry_date), chain_expiring, threshold_days)
+            result['checked_via'] = 'cache'
+            result['last_checked'] = datetime.utcfromtimestamp(last_checked).isoformat()
+            cached.append(result)
+        return cached, due
+
+    def near_threshold(self, threshold_days: int, now: Optional[float] = None) -> List[str]:
+        """Hostnames whose last probe found a cert or chain within near_days of the threshold, or failing"""
+        now = time.time() if now is None else now
+        cutoff = datetime.utcfromtimestamp(now + (threshold_days + self.near_days) * DAY).isoformat()
+        return [row[0] for row in self.conn.execute(
+            "SELECT hostname FROM results WHERE expiry_date IS NOT NULL "
+            "AND min(expiry_date, coalesce(chain_expiry_date, expiry_date)) <= ?", (cutoff,))]
+
+    def store(self, results: List[Dict[str, Any]], threshold_days: int,
+              now: Optional[float] = None) -> None:
+        """Record fresh probe results and schedule each host's next check"""
+        now = time.time() if now is None else now
+        rows = [
+            (endpoint_key(r['hostname']), r['hostname'], r.get('fingerprint'), r.get('expiry_date'),
+             r.get('status'), now,
+             next_due_at(_days_left(r), threshold_days, now, self.near_days, self.max_interval_hours),
+             r.get('chain_expiry_date'), r.get('chain_expiring'),
+             json.dumps({k: r[k] for k in DETAIL_FIELDS if r.get(k) is not None}))
+            for r in results
+        ]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO results (endpoint, hostname, fingerprint, expiry_date, status, last_checked, "
+            "next_due, chain_expiry_date, chain_expiring, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.commit()
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop entries not checked within ttl_days, then the oldest beyond max_entries"""
+        now = time.time() if now is None else now
+        removed = self.conn.execute("DELETE FROM results WHERE last_checked < ?",
+                                    (now - self.ttl_days * DAY,)).rowcount
+        removed += self.conn.execute("""
+            DELETE FROM results WHERE endpoint IN (
+                SELECT endpoint FROM results ORDER BY last_checked DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,)).rowcount
+        self.conn.commit()
+        return removed
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Columnar history of check results
+
+Every full run is appended as one immutable file under SSL_HISTORY_PATH,
+partitioned by month (``2026-10/run-20261017T120000Z-<run_id>.sslh``).
+Each file stores its results column by column as typed arrays:
+hostnames, fingerprints and sources are dictionary-encoded, status is a
+one-byte code and days_left/expiry are machine integers. Columns are
+zlib-compressed individually, so a query only inflates the columns it
+reads, and runs outside a time window are skipped by partition name
+without being opened.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Iterable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SSLConfig
+
+MAGIC = b'SSLH1\n'
+DAY = 86400
+STATUSES = ('PASS', 'FAIL', 'ERROR', 'UNREACHABLE')
+FAILED_STATUSES = ('ERROR', 'UNREACHABLE')
+# Sentinel for a missing days_left / expiry
+MISSING = -2 ** 31
+
+COLUMNS = ('hostname', 'status', 'days_left', 'expiry', 'fingerprint', 'source', 'checked_via')
+# Stored as dictionary codes, with the dictionary kept beside the column
+ENCODED_COLUMNS = ('hostname', 'fingerprint', 'source', 'checked_via')
+
+def _encode(values: Iterable[Optional[str]]) -> tuple:
+    """Dictionary-encode strings; code 0 is reserved for None"""
+    dictionary = [None]
+    codes = {None: 0}
+    column = array('I')
+    for value in values:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(dictionary)
+            dictionary.append(value)
+        column.append(code)
+    return column, dictionary
+
+def _expiry_epoch(value: Optional[str]) -> int:
+    if not value:
+        return MISSING
+    return int(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp())
+
+class ResultBatch:
+    """The results of one run held as columns"""
+
+    def __init__(self, run_at: float, columns: Dict[str, array], dictionaries: Dict[str, list]):
+        self.run_at = run_at
+        self.columns = columns
+        self.dictionaries = dictionaries
+
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]], run_at: Optional[float] = None) -> 'ResultBatch':
+        run_at = time.time() if run_at is None else run_at
+        columns, dictionaries = {}, {}
+        for name in ENCODED_COLUMNS:
+            columns[name], dictionaries[name] = _encode(r.get(name) for r in results)
+        status_codes = {status: code for code, status in enumerate(STATUSES)}
+        columns['status'] = array('B', (status_codes.get(r.get('status'), status_codes['ERROR']) for r in results))
+        columns['days_left'] = array('i', (MISSING if r.get('days_left') is None else r['days_left']
+                                           for r in results))
+        columns['expiry'] = array('q', (_expiry_epoch(r.get('expiry_date')) for r in results))
+        return cls(run_at, columns, dictionaries)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), ()))
+
+    def values(self, name: str) -> Iterable[Optional[str]]:
+        """Decoded values of a dictionary-encoded column"""
+        return map(self.dictionaries[name].__getitem__, self.columns[name])
+
+    def status_counts(self) -> Dict[str, int]:
+        counts = Counter(self.columns['status'])
+        return {status: counts.get(code, 0) for code, status in enumerate(STATUSES)}
+
+    def rows_with_status(self, status: str) -> List[int]:
+        code = STATUSES.index(status)
+        return [i for i, value in enumerate(self.columns['status']) if value == code]
+
+    def crossing(self, days: int, threshold_days: int) -> List[tuple]:
+        """(hostname, days_left) of passing certs that will cross the threshold within `days`"""
+        hostnames = self.dictionaries['hostname']
+        host_codes = self.columns['hostname']
+        limit = threshold_days + days
+        return sorted(((hostnames[host_codes[i]], left) for i, left in enumerate(self.columns['days_left'])
+                       if threshold_days < left <= limit), key=lambda row: row[1])
+
+    def write(self, path: str) -> None:
+        header = {'run_at': self.run_at, 'rows': len(self), 'byteorder': sys.byteorder, 'columns': []}
+        blobs = []
+        for name, column in self.columns.items():
+            blob = zlib.compress(column.tobytes(), 6)
+            dictionary = b''
+            if name in self.dictionaries:
+                dictionary = zlib.compress(json.dumps(self.dictionaries[name], separators=(',', ':')).encode(), 6)
+            header['columns'].append({'name': name, 'typecode': column.typecode, 'length': len(blob),
+                                      'dictionary_length': len(dictionary)})
+            blobs.extend((blob, dictionary))
+        encoded = json.dumps(header, separators=(',', ':')).encode()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, path)
+
+    @classmethod
+    def read(cls, path: str, names: Optional[Iterable[str]] = None) -> 'ResultBatch':
+        """Load a run, inflating only the named columns"""
+        names = set(names or COLUMNS)
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a result history file")
+            header = json.loads(f.read(struct.unpack('<I', f.read(4))[0]))
+            columns, dictionaries = {}, {}
+            for meta in header['columns']:
+                if meta['name'] not in names:
+                    f.seek(meta['length'] + meta['dictionary_length'], os.SEEK_CUR)
+                    continue
+                column = array(meta['typecode'])
+                column.frombytes(zlib.decompress(f.read(meta['length'])))
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                columns[meta['name']] = column
+                if meta['dictionary_length']:
+                    dictionaries[meta['name']] = json.loads(zlib.decompress(f.read(meta['dictionary_length'])))
+        return cls(header['run_at'], columns, dictionaries)
+
+class HistoryStore:
+    """Append-only, month-partitioned directory of run files"""
+
+    def __init__(self, path: str, retention_days: int = 400):
+        self.path = path
+        self.retention_days = retention_days
+
+    def append(self, batch: ResultBatch, run_id: str) -> str:
+        stamp = datetime.fromtimestamp(batch.run_at, timezone.utc)
+        partition = os.path.join(self.path, stamp.strftime('%Y-%m'))
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"run-{stamp.strftime('%Y%m%dT%H%M%SZ')}-{run_id}.sslh")
+        batch.write(path)
+        return path
+
+    def runs(self, since: Optional[float] = None) -> List[str]:
+        """Run files in time order, optionally only those at or after `since`"""
+        if not os.path.isdir(self.path):
+            return []
+        since_stamp = datetime.fromtimestamp(since, timezone.utc) if since is not None else None
+        files = []
+        for partition in sorted(os.listdir(self.path)):
+            if since_stamp and partition < since_stamp.strftime('%Y-%m'):
+                continue
+            directory = os.path.join(self.path, partition)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.sslh') and (not since_stamp or name[4:20] >= since_stamp.strftime('%Y%m%dT%H%M%SZ')):
+                    files.append(os.path.join(directory, name))
+        return files
+
+    def latest(self, names: Optional[Iterable[str]] = None) -> Optional[ResultBatch]:
+        runs = self.runs()
+        return ResultBatch.read(runs[-1], names) if runs else None
+
+    def fingerprint_changes(self, since: float) -> List[tuple]:
+        """(run time, hostname, old fingerprint, new fingerprint) for every served cert change"""
+        last: Dict[str, str] = {}
+        changes = []
+        for path in self.runs(since):
+            batch = ResultBatch.read(path, ('hostname', 'fingerprint'))
+            served = dict(zip(batch.values('hostname'), batch.values('fingerprint')))
+            served.pop(None, None)
+            changes.extend((batch.run_at, hostname, last[hostname], fingerprint)
+                           for hostname, fingerprint in served.items()
+                           if fingerprint and last.get(hostname, fingerprint) != fingerprint)
+            last.update((hostname, fingerprint) for hostname, fingerprint in served.items() if fingerprint)
+        return changes
+
+    def error_rate_by_source(self, since: float) -> Dict[str, tuple]:
+        """{source: (failed checks, total checks)} across runs since `since`"""
+        failed_codes = {STATUSES.index(status) for status in FAILED_STATUSES}
+        totals, failed = Counter(), Counter()
+        for path in self.runs(since):
+            batch = ResultBatch.read(path, ('status', 'source'))
+            sources = batch.dictionaries['source']
+            # Count (source, status) code pairs first; names are only looked up per distinct pair
+            for (source_code, status), count in Counter(zip(batch.columns['source'], batch.columns['status'])).items():
+                source = sources[source_code] or 'unknown'
+                totals[source] += count
+                if status in failed_codes:
+                    failed[source] += count
+        return {source: (failed[source], total) for source, total in totals.items()}
+
+    def trend(self, since: float) -> List[tuple]:
+        """(run time, status counts) per run"""
+        return [(batch.run_at, batch.status_counts())
+                for batch in (ResultBatch.read(path, ('status',)) for path in self.runs(since))]
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete runs older than retention_days, returning the number removed"""
+        now = time.time() if now is None else now
+        keep = set(self.runs(now - self.retention_days * DAY))
+        removed = 0
+        for path in self.runs():
+            if path not in keep:
+                os.remove(path)
+                removed += 1
+        return removed
+
+def _since(days: float) -> float:
+    return time.time() - days * DAY
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query the SSL check result history')
+    parser.add_argument('--history', default=SSLConfig.SSL_HISTORY_PATH, help='History directory')
+    sub = parser.add_subparsers(dest='query', required=True)
+    crossing = sub.add_parser('crossing', help='Passing certs crossing the threshold within N days (latest run)')
+    crossing.add_argument('--days', type=int, default=14)
+    for name, help_text in (('changed', 'Hosts whose served certificate changed'),
+                            ('errors', 'Error rate by discovery source'),
+                            ('trend', 'Status counts per run')):
+        query = sub.add_parser(name, help=help_text)
+        query.add_argument('--since-days', type=float, default=30)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.history)
+    if args.query == 'crossing':
+        batch = store.latest(('hostname', 'days_left'))
+        for hostname, days_left in (batch.crossing(args.days, SSLConfig.SSL_THRESHOLD_DAYS) if batch is not None else []):
+            print(f"{hostname}\t{days_left}")
+    elif args.query == 'changed':
+        for run_at, hostname, old, new in store.fingerprint_changes(_since(args.since_days)):
+            print(f"{_iso(run_at)}\t{hostname}\t{old[:16]} -> {new[:16]}")
+    elif args.query == 'errors':
+        for source, (failed, total) in sorted(store.error_rate_by_source(_since(args.since_days)).items()):
+            print(f"{source}\t{failed}/{total}\t{failed / total:.1%}")
+    else:
+        for run_at, counts in store.trend(_since(args.since_days)):
+            print(f"{_iso(run_at)}\t" + "\t".join(f"{status}={count}" for status, count in counts.items()))
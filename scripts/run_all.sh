@@ -30,7 +30,7 @@ echo "Deduplicating domains..."
 jq -s 'add | unique_by(.hostname)' "$ALL_DOMAINS" > "$UNIQUE_DOMAINS"
 
 echo "Running SSL cert check..."
-python scripts/ssl_cert_checker.py --hosts "$(jq -r '.[].hostname' "$UNIQUE_DOMAINS")" > "$CERT_RESULTS"
+jq -r '.[].hostname' "$UNIQUE_DOMAINS" | python scripts/ssl_cert_checker.py --hosts-file - --mode async > "$CERT_RESULTS"
 
 if [ "$ENABLE_DASHBOARDS" = "true" ]; then
   echo "Pushing to dashboards..."
@@ -40,6 +40,5 @@ fi
 
 if [ "$ENABLE_ALERTS" = "true" ]; then
   echo "Sending alerts..."
-  python scripts/alerting/slack_alert.py "$CERT_RESULTS" || true
-  python scripts/alerting/jira_alert.py "$CERT_RESULTS" || true
+  python scripts/alert_dispatcher.py "$CERT_RESULTS" || true
 fi
@@ -0,0 +1,29 @@
+"""
+Deterministic partitioning of the inventory across CI jobs
+
+Rendezvous (highest random weight) hashing assigns each host to a shard, so
+hosts never move when others are added or removed, and changing the shard
+count only moves the hosts whose winning shard changed (about 1/n of them).
+That keeps each shard's result cache and inventory index warm.
+"""
+
+import hashlib
+from typing import Tuple
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """Parse 'i/n' with a 1-based index, matching GitLab's CI_NODE_INDEX/CI_NODE_TOTAL"""
+    try:
+        index, total = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}, expected i/n")
+    if not 1 <= index <= total:
+        raise ValueError(f"Invalid shard {value!r}, index must be between 1 and {total}")
+    return index, total
+
+def shard_of(key: str, total: int) -> int:
+    """1-based shard that owns key"""
+    return max(range(1, total + 1),
+               key=lambda shard: hashlib.blake2b(f"{shard}:{key}".encode(), digest_size=8).digest())
+
+def shard_results_file(index: int, total: int) -> str:
+    return f"cert-results.shard-{index}-of-{total}.json"
@@ -1,22 +1,59 @@
 import ssl
 import socket
-from datetime import datetime
+from datetime import datetime, timezone
 import json
 import sys
 import argparse
 import os
+import asyncio
+import functools
+import time
+import random
 
-def get_cert_expiry(hostname, port=443, timeout=10):
-    context = ssl.create_default_context()
+from cert_parser import ParseCache, evaluate_chain, evaluate_expiry, not_after
+from inventory_index import split_target
+from resolver import Resolver
+from tracing import profiled
+from host_health import HostHealth
+from politeness import EndpointScheduler
+
+@functools.lru_cache(maxsize=None)
+def _unverified_context():
+    # Certificates are inspected, not verified, so skip loading the system CA
+    # bundle; doing that per host blocks the event loop for tens of ms each.
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
     context.check_hostname = False
     context.verify_mode = ssl.CERT_NONE
-    
+    return context
+
+# Parsed certificates shared by every probe in the process; a wildcard or
+# intermediate served by many hosts is decoded once
+CERT_CACHE = ParseCache()
+
+def presented_chain(ssl_object):
+    """DER of every certificate the peer sent, leaf first.
+
+    The chain is read as presented, not as verified, so it is available
+    under CERT_NONE. Before Python 3.13 only the private _ssl object exposes
+    it; where neither does, just the leaf is returned.
+    """
+    if hasattr(ssl_object, 'get_unverified_chain'):
+        return ssl_object.get_unverified_chain() or []
+    sslobj = getattr(ssl_object, '_sslobj', None)
+    if hasattr(sslobj, 'get_unverified_chain'):
+        return [cert.public_bytes(ssl._ssl.ENCODING_DER) for cert in sslobj.get_unverified_chain() or []]
+    # getpeercert() is an empty dict under CERT_NONE; use the binary form
+    leaf = ssl_object.getpeercert(binary_form=True)
+    return [leaf] if leaf else []
+
+def get_peer_chain(hostname, port=443, timeout=10):
+    """Return the DER-encoded certificates served by hostname:port, leaf first"""
+    context = _unverified_context()
+
     try:
         with socket.create_connection((hostname, port), timeout=timeout) as sock:
             with context.wrap_socket(sock, server_hostname=hostname) as secure_socket:
-                cert = secure_socket.getpeercert()
-                expiry_date = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-                return expiry_date
+                return presented_chain(secure_socket)
     except socket.timeout:
         raise Exception(f"Connection timeout to {hostname}:{port}")
     except ssl.SSLError as e:
@@ -24,37 +61,421 @@ def get_cert_expiry(hostname, port=443, timeout=10):
     except Exception as e:
         raise Exception(f"Connection error for {hostname}: {e}")
 
+def get_peer_cert(hostname, port=443, timeout=10):
+    """Return the DER-encoded leaf certificate served by hostname:port"""
+    return get_peer_chain(hostname, port, timeout)[0]
+
+def get_cert_expiry(hostname, port=443, timeout=10):
+    return not_after(get_peer_cert(hostname, port, timeout))
+
+class ProbeError(Exception):
+    """A failed probe; transient failures (resets, timeouts) are worth retrying"""
+
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        self.transient = transient
+
+TRANSIENT_ERRORS = (asyncio.TimeoutError, ConnectionResetError, ConnectionAbortedError,
+                    ssl.SSLEOFError, ssl.SSLZeroReturnError)
+
+async def _open_tls(hostname, port, address, timings, connect_timeout=None, handshake_timeout=None):
+    """Connect, then upgrade to TLS, recording connect_ms and handshake_ms separately"""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    transport, protocol = await asyncio.wait_for(
+        loop.create_connection(asyncio.Protocol, address or hostname, port), connect_timeout)
+    connected = time.perf_counter()
+    timings['connect_ms'] = round((connected - start) * 1000, 1)
+    try:
+        tls = await asyncio.wait_for(
+            loop.start_tls(transport, protocol, _unverified_context(), server_hostname=hostname),
+            handshake_timeout)
+    except BaseException:
+        transport.close()
+        raise
+    timings['handshake_ms'] = round((time.perf_counter() - connected) * 1000, 1)
+    return tls
+
+async def get_peer_chain_async(hostname, port=443, timeout=10, address=None, timings=None,
+                               connect_timeout=None, handshake_timeout=None):
+    """Non-blocking equivalent of get_peer_chain.
+
+    The timeout covers DNS, TCP connect and TLS handshake together so a
+    single dead endpoint can never hold a concurrency slot for longer;
+    connect_timeout and handshake_timeout optionally bound each phase.
+    When `address` is given it is connected to directly, with hostname
+    still sent as SNI. Phase durations are stored in `timings` if given;
+    connect_ms includes DNS unless an address is passed. Failures raise
+    ProbeError.
+    """
+    try:
+        tls = await asyncio.wait_for(_open_tls(hostname, port, address, {} if timings is None else timings,
+                                               connect_timeout, handshake_timeout),
+                                     timeout=timeout)
+    except asyncio.TimeoutError:
+        raise ProbeError(f"Connection timeout to {hostname}:{port}", transient=True)
+    except ssl.SSLError as e:
+        raise ProbeError(f"SSL error for {hostname}: {e}", isinstance(e, TRANSIENT_ERRORS))
+    except Exception as e:
+        raise ProbeError(f"Connection error for {hostname}: {e}", isinstance(e, TRANSIENT_ERRORS))
+
+    try:
+        return presented_chain(tls.get_extra_info('ssl_object'))
+    finally:
+        tls.close()
+
+async def get_peer_cert_async(hostname, port=443, timeout=10, address=None, timings=None,
+                              connect_timeout=None, handshake_timeout=None):
+    """Non-blocking equivalent of get_peer_cert; see get_peer_chain_async"""
+    return (await get_peer_chain_async(hostname, port, timeout, address, timings,
+                                       connect_timeout, handshake_timeout))[0]
+
+async def get_cert_expiry_async(hostname, port=443, timeout=10):
+    return not_after(await get_peer_cert_async(hostname, port, timeout))
+
+def _error_result(hostname, error):
+    return {
+        'hostname': hostname,
+        'expiry_date': None,
+        'days_left': None,
+        'status': 'ERROR',
+        'error': error
+    }
+
+def _chain_summary(chain):
+    """Leaf details plus the earliest expiry among the certificates a client relies on"""
+    leaf = chain[0]
+    # A self-issued root sent along is ignored; clients use their own trust store
+    weakest = min([leaf] + [cert for cert in chain[1:] if not cert['self_issued']], key=lambda c: c['not_after'])
+    return {
+        'expiry_date': leaf['not_after'],
+        'fingerprint': leaf['fingerprint'],
+        'sans': leaf['sans'],
+        'issuer': leaf['issuer_cn'],
+        'key': f"{leaf['key_type']}-{leaf['key_bits']}" if leaf['key_bits'] else leaf['key_type'],
+        'chain_length': len(chain),
+        'chain_expiry_date': weakest['not_after'],
+        'chain_expiring': weakest['subject_cn']
+    }
+
+def _served_result(hostname, served, threshold_days):
+    result = evaluate_expiry(hostname, served['expiry_date'], threshold_days)
+    result.update((key, served[key]) for key in ('fingerprint', 'sans', 'issuer', 'key', 'chain_length'))
+    return evaluate_chain(result, served['chain_expiry_date'], served['chain_expiring'], threshold_days)
+
+def _cert_result(hostname, chain, threshold_days):
+    return _served_result(hostname, _chain_summary([CERT_CACHE.parse(der) for der in chain]), threshold_days)
+
 def check_cert(hostname, threshold_days=30, timeout=10):
     try:
-        expiry_date = get_cert_expiry(hostname, timeout=timeout)
-        days_left = (expiry_date - datetime.utcnow()).days
-        return {
-            'hostname': hostname,
-            'expiry_date': expiry_date.isoformat(),
-            'days_left': days_left,
-            'status': 'FAIL' if days_left < threshold_days else 'PASS',
-            'error': None
-        }
+        host, port = split_target(hostname)
+        chain = get_peer_chain(host, port, timeout=timeout)
+        return _cert_result(hostname, chain, threshold_days)
     except Exception as e:
-        return {
-            'hostname': hostname,
-            'expiry_date': None,
-            'days_left': None,
-            'status': 'ERROR',
-            'error': str(e)
-        }
+        return _error_result(hostname, str(e))
+
+ENDPOINT_PHASES = ('queue_ms', 'connect_ms', 'handshake_ms', 'parse_ms', 'probe_ms', 'attempts')
+
+def _endpoints_result(hostname, endpoints, threshold_days, timings):
+    """Fold per-address probes into one result, reporting the earliest expiry served"""
+    served = [e for e in endpoints if e['error'] is None]
+    if served:
+        result = _served_result(hostname, min(served, key=lambda e: e['expiry_date']), threshold_days)
+    else:
+        result = _error_result(hostname, endpoints[0]['error'])
+
+    result.update(timings)
+    # For several addresses each phase reports its slowest endpoint
+    for phase in ENDPOINT_PHASES:
+        values = [e[phase] for e in endpoints if phase in e]
+        if values:
+            result[phase] = max(values)
+    if endpoints[0]['ip'] is not None:
+        result['addresses'] = [e['ip'] for e in endpoints]
+    if len(endpoints) > 1:
+        result['endpoints'] = [{
+            'ip': e['ip'],
+            'expiry_date': e['expiry_date'].isoformat() if e['error'] is None else None,
+            'fingerprint': e.get('fingerprint'),
+            'error': e['error']
+        } for e in endpoints]
+        if len(served) < len(endpoints) or len({e['fingerprint'] for e in served}) > 1:
+            result['endpoint_mismatch'] = True
+    return result
+
+def _unreachable_result(hostname, health, result=None):
+    """Report a host whose circuit breaker is open, distinct from a one-off ERROR"""
+    next_probe = datetime.fromtimestamp(health['next_probe'], timezone.utc).replace(tzinfo=None)
+    result = result or _error_result(hostname, health['last_error'])
+    result.update(status='UNREACHABLE', circuit_open=True, consecutive_failures=health['failures'],
+                  next_probe=next_probe.isoformat())
+    return result
+
+class ProbeEngine:
+    """Resolve-then-handshake pipeline shared by every host in a run.
+
+    Handshakes are bounded by `concurrency` while name resolution runs on
+    the resolver's own pool, so slow DNS never holds a handshake slot. Slots
+    come from an EndpointScheduler, which can also cap concurrent handshakes
+    and their rate per resolved (IP, port); time spent waiting for a slot is
+    reported as queue_ms. With `all_addresses` every A/AAAA record is
+    probed, catching a stale cert on one node behind a load balancer. Identical endpoints (IP, port, SNI) are
+    probed once per engine. The presented chain is parsed through a
+    fingerprint-keyed cache, shared process-wide unless `cert_cache` is
+    given, so a wildcard or intermediate is decoded once.
+
+    With a HostHealth, per-phase timeouts follow each host's latency
+    history, transient failures are retried up to `retries` times with
+    jittered backoff, and hosts whose circuit breaker is open are only
+    probed when due, reported as UNREACHABLE in between.
+    """
+
+    RETRY_BASE_DELAY = 0.5
+    RETRY_MAX_DELAY = 5
+
+    def __init__(self, threshold_days=30, timeout=10, concurrency=100, resolver=None, all_addresses=False,
+                 health=None, retries=0, scheduler=None, cert_cache=None):
+        self.threshold_days = threshold_days
+        self.timeout = timeout
+        self.resolver = resolver
+        self.all_addresses = all_addresses
+        self.health = health
+        self.retries = retries
+        self.scheduler = scheduler or EndpointScheduler(concurrency)
+        self.cert_cache = cert_cache or CERT_CACHE
+        self.endpoints = {}
+
+    async def _attempt(self, hostname, address, port, endpoint, connect_timeout, handshake_timeout):
+        queued = time.perf_counter()
+        # Without a resolved address there is nothing to group on but the host itself
+        async with self.scheduler.slot((address or hostname, port)):
+            endpoint['queue_ms'] = round(endpoint.get('queue_ms', 0) + (time.perf_counter() - queued) * 1000, 1)
+            chain = await get_peer_chain_async(hostname, port, self.timeout, address, endpoint,
+                                               connect_timeout, handshake_timeout)
+        parse_start = time.perf_counter()
+        summary = _chain_summary([self.cert_cache.parse(der) for der in chain])
+        endpoint['parse_ms'] = round((time.perf_counter() - parse_start) * 1000, 2)
+        endpoint.update(summary, error=None)
+
+    async def _probe(self, hostname, address, port, target):
+        start = time.perf_counter()
+        endpoint = {'ip': address}
+        connect_timeout, handshake_timeout = None, None
+        retries = self.retries
+        if self.health:
+            connect_timeout, handshake_timeout = self.health.timeouts(target)
+            if self.health.is_open(target):
+                retries = 0  # a due probe of a dead host gets a single attempt
+
+        for attempt in range(retries + 1):
+            if attempt:
+                # Full jitter; the retry also falls back to the base timeout
+                await asyncio.sleep(random.uniform(0, min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** attempt)))
+                connect_timeout, handshake_timeout = None, None
+            try:
+                await self._attempt(hostname, address, port, endpoint, connect_timeout, handshake_timeout)
+                break
+            except ProbeError as e:
+                endpoint['error'] = str(e)
+                if not e.transient:
+                    break
+            except Exception as e:
+                endpoint['error'] = str(e)
+                break
+        endpoint['attempts'] = attempt + 1
+        endpoint['probe_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        return endpoint
+
+    def _endpoint(self, hostname, address, port, target):
+        key = (address, port, hostname.lower())
+        if key not in self.endpoints:
+            self.endpoints[key] = asyncio.ensure_future(self._probe(hostname, address, port, target))
+        return self.endpoints[key]
+
+    async def check(self, hostname):
+        """Check a 'host' or 'host:port' target; results keep the target as hostname"""
+        if self.health and not self.health.allows(hostname):
+            return _unreachable_result(hostname, self.health.get(hostname))
+
+        result = await self._check(hostname)
+        if self.health:
+            self.health.record(hostname, result)
+            if result['status'] == 'ERROR' and self.health.is_open(hostname):
+                result = _unreachable_result(hostname, self.health.get(hostname), result)
+        return result
+
+    async def _check(self, hostname):
+        try:
+            host, port = split_target(hostname)
+        except ValueError:
+            return _error_result(hostname, f"Invalid port in {hostname}")
+
+        timings = {}
+        addresses = [None]
+        if self.resolver is not None:
+            start = time.perf_counter()
+            try:
+                addresses, resolve_ms = await self.resolver.resolve(host, port)
+            except Exception as e:
+                result = _error_result(hostname, str(e))
+                result['resolve_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                return result
+            timings['resolve_ms'] = round(resolve_ms, 1)
+            if not self.all_addresses:
+                addresses = addresses[:1]
+
+        endpoints = await asyncio.gather(*(self._endpoint(host, address, port, hostname) for address in addresses))
+        return _endpoints_result(hostname, endpoints, self.threshold_days, timings)
+
+async def check_cert_async(hostname, threshold_days=30, timeout=10, resolver=None, all_addresses=False,
+                           health=None, retries=0, scheduler=None):
+    """Check one host; pass a shared scheduler to apply per-endpoint limits across calls"""
+    return await ProbeEngine(threshold_days, timeout, 1, resolver, all_addresses, health, retries,
+                             scheduler).check(hostname)
+
+async def iter_check_hosts_async(hosts, threshold_days=30, timeout=10, concurrency=100, deadline=None,
+                                 resolver=None, all_addresses=False, health=None, retries=0,
+                                 scheduler=None, backlog=0):
+    """Check hosts concurrently, yielding each result as soon as it completes.
+
+    `hosts` may be any iterable (e.g. a file object); it is consumed lazily
+    so at most `concurrency` handshakes, plus the resolver's look-ahead and
+    `backlog` hosts queued behind busy endpoints, are held in flight at
+    once. The backlog lets hosts on idle endpoints start while a crowded
+    one works through its queue. Hosts that have not finished when the whole-run
+    `deadline` (seconds) expires are cancelled and reported as ERROR so
+    every host still gets a result.
+    """
+    engine = ProbeEngine(threshold_days, timeout, concurrency, resolver, all_addresses, health, retries, scheduler)
+    window = concurrency + (resolver.concurrency if resolver else 0) + backlog
+    hosts = iter(hosts)
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline if deadline else None
+    in_flight = {}
+    exhausted = False
+
+    while True:
+        while not exhausted and len(in_flight) < window:
+            host = next(hosts, None)
+            if host is None:
+                exhausted = True
+                break
+            in_flight[asyncio.create_task(engine.check(host))] = host
+        if not in_flight:
+            return
+
+        remaining = None if stop_at is None else stop_at - loop.time()
+        if remaining is not None and remaining <= 0:
+            break
+        done, _ = await asyncio.wait(in_flight, timeout=remaining,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            in_flight.pop(task)
+            yield task.result()
+
+    message = f"Run deadline of {deadline}s exceeded"
+    for task, host in in_flight.items():
+        task.cancel()
+        yield _error_result(host, f"{message} for {host}")
+    for host in hosts:
+        yield _error_result(host, f"{message} for {host}")
+
+def read_hosts(stream):
+    """Yield hosts (optionally host:port) from a file object, one per line, skipping blanks and comments"""
+    for line in stream:
+        host = line.strip()
+        if host and not host.startswith('#'):
+            yield host
+
+def _emit(result):
+    print(json.dumps(result), flush=True)
+    return result['status'] in ['FAIL', 'ERROR', 'UNREACHABLE']
+
+async def _run_async(hosts, args):
+    resolver = None
+    if args.resolve or args.all_addresses or args.endpoint_concurrency or args.endpoint_rate:
+        resolver = Resolver(ttl=args.dns_ttl, concurrency=args.dns_concurrency, timeout=args.timeout)
+
+    health = None
+    if args.health_db:
+        health = HostHealth(args.health_db, args.timeout, args.min_timeout,
+                            args.breaker_threshold, args.breaker_hours, args.breaker_max_hours)
+
+    scheduler = EndpointScheduler(args.concurrency, args.endpoint_concurrency, args.endpoint_rate,
+                                  args.endpoint_burst)
+
+    failed = False
+    try:
+        async for res in iter_check_hosts_async(hosts, args.threshold, args.timeout,
+                                                args.concurrency, args.deadline,
+                                                resolver, args.all_addresses,
+                                                health, args.retries,
+                                                scheduler, args.backlog):
+            failed = _emit(res) or failed
+    finally:
+        if resolver:
+            resolver.close()
+        if health:
+            health.close()
+    return failed
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='SSL Certificate Expiration Checker')
-    parser.add_argument('--hosts', nargs='+', required=True, help='List of hosts')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--hosts', nargs='+', help='List of hosts')
+    source.add_argument('--hosts-file', help="File with one host per line ('-' for stdin)")
     parser.add_argument('--threshold', type=int, default=30, help='Days threshold')
     parser.add_argument('--timeout', type=int, default=10, help='Connection timeout in seconds')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync',
+                        help='Probe hosts one at a time (sync) or concurrently (async)')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='Maximum concurrent handshakes in async mode')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Whole-run deadline in seconds for async mode')
+    parser.add_argument('--resolve', action='store_true',
+                        help='Resolve hostnames ahead of probing in async mode, timed separately')
+    parser.add_argument('--all-addresses', action='store_true',
+                        help='Probe every resolved address of each host (implies --resolve)')
+    parser.add_argument('--dns-ttl', type=float, default=300, help='Seconds to cache DNS answers')
+    parser.add_argument('--dns-concurrency', type=int, default=64, help='Concurrent DNS lookups')
+    parser.add_argument('--profile', metavar='FILE', help='Write cProfile stats for the run to FILE')
+    parser.add_argument('--health-db', metavar='FILE',
+                        help='SQLite host health store enabling adaptive timeouts and circuit breaking (async mode)')
+    parser.add_argument('--retries', type=int, default=0, help='Retries for transient failures in async mode')
+    parser.add_argument('--min-timeout', type=float, default=1, help='Lowest adaptive per-phase timeout')
+    parser.add_argument('--breaker-threshold', type=int, default=3,
+                        help='Consecutive failed checks before a host is treated as unreachable')
+    parser.add_argument('--breaker-hours', type=float, default=24,
+                        help='Hours between probes of an unreachable host, doubling per failure')
+    parser.add_argument('--breaker-max-hours', type=float, default=168,
+                        help='Upper bound on the interval between probes of an unreachable host')
+    parser.add_argument('--endpoint-concurrency', type=int, default=None,
+                        help='Maximum concurrent handshakes per resolved IP and port in async mode (implies --resolve)')
+    parser.add_argument('--endpoint-rate', type=float, default=None,
+                        help='Maximum new handshakes per second per resolved IP and port (implies --resolve)')
+    parser.add_argument('--endpoint-burst', type=int, default=None,
+                        help='Handshakes an idle endpoint may take at once under --endpoint-rate '
+                             '(default: --endpoint-concurrency)')
+    parser.add_argument('--backlog', type=int, default=0,
+                        help='Extra hosts to hold queued behind busy endpoints so idle ones stay busy')
     args = parser.parse_args()
 
-    results = [check_cert(host, args.threshold, args.timeout) for host in args.hosts]
-    for res in results:
-        print(json.dumps(res))
+    if args.hosts_file == '-':
+        hosts = read_hosts(sys.stdin)
+    elif args.hosts_file:
+        hosts = read_hosts(open(args.hosts_file))
+    else:
+        hosts = args.hosts
+
+    # Results are written as JSON lines the moment each check finishes
+    with profiled(args.profile):
+        if args.mode == 'async':
+            failed = asyncio.run(_run_async(hosts, args))
+        else:
+            failed = False
+            for host in hosts:
+                failed = _emit(check_cert(host, args.threshold, args.timeout)) or failed
 
     # Exit with error if any certificates are failing or have errors
-    if any(res['status'] in ['FAIL', 'ERROR'] for res in results):
+    if failed:
         sys.exit(1)
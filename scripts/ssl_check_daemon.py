@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Long-running SSL Certificate Checker Daemon
+Keeps the inventory in memory, probes hosts as they fall due and serves
+Prometheus metrics straight from in-memory state
+"""
+
+import asyncio
+import heapq
+import random
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config import SSLConfig
+from ssl_cert_checker import check_cert_async
+from resolver import Resolver
+from host_health import HostHealth
+from politeness import EndpointScheduler
+from ssl_check_runner import SSLCheckRunner
+from result_cache import next_due_at
+from tracing import HOST_PHASES, Tracer
+
+class InventoryCollector:
+    """Prometheus collector that renders metrics from the daemon's state at scrape time"""
+
+    def __init__(self, daemon: 'SSLCheckDaemon'):
+        self.daemon = daemon
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        days = GaugeMetricFamily('ssl_cert_days_remaining', 'Days remaining SSL cert', labels=['host'])
+        expiry = GaugeMetricFamily('ssl_cert_expiry_timestamp_seconds',
+                                   'SSL cert notAfter as a Unix timestamp', labels=['host'])
+        chain_expiry = GaugeMetricFamily('ssl_cert_chain_expiry_timestamp_seconds',
+                                         'Earliest notAfter in the served chain as a Unix timestamp', labels=['host'])
+        status = GaugeMetricFamily('ssl_cert_check_status',
+                                   'Latest check status (1 for the current status)', labels=['host', 'status'])
+        checked = GaugeMetricFamily('ssl_cert_last_check_timestamp_seconds',
+                                    'When the host was last checked', labels=['host', 'checked_via'])
+
+        now = datetime.utcnow()
+        for result in self.daemon.snapshot():
+            host = result['hostname']
+            status.add_metric([host, result['status']], 1)
+            checked.add_metric([host, result.get('checked_via', 'probe')], result['checked_at'])
+            if result.get('expiry_date'):
+                expiry_date = datetime.fromisoformat(result['expiry_date'])
+                # Recomputed per scrape so the gauge stays current between probes
+                days.add_metric([host], (expiry_date - now).days)
+                expiry.add_metric([host], expiry_date.replace(tzinfo=timezone.utc).timestamp())
+            if result.get('chain_expiry_date'):
+                chain_expiry.add_metric([host], datetime.fromisoformat(result['chain_expiry_date'])
+                                        .replace(tzinfo=timezone.utc).timestamp())
+
+        inventory = GaugeMetricFamily('ssl_checker_inventory_hosts', 'Hosts in the in-memory inventory')
+        inventory.add_metric([], len(self.daemon.inventory))
+        scheduled = GaugeMetricFamily('ssl_checker_scheduled_hosts', 'Hosts waiting for a live probe')
+        scheduled.add_metric([], len(self.daemon.scheduled))
+        return [days, expiry, chain_expiry, status, checked, inventory, scheduled]
+
+class SSLCheckDaemon:
+    def __init__(self):
+        self.runner = SSLCheckRunner()
+        # Spans would pile up in memory and in SSL_TRACE_PATH forever; each discovery gets a fresh tracer
+        self.runner.tracer.close()
+        self.inventory: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        # Min-heap of (next_due, hostname); self.scheduled holds the live due time
+        # per host so superseded heap entries are skipped when popped
+        self.schedule: List[tuple] = []
+        self.scheduled: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.wakeup = None
+        self.tasks = set()
+        self.phase_histogram = None
+        # Shared so DNS answers are cached across probes until DNS_CACHE_TTL expires
+        self.resolver = Resolver(ttl=SSLConfig.DNS_CACHE_TTL, concurrency=SSLConfig.DNS_CONCURRENCY,
+                                 timeout=SSLConfig.SSL_CHECK_TIMEOUT)
+        # Shared so per-endpoint limits hold across every probe the daemon runs
+        self.scheduler = EndpointScheduler(SSLConfig.SSL_CHECK_CONCURRENCY, SSLConfig.SSL_ENDPOINT_CONCURRENCY,
+                                           SSLConfig.SSL_ENDPOINT_RATE, SSLConfig.SSL_ENDPOINT_BURST)
+        self.health = None
+        if SSLConfig.SSL_HEALTH_PATH:
+            self.health = HostHealth(SSLConfig.SSL_HEALTH_PATH, SSLConfig.SSL_CHECK_TIMEOUT,
+                                     SSLConfig.SSL_CHECK_MIN_TIMEOUT, SSLConfig.SSL_BREAKER_THRESHOLD,
+                                     SSLConfig.SSL_BREAKER_HOURS, SSLConfig.SSL_BREAKER_MAX_HOURS)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return list(self.results.values())
+
+    def discover(self):
+        """Blocking discovery, deduplication and reconciliation; run in an executor"""
+        self.runner.tracer = Tracer()
+        domains = self.runner.run_discovery()
+        unique_domains = self.runner.deduplicate_domains(domains)
+        known, to_probe = self.runner.reconcile_known_expiry(unique_domains)
+        return unique_domains, known, to_probe
+
+    def apply_inventory(self, unique_domains, known, to_probe, spread: float = 0) -> None:
+        """Swap in a fresh inventory, scheduling new hosts and dropping vanished ones"""
+        now = time.time()
+        probe_hosts = {d['hostname'] for d in to_probe}
+
+        with self.lock:
+            self.inventory = {d['hostname']: d for d in unique_domains}
+            for result in known:
+                result['checked_at'] = now
+                self.results[result['hostname']] = result
+            for host in list(self.results):
+                if host not in self.inventory:
+                    del self.results[host]
+
+            for host in list(self.scheduled):
+                if host not in probe_hosts:
+                    del self.scheduled[host]
+            for host in probe_hosts - self.scheduled.keys():
+                # Spreading the first load avoids a burst of handshakes at start-up
+                self._schedule(host, now + random.uniform(0, spread))
+
+        print(f"📦 Inventory: {len(self.inventory)} hosts, {len(self.scheduled)} scheduled for probes")
+        self.wakeup.set()
+
+    def _schedule(self, host: str, due: float) -> None:
+        self.scheduled[host] = due
+        heapq.heappush(self.schedule, (due, host))
+
+    async def discovery_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        spread = SSLConfig.DAEMON_STARTUP_SPREAD
+        while True:
+            try:
+                inventory = await loop.run_in_executor(None, self.discover)
+                self.apply_inventory(*inventory, spread=spread)
+                spread = 0
+                if self.health:
+                    self.health.save()
+            except Exception as e:
+                print(f"❌ Discovery failed, keeping previous inventory: {e}")
+            await asyncio.sleep(SSLConfig.DAEMON_DISCOVERY_INTERVAL)
+
+    async def probe(self, host: str, semaphore: asyncio.Semaphore) -> None:
+        try:
+            result = await check_cert_async(host, SSLConfig.SSL_THRESHOLD_DAYS, SSLConfig.SSL_CHECK_TIMEOUT,
+                                            self.resolver, SSLConfig.SSL_CHECK_ALL_ADDRESSES,
+                                            self.health, SSLConfig.SSL_CHECK_RETRIES, self.scheduler)
+        finally:
+            semaphore.release()
+
+        if self.phase_histogram is not None:
+            for phase in HOST_PHASES:
+                if result.get(phase) is not None:
+                    self.phase_histogram.labels(phase=phase[:-len('_ms')]).observe(result[phase] / 1000)
+
+        now = time.time()
+        result['checked_via'] = 'probe'
+        domain = self.inventory.get(host)
+        if domain and domain.get('expires_at'):
+            # Sampled for verification: compare the served cert with the provider's expiry
+            self.runner.verify_served_certs([domain], [result])
+        result['checked_at'] = now
+        due = max(next_due_at(result['days_left'], SSLConfig.SSL_THRESHOLD_DAYS, now,
+                              SSLConfig.SSL_CACHE_NEAR_DAYS, SSLConfig.SSL_CACHE_MAX_INTERVAL_HOURS),
+                  now + SSLConfig.DAEMON_MIN_INTERVAL)
+        if result.get('circuit_open'):
+            # Unreachable hosts are left alone until their breaker allows another probe
+            due = max(due, self.health.get(host)['next_probe'])
+        with self.lock:
+            if host in self.inventory:
+                self.results[host] = result
+            if host in self.scheduled:
+                self._schedule(host, due)
+        self.wakeup.set()
+
+    async def probe_loop(self) -> None:
+        # Handshake slots come from the scheduler; the backlog lets due hosts queue behind busy endpoints
+        semaphore = asyncio.Semaphore(SSLConfig.SSL_CHECK_CONCURRENCY + SSLConfig.SSL_PROBE_BACKLOG)
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            while self.schedule and self.schedule[0][0] <= now:
+                due, host = heapq.heappop(self.schedule)
+                if self.scheduled.get(host) != due:
+                    continue
+                await semaphore.acquire()
+                task = asyncio.create_task(self.probe(host, semaphore))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+
+            delay = self.schedule[0][0] - time.time() if self.schedule else 60
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=max(0, min(delay, 60)))
+            except asyncio.TimeoutError:
+                pass
+
+    def serve_metrics(self) -> None:
+        from prometheus_client import CollectorRegistry, Histogram, start_http_server
+
+        registry = CollectorRegistry()
+        registry.register(InventoryCollector(self))
+        self.phase_histogram = Histogram('ssl_check_phase_seconds', 'Per-host probe phase duration', ['phase'],
+                                         buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+                                         registry=registry)
+        start_http_server(SSLConfig.DAEMON_METRICS_PORT, registry=registry)
+        print(f"📊 Serving metrics on :{SSLConfig.DAEMON_METRICS_PORT}/metrics")
+
+    async def run(self) -> None:
+        print("🚀 Starting SSL Certificate Check daemon")
+        print(f"Providers: {', '.join(SSLConfig.PROVIDERS)}")
+        print(f"Threshold: {SSLConfig.SSL_THRESHOLD_DAYS} days")
+
+        self.wakeup = asyncio.Event()
+        self.serve_metrics()
+        await asyncio.gather(self.discovery_loop(), self.probe_loop())
+
+if __name__ == '__main__':
+    daemon = SSLCheckDaemon()
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        print("👋 Stopping SSL Certificate Check daemon")
+    finally:
+        if daemon.health:
+            daemon.health.close()
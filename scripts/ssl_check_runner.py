@@ -8,17 +8,36 @@ import json
 import sys
 import os
 import subprocess
-from typing import List, Dict, Any
-from datetime import datetime
+import threading
+import queue
+import time
+import random
+import argparse
+from typing import List, Dict, Any, Tuple
+from datetime import datetime, timedelta
 
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from config import SSLConfig
+from discovery import PROVIDER_MODULES, load_provider
+from cert_parser import evaluate_expiry, parse_expiry
+from result_cache import ResultCache
+from inventory_index import InventoryIndex
+from sharding import parse_shard, shard_of, shard_results_file
+from tracing import Tracer, profiled
+from change_scope import changed_domains
+from result_history import HistoryStore, ResultBatch
 
 class SSLCheckRunner:
-    def __init__(self):
-        self.results_file = "cert-results.json"
+    def __init__(self, force_refresh: bool = False, shard: Tuple[int, int] = None, change: Dict[str, Any] = None):
+        self.results_file = shard_results_file(*shard) if shard else "cert-results.json"
         self.domains_file = "unique_domains.json"
+        self.force_refresh = force_refresh
+        self.shard = shard
+        self.change = change or {}
+        self.cache = None
+        self.index = InventoryIndex(SSLConfig.INVENTORY_INDEX_PATH, SSLConfig.INVENTORY_REVERIFY_HOURS)
+        self.tracer = Tracer(SSLConfig.SSL_TRACE_PATH)
         
     def validate_config(self) -> bool:
         """Validate configuration and exit if missing required variables"""
@@ -30,66 +49,276 @@ class SSLCheckRunner:
         return True
     
     def run_discovery(self) -> List[Dict[str, Any]]:
-        """Run domain discovery for configured providers"""
+        """Run domain discovery for configured providers concurrently, in-process"""
         print(f"🔍 Running discovery for providers: {', '.join(SSLConfig.PROVIDERS)}")
         
         all_domains = []
-        discovery_scripts = {
-            'k8s': 'scripts/discovery/discover_k8s.py',
-            'tf': 'scripts/discovery/discover_tf.py',
-            'aws': 'scripts/discovery/discover_aws.py',
-            'azure': 'scripts/discovery/discover_azure.py',
-            'gcp': 'scripts/discovery/discover_gcp.py'
-        }
-        
+        finished = queue.Queue()
+
+        def discover(provider):
+            start = time.time()
+            try:
+                finished.put((provider, load_provider(provider)(), None, start))
+            except Exception as e:
+                finished.put((provider, None, e, start))
+
+        pending = set()
         for provider in SSLConfig.PROVIDERS:
-            if provider not in discovery_scripts:
+            if provider not in PROVIDER_MODULES:
                 print(f"⚠️  Unknown provider: {provider}")
                 continue
-                
-            script_path = discovery_scripts[provider]
-            if not os.path.exists(script_path):
-                print(f"⚠️  Discovery script not found: {script_path}")
-                continue
-            
+            print(f"  Running {provider} discovery...")
+            # Daemon threads: a hung cloud API must not block interpreter exit
+            threading.Thread(target=discover, args=(provider,),
+                             name=f"discover-{provider}", daemon=True).start()
+            pending.add(provider)
+
+        started = time.time()
+        deadline = time.monotonic() + SSLConfig.DISCOVERY_TIMEOUT
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
             try:
-                print(f"  Running {provider} discovery...")
-                result = subprocess.run([sys.executable, script_path], 
-                                      capture_output=True, text=True, timeout=60)
-                
-                if result.returncode == 0 and result.stdout.strip():
-                    domains = json.loads(result.stdout)
-                    if isinstance(domains, list):
-                        all_domains.extend(domains)
-                        print(f"    Found {len(domains)} domains")
-                    else:
-                        print(f"    Invalid output format from {provider}")
-                else:
-                    print(f"    No domains found or error: {result.stderr}")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"    ⏰ Timeout running {provider} discovery")
-            except Exception as e:
-                print(f"    ❌ Error running {provider} discovery: {e}")
+                provider, domains, error, start = finished.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.discard(provider)
+            self.tracer.record('discovery', start, (time.time() - start) * 1000, provider=provider,
+                               domains=len(domains) if isinstance(domains, list) else 0,
+                               error=str(error) if error is not None else None)
+
+            if error is not None:
+                print(f"    ❌ Error running {provider} discovery: {error}")
+            elif isinstance(domains, list):
+                all_domains.extend(domains)
+                print(f"    Found {len(domains)} domains from {provider}")
+            else:
+                print(f"    Invalid output format from {provider}")
+
+        for provider in sorted(pending):
+            print(f"    ⏰ Timeout running {provider} discovery")
+            self.tracer.record('discovery', started, (time.time() - started) * 1000,
+                               provider=provider, domains=0, error='timeout')
         
         return all_domains
     
     def deduplicate_domains(self, domains: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate domains based on hostname"""
+        """Merge domains by normalised hostname, keeping every source's provenance"""
         print("🔄 Deduplicating domains...")
         
-        seen = set()
-        unique_domains = []
-        
-        for domain in domains:
-            hostname = domain.get('hostname', '')
-            if hostname and hostname not in seen:
-                seen.add(hostname)
-                unique_domains.append(domain)
+        unique_domains = self.index.merge(domains)
         
         print(f"  Found {len(unique_domains)} unique domains")
         return unique_domains
     
+    def select_shard(self, domains: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep only the domains owned by this run's shard"""
+        if not self.shard:
+            return domains
+        
+        index, total = self.shard
+        selected = [d for d in domains if shard_of(d['hostname'], total) == index]
+        print(f"🧩 Shard {index}/{total}: {len(selected)} of {len(domains)} domains")
+        return selected
+    
+    def reconcile_known_expiry(self, domains: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Evaluate domains whose provider reported expires_at without probing them.
+
+        Returns (results, domains_to_probe). Domains without a usable expiry
+        (k8s, terraform) are probed, as is a SSL_VERIFY_SAMPLE_RATE fraction of
+        the rest so the served certificate can be compared with the inventory.
+        """
+        results = []
+        to_probe = []
+        sampled = 0
+
+        for domain in domains:
+            try:
+                expiry_date = parse_expiry(domain['expires_at']) if domain.get('expires_at') else None
+            except (TypeError, ValueError):
+                expiry_date = None
+
+            if expiry_date is None:
+                to_probe.append(domain)
+            elif random.random() < SSLConfig.SSL_VERIFY_SAMPLE_RATE:
+                # Marked so neither the result cache nor a group representative answers for it
+                to_probe.append(dict(domain, verify_sample=True))
+                sampled += 1
+            else:
+                result = evaluate_expiry(domain['hostname'], expiry_date, SSLConfig.SSL_THRESHOLD_DAYS)
+                result['checked_via'] = 'inventory'
+                if domain.get('fingerprint'):
+                    result['fingerprint'] = domain['fingerprint']
+                results.append(result)
+
+        print(f"🧮 Evaluated {len(results)} domains from provider expiry dates, "
+              f"{len(to_probe)} need a live probe ({sampled} sampled for verification)")
+        return results, to_probe
+    
+    def verify_served_certs(self, domains: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> None:
+        """Flag probed hosts whose served certificate differs from the provider inventory.
+
+        Sampled hosts whose probe failed fall back to the inventory verdict.
+        """
+        inventory = {d['hostname']: d['expires_at'] for d in domains if d.get('expires_at')}
+        for result in results:
+            expected = inventory.get(result['hostname'])
+            if not expected:
+                continue
+            try:
+                expected_date = parse_expiry(expected)
+            except (TypeError, ValueError):
+                continue
+            if not result.get('expiry_date'):
+                # The probe failed; the provider's date is still authoritative
+                verify_error = result.get('error')
+                result.update(evaluate_expiry(result['hostname'], expected_date,
+                                              SSLConfig.SSL_THRESHOLD_DAYS))
+                result['checked_via'] = 'inventory'
+                result['verify_error'] = verify_error
+                continue
+            result['inventory_expiry_date'] = expected_date.isoformat()
+            served_date = datetime.fromisoformat(result['expiry_date'])
+            if abs((served_date - expected_date).total_seconds()) >= 86400:
+                result['served_cert_mismatch'] = True
+                print(f"⚠️  {result['hostname']} serves a cert expiring {served_date.date()}, "
+                      f"inventory says {expected_date.date()}")
+    
+    def load_cached_results(self, domains: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Reuse cached results for hosts that are not yet due, returning (results, domains_to_probe)"""
+        if not SSLConfig.SSL_CACHE_PATH:
+            return [], domains
+        
+        self.cache = ResultCache(SSLConfig.SSL_CACHE_PATH,
+                                 ttl_days=SSLConfig.SSL_CACHE_TTL_DAYS,
+                                 max_entries=SSLConfig.SSL_CACHE_MAX_ENTRIES,
+                                 near_days=SSLConfig.SSL_CACHE_NEAR_DAYS,
+                                 max_interval_hours=SSLConfig.SSL_CACHE_MAX_INTERVAL_HOURS)
+        if self.force_refresh:
+            print("♻️  Force refresh: ignoring cached results")
+            return [], domains
+        
+        # Hosts sampled for verification are always probed
+        sampled = [d for d in domains if d.get('verify_sample')]
+        cached, due = self.cache.split_due([d for d in domains if not d.get('verify_sample')],
+                                           SSLConfig.SSL_THRESHOLD_DAYS)
+        print(f"🗄️  Reusing {len(cached)} cached results, {len(due) + len(sampled)} hosts due for a probe")
+        return cached, due + sampled
+    
+    def update_cache(self, results: List[Dict[str, Any]], started: float) -> None:
+        """Store fresh probe results, scheduled from the run's start, and evict stale cache entries"""
+        if self.cache is None:
+            return
+        
+        # Scheduling from when the probes were stored would push a weekly host past next week's run
+        probed = [r for r in results if r.get('checked_via') in ('probe', 'representative')]
+        self.cache.store(probed, SSLConfig.SSL_THRESHOLD_DAYS, now=started)
+        evicted = self.cache.evict()
+        if evicted:
+            print(f"🗄️  Evicted {evicted} stale cache entries")
+        self.cache.close()
+        self.cache = None
+    
+    def scope_to_change(self) -> List[Dict[str, Any]]:
+        """Hosts touched by the change, plus cached hosts already near the threshold"""
+        domains = changed_domains(self.change.get('tf_plan'), self.change.get('manifests'),
+                                  self.change.get('base_ref'), known_hosts=self.index.served)
+        print(f"🎯 Change touches {len(domains)} TLS hosts")
+        
+        near = self.scheduled_near_threshold()
+        if SSLConfig.SSL_CACHE_PATH:
+            self.cache = ResultCache(SSLConfig.SSL_CACHE_PATH,
+                                     ttl_days=SSLConfig.SSL_CACHE_TTL_DAYS,
+                                     max_entries=SSLConfig.SSL_CACHE_MAX_ENTRIES,
+                                     near_days=SSLConfig.SSL_CACHE_NEAR_DAYS,
+                                     max_interval_hours=SSLConfig.SSL_CACHE_MAX_INTERVAL_HOURS)
+            near.extend(self.cache.near_threshold(SSLConfig.SSL_THRESHOLD_DAYS))
+        touched = {d['hostname'] for d in domains}
+        near = [h for h in dict.fromkeys(near) if h not in touched]
+        domains.extend({"hostname": host, "source": "cache"} for host in near)
+        print(f"🗄️  Adding {len(near)} cached hosts near the threshold")
+        return domains
+
+    def scheduled_near_threshold(self) -> List[str]:
+        """Hosts the last merged scheduled run found failing, or with a cert or chain near the threshold"""
+        cutoff = datetime.utcnow() + timedelta(days=SSLConfig.SSL_THRESHOLD_DAYS + SSLConfig.SSL_CACHE_NEAR_DAYS)
+        hosts = []
+        try:
+            with open(SSLConfig.SSL_SCHEDULED_RESULTS_PATH) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    expiries = [parse_expiry(result[key]) for key in ('expiry_date', 'chain_expiry_date')
+                                if result.get(key)]
+                    if result.get('status') == 'FAIL' or (expiries and min(expiries) <= cutoff):
+                        hosts.append(result['hostname'])
+        except (OSError, ValueError, KeyError):
+            return []
+        return hosts
+
+    def save_scheduled_results(self, results: List[Dict[str, Any]]) -> None:
+        """Keep the merged scheduled results for change-scoped deployment checks to read"""
+        if not SSLConfig.SSL_SCHEDULED_RESULTS_PATH:
+            return
+        tmp = f"{SSLConfig.SSL_SCHEDULED_RESULTS_PATH}.tmp"
+        with open(tmp, 'w') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+        os.replace(tmp, SSLConfig.SSL_SCHEDULED_RESULTS_PATH)
+    
+    def run_changed(self) -> int:
+        """Deployment fast path: check only the hosts this change touches"""
+        started = time.time()
+        print("🚀 Starting SSL Certificate Check (deployment mode, change-scoped)")
+        print(f"Threshold: {SSLConfig.SSL_THRESHOLD_DAYS} days")
+        
+        try:
+            with self.tracer.span('change_scope'):
+                domains = self.scope_to_change()
+        except (OSError, ValueError, ImportError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  Could not work out the hosts this change touches ({e}); checking everything")
+            return self.run()
+        if not domains:
+            print("✅ No TLS hosts touched by this change")
+            return 0
+        
+        with self.tracer.span('checks', hosts=len(domains)):
+            results = self.run_ssl_checks(domains)
+        self.tracer.record_hosts(results)
+        with self.tracer.span('cache_update'):
+            self.update_cache(results, started)
+        if not results:
+            print("❌ No SSL check results")
+            return 1
+        
+        # Dashboards and history are left to full runs; a partial push would drop every untouched host
+        return self.publish(results, partial=True)
+    
+    def probe_inventory(self, domains: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Probe one host per (endpoint, certificate) group and copy its result to the rest"""
+        to_probe, members, wildcards = self.index.plan(domains)
+        if self.force_refresh:
+            to_probe.extend(member for group in members.values() for member in group)
+            members = {}
+        
+        shared = sum(len(group) for group in members.values())
+        if shared:
+            print(f"🧩 {shared} hosts share a certificate and endpoint with a probed host")
+        
+        results = self.run_ssl_checks(to_probe)
+        fanned, stale = self.index.fan_out(results, members)
+        if stale:
+            print(f"🔁 Certificate changed for {len(stale)} grouped hosts, probing them individually")
+            results.extend(self.run_ssl_checks(stale))
+        results.extend(fanned)
+        results.extend(self.index.cover_wildcards(wildcards, results))
+        
+        self.index.record(results)
+        self.index.save()
+        return results
+    
     def run_ssl_checks(self, domains: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Run SSL certificate checks on discovered domains"""
         if not domains:
@@ -98,32 +327,110 @@ class SSLCheckRunner:
         
         print(f"🔒 Running SSL certificate checks on {len(domains)} domains...")
         
-        hostnames = [d['hostname'] for d in domains]
-        
+        results = []
+        timed_out = threading.Event()
+        command = [
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ssl_cert_checker.py'),
+            '--hosts-file', '-',
+            '--threshold', str(SSLConfig.SSL_THRESHOLD_DAYS),
+            '--timeout', str(SSLConfig.SSL_CHECK_TIMEOUT),
+            '--mode', 'async',
+            '--concurrency', str(SSLConfig.SSL_CHECK_CONCURRENCY),
+            '--deadline', str(SSLConfig.SSL_CHECK_DEADLINE),
+            '--resolve',
+            '--dns-ttl', str(SSLConfig.DNS_CACHE_TTL),
+            '--dns-concurrency', str(SSLConfig.DNS_CONCURRENCY),
+            '--retries', str(SSLConfig.SSL_CHECK_RETRIES),
+            '--backlog', str(SSLConfig.SSL_PROBE_BACKLOG)
+        ]
+        if SSLConfig.SSL_ENDPOINT_CONCURRENCY:
+            command.extend(['--endpoint-concurrency', str(SSLConfig.SSL_ENDPOINT_CONCURRENCY)])
+        if SSLConfig.SSL_ENDPOINT_RATE:
+            command.extend(['--endpoint-rate', str(SSLConfig.SSL_ENDPOINT_RATE),
+                            '--endpoint-burst', str(SSLConfig.SSL_ENDPOINT_BURST)])
+        if SSLConfig.SSL_HEALTH_PATH:
+            command.extend(['--health-db', SSLConfig.SSL_HEALTH_PATH,
+                            '--min-timeout', str(SSLConfig.SSL_CHECK_MIN_TIMEOUT),
+                            '--breaker-threshold', str(SSLConfig.SSL_BREAKER_THRESHOLD),
+                            '--breaker-hours', str(SSLConfig.SSL_BREAKER_HOURS),
+                            '--breaker-max-hours', str(SSLConfig.SSL_BREAKER_MAX_HOURS)])
+        if SSLConfig.SSL_PROFILE_PATH:
+            command.extend(['--profile', f"{SSLConfig.SSL_PROFILE_PATH}.checker"])
+        if SSLConfig.SSL_CHECK_ALL_ADDRESSES:
+            command.append('--all-addresses')
+
         try:
-            result = subprocess.run([
-                sys.executable, 'scripts/ssl_cert_checker.py',
-                '--hosts'] + hostnames + [
-                '--threshold', str(SSLConfig.SSL_THRESHOLD_DAYS)
-            ], capture_output=True, text=True, timeout=300)
-            
-            if result.returncode == 0 and result.stdout.strip():
-                # Parse JSON lines format
-                results = []
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        results.append(json.loads(line))
-                return results
-            else:
-                print(f"❌ SSL check failed: {result.stderr}")
-                return []
-                
-        except subprocess.TimeoutExpired:
-            print("⏰ SSL check timeout")
-            return []
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, text=True, bufsize=1)
         except Exception as e:
             print(f"❌ Error running SSL checks: {e}")
             return []
+
+        def feed_hosts():
+            try:
+                for domain in domains:
+                    process.stdin.write(domain['hostname'] + '\n')
+                process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+
+        def kill_on_timeout():
+            timed_out.set()
+            process.kill()
+
+        stderr_lines = []
+        threads = [
+            threading.Thread(target=feed_hosts, daemon=True),
+            threading.Thread(target=lambda: stderr_lines.extend(process.stderr), daemon=True)
+        ]
+        for thread in threads:
+            thread.start()
+        timer = threading.Timer(SSLConfig.SSL_CHECK_DEADLINE + 30, kill_on_timeout)
+        timer.start()
+
+        # Consume JSON lines as the checker emits them so partial results
+        # survive a timeout and stdout is never buffered whole
+        try:
+            for line in process.stdout:
+                if line.strip():
+                    result = json.loads(line)
+                    result['checked_via'] = 'probe'
+                    results.append(result)
+        except Exception as e:
+            print(f"❌ Error reading SSL check results: {e}")
+        finally:
+            timer.cancel()
+            process.wait()
+            for thread in threads:
+                thread.join(timeout=1)
+
+        if timed_out.is_set():
+            print(f"⏰ SSL check timeout, keeping {len(results)} partial results")
+        elif process.returncode not in (0, 1) or not results:
+            # Exit code 1 only means some certificates failed or errored
+            print(f"❌ SSL check failed: {''.join(stderr_lines)}")
+        return results
+    
+    def save_results(self, results: List[Dict[str, Any]]) -> None:
+        """Write results as JSON lines for the monitoring and alerting scripts"""
+        with open(self.results_file, 'w') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+    
+    def load_shard_results(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Combine shard result files, keeping the first result seen for each hostname"""
+        results = {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    for line in f:
+                        if line.strip():
+                            result = json.loads(line)
+                            results.setdefault(result['hostname'], result)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  Could not read shard results {path}: {e}")
+        print(f"🧩 Merged {len(results)} results from {len(paths)} shard files")
+        return list(results.values())
     
     def send_to_monitoring(self, results: List[Dict[str, Any]]) -> None:
         """Send results to monitoring systems"""
@@ -133,56 +440,61 @@ class SSLCheckRunner:
         print("📊 Sending to monitoring systems...")
         
         # Save results to file for monitoring scripts
-        with open(self.results_file, 'w') as f:
-            for result in results:
-                f.write(json.dumps(result) + '\n')
+        self.save_results(results)
         
+        dashboards = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboards')
         monitoring_scripts = [
-            ('Prometheus', 'scripts/dashboards/prometheus.py'),
-            ('CloudWatch', 'scripts/dashboards/cloudwatch.py')
+            ('Prometheus', os.path.join(dashboards, 'prometheus.py')),
+            ('CloudWatch', os.path.join(dashboards, 'cloudwatch.py'))
         ]
         
         for name, script_path in monitoring_scripts:
             if os.path.exists(script_path):
                 try:
-                    subprocess.run([sys.executable, script_path, self.results_file], 
-                                  timeout=30, check=False)
-                    print(f"  ✅ Sent to {name}")
+                    process = subprocess.run([sys.executable, script_path, self.results_file],
+                                             timeout=30, check=False)
+                    if process.returncode == 0:
+                        print(f"  ✅ Sent to {name}")
+                    else:
+                        print(f"  ❌ Failed to send to {name}: exit code {process.returncode}")
                 except Exception as e:
                     print(f"  ❌ Failed to send to {name}: {e}")
     
     def send_alerts(self, results: List[Dict[str, Any]]) -> None:
-        """Send alerts for failing certificates"""
+        """Alert on failing certificates that are new, escalated or renewed since the last alert"""
+        # Imported here: the sinks pull in requests, which runs without alerts never need
+        from alert_dispatcher import AlertDispatcher
+
         failing = [r for r in results if r.get('status') == 'FAIL']
         
-        if not failing:
-            print("✅ No failing certificates to alert on")
+        dispatcher = AlertDispatcher.from_config()
+        if not dispatcher.sinks:
+            print("⚠️  No alert sinks configured")
             return
         
-        print(f"🚨 Sending alerts for {len(failing)} failing certificates...")
-        
-        alert_scripts = [
-            ('Slack', 'scripts/alerting/slack_alert.py'),
-            ('Jira', 'scripts/alerting/jira_alert.py')
-        ]
-        
-        for name, script_path in alert_scripts:
-            if os.path.exists(script_path):
-                try:
-                    subprocess.run([sys.executable, script_path, self.results_file], 
-                                  timeout=30, check=False)
-                    print(f"  ✅ Alert sent to {name}")
-                except Exception as e:
-                    print(f"  ❌ Failed to send alert to {name}: {e}")
+        print(f"🚨 Checking alert state for {len(failing)} failing certificates...")
+        try:
+            for name, (events, delivered, error) in dispatcher.dispatch(results).items():
+                if error:
+                    print(f"  ❌ Failed to send alert to {name}: {error}")
+                elif events:
+                    print(f"  ✅ {delivered}/{events} alerts sent to {name}")
+                else:
+                    print(f"  💤 No alert state changes for {name}")
+        finally:
+            dispatcher.close()
     
-    def generate_report(self, results: List[Dict[str, Any]]) -> None:
-        """Generate a summary report"""
+    def generate_report(self, results: List[Dict[str, Any]], batch: ResultBatch) -> None:
+        """Generate a summary report from the run's columnar batch"""
         if not results:
             return
             
-        total = len(results)
-        failing = len([r for r in results if r.get('status') == 'FAIL'])
-        passing = total - failing
+        counts = batch.status_counts()
+        total = len(batch)
+        failing = counts['FAIL']
+        unreachable = [results[i] for i in batch.rows_with_status('UNREACHABLE')]
+        errors = [results[i] for i in batch.rows_with_status('ERROR')]
+        passing = counts['PASS']
         
         print("\n" + "="*50)
         print("📋 SSL Certificate Check Report")
@@ -190,18 +502,38 @@ class SSLCheckRunner:
         print(f"Total certificates checked: {total}")
         print(f"Passing: {passing}")
         print(f"Failing: {failing}")
+        if errors:
+            print(f"Errors: {len(errors)}")
+        if unreachable:
+            print(f"Unreachable (circuit open): {len(unreachable)}")
         print(f"Threshold: {SSLConfig.SSL_THRESHOLD_DAYS} days")
         
         if failing > 0:
             print("\n🚨 Failing Certificates:")
-            for result in results:
-                if result.get('status') == 'FAIL':
+            for i in batch.rows_with_status('FAIL'):
+                result = results[i]
+                if result.get('fail_reason') == 'chain':
+                    print(f"  • {result['hostname']}: chain certificate {result['chain_expiring']} has "
+                          f"{result['chain_days_left']} days remaining")
+                else:
                     print(f"  • {result['hostname']}: {result['days_left']} days remaining")
+
+        if errors:
+            print("\n⚠️  Hosts That Could Not Be Checked:")
+            for result in errors:
+                print(f"  • {result['hostname']}: {result.get('error', 'unknown error')}")
+
+        if unreachable:
+            print("\n🔌 Unreachable Hosts (probed again when due):")
+            for result in unreachable:
+                print(f"  • {result['hostname']}: {result.get('consecutive_failures')} failed checks, "
+                      f"next probe {result.get('next_probe')}")
         
         print("="*50)
     
     def run(self) -> int:
         """Main execution method"""
+        started = time.time()
         print(f"🚀 Starting SSL Certificate Check ({SSLConfig.PIPELINE_MODE} mode)")
         print(f"Providers: {', '.join(SSLConfig.PROVIDERS)}")
         print(f"Threshold: {SSLConfig.SSL_THRESHOLD_DAYS} days")
@@ -211,31 +543,98 @@ class SSLCheckRunner:
             return 1
         
         # Run discovery
-        domains = self.run_discovery()
+        with self.tracer.span('discovery_total'):
+            domains = self.run_discovery()
         if not domains:
             print("⚠️  No domains discovered")
             return 0
         
         # Deduplicate
-        unique_domains = self.deduplicate_domains(domains)
+        with self.tracer.span('dedupe', domains=len(domains)):
+            unique_domains = self.deduplicate_domains(domains)
+        
+        # Use provider expiry dates where available, probe the rest
+        with self.tracer.span('reconcile'):
+            results, to_probe = self.reconcile_known_expiry(self.select_shard(unique_domains))
+        
+        # Skip hosts whose cached result is not yet due
+        with self.tracer.span('cache_lookup'):
+            cached, to_probe = self.load_cached_results(to_probe)
+        results.extend(cached)
         
         # Run SSL checks
-        results = self.run_ssl_checks(unique_domains)
+        with self.tracer.span('checks', hosts=len(to_probe)):
+            probed = self.probe_inventory(to_probe)
+        self.tracer.record_hosts(probed)
+        self.verify_served_certs(to_probe, probed)
+        with self.tracer.span('cache_update'):
+            self.update_cache(probed, started)
+        results.extend(probed)
+        sources = {d['hostname']: d.get('source') for d in unique_domains}
+        for result in results:
+            result.setdefault('source', sources.get(result['hostname']))
+        if not results and not self.shard:
+            print("❌ No SSL check results")
+            return 1
+        
+        if self.shard:
+            # Monitoring, alerts and the exit code are left to the merge step
+            self.save_results(results)
+            print(f"✅ Wrote {len(results)} shard results to {self.results_file}")
+            print(f"⏱️  {self.tracer.summary()}")
+            return 0
+        
+        return self.publish(results)
+    
+    def merge(self, paths: List[str]) -> int:
+        """Publish the combined results of every shard as one run"""
+        print(f"🚀 Merging SSL Certificate Check shards ({SSLConfig.PIPELINE_MODE} mode)")
+        results = self.load_shard_results(paths)
         if not results:
             print("❌ No SSL check results")
             return 1
+        self.save_scheduled_results(results)
+        return self.publish(results)
+    
+    def record_history(self, batch: ResultBatch) -> None:
+        """Append this run to the columnar result history"""
+        if not SSLConfig.SSL_HISTORY_PATH:
+            return
+        store = HistoryStore(SSLConfig.SSL_HISTORY_PATH, SSLConfig.SSL_HISTORY_RETENTION_DAYS)
+        try:
+            path = store.append(batch, self.tracer.run_id)
+            pruned = store.prune()
+        except OSError as e:
+            print(f"⚠️  Could not record result history: {e}")
+            return
+        print(f"🗃️  Recorded {len(batch)} results in {path}" + (f", pruned {pruned} old runs" if pruned else ""))
+    
+    def publish(self, results: List[Dict[str, Any]], partial: bool = False) -> int:
+        """Send results to monitoring and alerting, report, and return the exit code.
+        
+        Partial (change-scoped) runs are left out of dashboards and history.
+        """
+        batch = ResultBatch.from_results(results)
         
         # Send to monitoring
-        self.send_to_monitoring(results)
+        if partial:
+            self.save_results(results)
+        else:
+            with self.tracer.span('monitoring'):
+                self.send_to_monitoring(results)
+            with self.tracer.span('history'):
+                self.record_history(batch)
         
         # Send alerts
-        self.send_alerts(results)
+        with self.tracer.span('alerts'):
+            self.send_alerts(results)
         
         # Generate report
-        self.generate_report(results)
+        self.generate_report(results, batch)
+        print(f"⏱️  {self.tracer.summary()}")
         
         # Determine exit code
-        failing = len([r for r in results if r.get('status') == 'FAIL'])
+        failing = batch.status_counts()['FAIL']
         if failing > 0 and SSLConfig.FAIL_ON_EXPIRY:
             print(f"❌ {failing} certificates are expiring soon")
             return 1
@@ -244,5 +643,39 @@ class SSLCheckRunner:
         return 0
 
 if __name__ == '__main__':
-    runner = SSLCheckRunner()
-    sys.exit(runner.run())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Unified SSL Certificate Checker Runner')
+    parser.add_argument('--force-refresh', action='store_true',
+                        help='Probe every host, ignoring cached results')
+    parser.add_argument('--shard', metavar='I/N',
+                        help='Only check the hosts owned by shard I of N (1-based) and write them to '
+                             'cert-results.shard-I-of-N.json for --merge')
+    parser.add_argument('--merge', nargs='+', metavar='FILE',
+                        help='Combine shard result files into one report, metrics and alert pass')
+    parser.add_argument('--changed-plan', metavar='FILE', default=SSLConfig.SSL_CHANGE_TF_PLAN,
+                        help='Terraform plan JSON (terraform show -json); deployment mode checks only its hosts')
+    parser.add_argument('--changed-manifests', nargs='+', metavar='PATH', default=SSLConfig.SSL_CHANGE_MANIFESTS,
+                        help='Rendered Kubernetes manifest files or directories to take hosts from')
+    parser.add_argument('--changed-since', metavar='REF', default=SSLConfig.SSL_CHANGE_BASE_REF,
+                        help='Git ref to diff against for changed ingress, certificate and Terraform hosts')
+    args = parser.parse_args()
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    change = {'tf_plan': args.changed_plan, 'manifests': args.changed_manifests, 'base_ref': args.changed_since}
+    fast_path = SSLConfig.PIPELINE_MODE == 'deployment' and any(change.values()) and not args.merge
+
+    runner = SSLCheckRunner(force_refresh=args.force_refresh, shard=shard, change=change)
+    with profiled(SSLConfig.SSL_PROFILE_PATH):
+        if args.merge:
+            code = runner.merge(args.merge)
+        elif fast_path:
+            code = runner.run_changed()
+        else:
+            code = runner.run()
+    runner.tracer.close()
+    sys.exit(code)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Structured timing spans and profiling
+
+Spans are written to a JSONL trace file, one object per line with the run
+id, span name, start time, duration and attributes. Runner stages are timed
+directly; per-host probe phases come from the timings the checker attaches
+to each result.
+"""
+
+import contextlib
+import cProfile
+import json
+import time
+import uuid
+from typing import List, Dict, Any, Optional
+
+HOST_PHASES = ('resolve_ms', 'connect_ms', 'handshake_ms', 'parse_ms')
+
+class Tracer:
+    """Collects stage spans for a run and streams every span to an optional JSONL file"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.stages: List[Dict[str, Any]] = []
+        # Line buffered so the dashboards scripts see stage spans written so far
+        self.file = open(path, 'w', buffering=1) if path else None
+
+    def _write(self, span: Dict[str, Any]) -> None:
+        if self.file:
+            self.file.write(json.dumps(span) + '\n')
+
+    def record(self, name: str, start: float, duration_ms: float, **attrs) -> Dict[str, Any]:
+        span = dict({'run_id': self.run_id, 'span': name, 'start': start,
+                     'duration_ms': round(duration_ms, 1)}, **attrs)
+        self.stages.append(span)
+        self._write(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block; attributes may be added to the yielded dict"""
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs['error'] = str(e) or type(e).__name__
+            raise
+        finally:
+            self.record(name, start, (time.perf_counter() - began) * 1000, **attrs)
+
+    def record_hosts(self, results: List[Dict[str, Any]]) -> None:
+        """Write one span per probed host with its resolve/connect/handshake/parse phases"""
+        for result in results:
+            if result.get('representative'):
+                continue  # copied from another host's probe
+            phases = {phase: result[phase] for phase in HOST_PHASES + ('probe_ms',)
+                      if result.get(phase) is not None}
+            if phases:
+                self._write(dict({'run_id': self.run_id, 'span': 'host', 'hostname': result['hostname'],
+                                  'status': result.get('status'), 'error': result.get('error')}, **phases))
+
+    def summary(self) -> str:
+        return ', '.join(f"{s['span']}{'/' + s['provider'] if 'provider' in s else ''} "
+                         f"{s['duration_ms'] / 1000:.1f}s" for s in self.stages)
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """Spans from a trace file; missing or partial files yield what could be read"""
+    spans = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return spans
+
+@contextlib.contextmanager
+def profiled(path: Optional[str]):
+    """Run the block under cProfile and dump pstats to path; a no-op when path is empty"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
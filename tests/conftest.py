@@ -0,0 +1,15 @@
+"""
+Put the repo and scripts/ on the import path the way the runner does
+
+Recorded API responses and the fakes that replay them live in
+tests/recorded.py.
+"""
+
+import os
+import sys
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(TESTS)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, TESTS)
@@ -0,0 +1,39 @@
+"""
+Replay helpers for API responses recorded under tests/fixtures
+
+Cloud SDKs are not needed: extractors take a client, and the tests hand
+them fakes that replay these recordings. They are the SDK models
+serialised with as_dict() (Azure) or to_dict() (GCP, Kubernetes), so
+attribute names match what the real clients return.
+"""
+
+import json
+import os
+from datetime import datetime
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+class Model:
+    """Attribute access over a recorded SDK model; unset attributes are None like in the SDKs"""
+
+    def __init__(self, data, datetimes=(), renames=None):
+        for key, value in data.items():
+            key = (renames or {}).get(key, key)
+            if key in datetimes and isinstance(value, str):
+                value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            setattr(self, key, model(value, datetimes, renames))
+
+    def __getattr__(self, name):
+        return None
+
+def model(value, datetimes=(), renames=None):
+    """Wrap recorded JSON in Model objects, turning the named fields into datetimes"""
+    if isinstance(value, dict):
+        return Model(value, datetimes, renames)
+    if isinstance(value, list):
+        return [model(item, datetimes, renames) for item in value]
+    return value
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
@@ -0,0 +1,136 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from alert_dispatcher import AlertDispatcher, AlertState
+from alerting import delivery
+from alerting.jira_alert import JiraSink
+from alerting.slack_alert import SlackSink
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Slack webhook and Jira issue API.
+
+    Answers with each status queued in server.errors first, then 429 with
+    each Retry-After queued in server.throttle.
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, body))
+            error = server.errors.pop(0) if server.errors else None
+            throttled = server.throttle.pop(0) if server.throttle and error is None else None
+            if self.path == '/rest/api/2/issue':
+                server.tickets += 1
+                reply = {'key': f"CERT-{server.tickets}"}
+            else:
+                reply = {}
+        if error is not None:
+            self.send_response(error)
+            self.end_headers()
+            return
+        if throttled is not None:
+            self.send_response(429)
+            self.send_header('Retry-After', throttled)
+            self.end_headers()
+            return
+        payload = json.dumps(reply).encode()
+        self.send_response(201 if self.path.startswith('/rest/') else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests, server.errors, server.throttle, server.tickets = [], [], [], 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def dispatcher(stub, tmp_path):
+    _, base = stub
+    sinks = [SlackSink(f"{base}/slack", max_retries=2, max_wait=1), JiraSink(base, 'dGVzdA==', 'CERT', workers=2)]
+    dispatcher = AlertDispatcher(sinks, AlertState(str(tmp_path / 'alerts.sqlite')), escalation_days=[7])
+    yield dispatcher
+    dispatcher.close()
+
+def result(hostname, status, days_left, fingerprint='aa11'):
+    return {'hostname': hostname, 'status': status, 'days_left': days_left,
+            'fingerprint': fingerprint, 'expiry_date': '2026-11-01T00:00:00'}
+
+def test_alerts_only_on_state_transitions(stub, dispatcher):
+    server, _ = stub
+
+    outcome = dispatcher.dispatch([result('a.example.com', 'FAIL', 20), result('b.example.com', 'PASS', 90)])
+    assert outcome == {'Slack': (1, 1, None), 'Jira': (1, 1, None)}
+    assert sorted(path for path, _ in server.requests) == ['/rest/api/2/issue', '/slack']
+
+    # Same state next run: nothing is sent
+    server.requests.clear()
+    assert dispatcher.dispatch([result('a.example.com', 'FAIL', 19)]) == {'Slack': (0, 0, None),
+                                                                          'Jira': (0, 0, None)}
+    assert server.requests == []
+
+    # Crossing an escalation threshold comments on the ticket raised earlier
+    dispatcher.dispatch([result('a.example.com', 'FAIL', 6)])
+    paths = {path for path, _ in server.requests}
+    assert paths == {'/slack', '/rest/api/2/issue/CERT-1/comment'}
+
+    # Renewal resolves the alert and clears its state
+    server.requests.clear()
+    dispatcher.dispatch([result('a.example.com', 'PASS', 90, fingerprint='bb22')])
+    bodies = dict(server.requests)
+    assert bodies['/slack']['text'].startswith('*SSL Certs Renewed:*')
+    assert bodies['/rest/api/2/issue/CERT-1/comment']['body'].startswith('Certificate renewed')
+    assert dispatcher.state.load('Jira') == {}
+
+def test_rate_limited_posts_wait_for_retry_after(stub, dispatcher, monkeypatch):
+    server, _ = stub
+    waits = []
+    monkeypatch.setattr(delivery.time, 'sleep', waits.append)
+    server.throttle.extend(['3', '1'])
+    # Only Slack is throttled here
+    dispatcher.sinks = dispatcher.sinks[:1]
+
+    assert dispatcher.dispatch([result('a.example.com', 'FAIL', 20)]) == {'Slack': (1, 1, None)}
+    # Retry-After is capped at the sink's max_wait
+    assert waits == [1, 1]
+    assert len(server.requests) == 3
+
+def test_a_failing_sink_does_not_record_state(stub, dispatcher):
+    server, _ = stub
+    server.throttle.extend(['0'] * 3)
+    dispatcher.sinks = dispatcher.sinks[:1]
+
+    name, (events, delivered, error) = next(iter(dispatcher.dispatch([result('a.example.com', 'FAIL', 20)]).items()))
+    assert (name, events, delivered) == ('Slack', 1, 0)
+    assert '429' in str(error)
+    assert dispatcher.state.load('Slack') == {}
+
+def test_ticket_creation_is_not_retried_after_a_gateway_error(stub, dispatcher, monkeypatch):
+    server, _ = stub
+    monkeypatch.setattr(delivery.time, 'sleep', lambda seconds: None)
+    dispatcher.sinks = dispatcher.sinks[1:]
+    # The gateway gave up, but Jira may already have created the issue
+    server.errors.append(504)
+
+    assert dispatcher.dispatch([result('a.example.com', 'FAIL', 20)]) == {'Jira': (1, 0, None)}
+    assert [path for path, _ in server.requests] == ['/rest/api/2/issue']
+
+    # Rate limited creates were never processed, so they are retried
+    server.requests.clear()
+    server.throttle.append('1')
+    assert dispatcher.dispatch([result('a.example.com', 'FAIL', 20)]) == {'Jira': (1, 1, None)}
+    assert [path for path, _ in server.requests] == ['/rest/api/2/issue'] * 2
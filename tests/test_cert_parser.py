@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timedelta
+
+from cert_parser import (ParseCache, certificate_domains, evaluate_chain, evaluate_expiry, load_certificates,
+                         not_after, parse_certificate, pem_to_der)
+
+# Generated with openssl req/x509; expected values are from `openssl x509 -noout -text`
+CERTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'certs')
+
+def der(name, index=0):
+    with open(os.path.join(CERTS, name), 'rb') as f:
+        return pem_to_der(f.read())[index]
+
+def test_rsa_certificate_with_dns_and_ip_sans():
+    cert = parse_certificate(der('rsa_dns_ip.pem'))
+
+    assert cert['subject_cn'] == cert['issuer_cn'] == 'shop.example.com'
+    assert cert['sans'] == ['shop.example.com', '*.shop.example.com', '192.0.2.10', '2001:db8::10']
+    assert (cert['key_type'], cert['key_bits']) == ('RSA', 2048)
+    assert cert['serial'] == '12697ce3a3f9e38703aac4f6d7e2626bd7d1e993'
+    assert cert['fingerprint'] == '99599f65f606a2cf8084791d6625c67cefd438a69b1aaa930179d4bf3482ee6c'
+    # UTCTime on both sides of the validity period
+    assert cert['not_before'] == datetime(2026, 10, 17, 19, 25, 17)
+    assert cert['not_after'] == datetime(2027, 11, 18, 19, 25, 17)
+    assert cert['self_issued']
+
+def test_ec_certificate_without_sans_falls_back_to_the_cn():
+    cert = parse_certificate(der('ec_p384.pem'))
+
+    assert (cert['key_type'], cert['key_bits']) == ('EC', 384)
+    assert cert['sans'] == []
+    assert [d['hostname'] for d in certificate_domains(cert, source='file')] == ['api.example.com']
+
+def test_ed25519_certificate_without_cn_and_generalized_time():
+    cert = parse_certificate(der('ed25519_no_cn_generalized.pem'))
+
+    assert cert['subject_cn'] is None
+    assert cert['sans'] == ['internal.example.com']
+    assert (cert['key_type'], cert['key_bits']) == ('Ed25519', None)
+    # Dates from 2050 on are GeneralizedTime
+    assert cert['not_before'] == datetime(2026, 10, 17, 19, 25, 17)
+    assert cert['not_after'] == datetime(2059, 8, 25, 19, 25, 17)
+    assert not_after(der('ed25519_no_cn_generalized.pem')) == cert['not_after']
+
+def test_bundle_leaf_and_issuer():
+    with open(os.path.join(CERTS, 'p256_leaf_and_ca.pem'), 'rb') as f:
+        leaf, ca = [parse_certificate(d) for d in load_certificates(f.read())]
+
+    assert (leaf['subject_cn'], leaf['issuer_cn'], leaf['self_issued']) == ('www.example.com', 'Example Test CA', False)
+    assert leaf['sans'] == ['www.example.com', 'example.com']
+    assert (leaf['key_type'], leaf['key_bits']) == ('EC', 256)
+    assert leaf['not_after'] == datetime(2027, 5, 5, 19, 25, 23)
+    assert (ca['subject_cn'], ca['self_issued'], ca['key_bits']) == ('Example Test CA', True, 3072)
+
+def test_load_certificates_accepts_single_der():
+    assert load_certificates(der('ec_p384.pem')) == [der('ec_p384.pem')]
+    assert load_certificates(b'not a certificate') == []
+
+def test_evaluate_chain_fails_a_passing_leaf_on_an_expiring_intermediate():
+    now = datetime.utcnow()
+    result = evaluate_expiry('www.example.com', now + timedelta(days=200), 30)
+    assert result['status'] == 'PASS'
+
+    evaluate_chain(result, now + timedelta(days=9, hours=1), 'Example Intermediate CA', 30)
+
+    assert (result['status'], result['fail_reason']) == ('FAIL', 'chain')
+    assert (result['chain_days_left'], result['chain_expiring']) == (9, 'Example Intermediate CA')
+    assert result['days_left'] == 199
+
+def test_evaluate_chain_leaves_a_healthy_chain_alone():
+    now = datetime.utcnow()
+    result = evaluate_chain(evaluate_expiry('www.example.com', now + timedelta(days=200), 30),
+                            now + timedelta(days=900), 'Example Test CA', 30)
+
+    assert result['status'] == 'PASS' and 'fail_reason' not in result
+
+def test_parse_cache_evicts_the_least_recently_used():
+    rsa, ec, ed = der('rsa_dns_ip.pem'), der('ec_p384.pem'), der('ed25519_no_cn_generalized.pem')
+    cache = ParseCache(maxsize=2)
+
+    first = cache.parse(rsa)
+    cache.parse(ec)
+    assert cache.parse(rsa) is first  # hit; ec is now the oldest
+    cache.parse(ed)
+
+    assert list(cache.entries) == [first['fingerprint'], parse_certificate(ed)['fingerprint']]
+    assert (cache.hits, cache.misses) == (1, 3)
+    cache.parse(ec)
+    assert cache.misses == 4
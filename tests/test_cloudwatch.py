@@ -0,0 +1,60 @@
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+from config import SSLConfig
+from dashboards import cloudwatch
+
+NAMESPACE = 'SSL/Certificates'
+RESULTS = [
+    {'hostname': 'a.example.com', 'status': 'PASS', 'days_left': 80},
+    {'hostname': 'b.example.com', 'status': 'FAIL', 'days_left': 5},
+    {'hostname': 'c.example.com', 'status': 'ERROR', 'error': 'timed out'},
+    {'hostname': 'd.example.com', 'status': 'PASS', 'days_left': 41}
+]
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    """Hand publish_metrics a stubbed client, recording the arguments it was built with"""
+    monkeypatch.setattr(SSLConfig, 'AWS_REGION', 'eu-west-1')
+    monkeypatch.setattr(cloudwatch.time, 'sleep', lambda seconds: None)
+    client = boto3.client('cloudwatch', region_name='eu-west-1',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    built = {}
+
+    def make_client(service, **kwargs):
+        built.update(kwargs)
+        return client
+    monkeypatch.setattr(cloudwatch.boto3, 'client', make_client)
+    with Stubber(client) as stubber:
+        yield stubber, built
+        stubber.assert_no_pending_responses()
+
+def datum(hostname, days_left):
+    return {'MetricName': 'DaysToExpiry', 'Dimensions': [{'Name': 'Host', 'Value': hostname}],
+            'Value': days_left, 'Unit': 'Count'}
+
+def test_publish_metrics_batches_hosts_with_days_left(stubbed):
+    stubber, built = stubbed
+    stubber.add_response('put_metric_data', {}, {
+        'Namespace': NAMESPACE,
+        'MetricData': [datum('a.example.com', 80), datum('b.example.com', 5)]})
+    stubber.add_response('put_metric_data', {}, {
+        'Namespace': NAMESPACE, 'MetricData': [datum('d.example.com', 41)]})
+
+    assert cloudwatch.publish_metrics(RESULTS, NAMESPACE, batch_size=2, workers=1) == (3, 0)
+    assert built['region_name'] == 'eu-west-1'
+
+def test_publish_metrics_retries_throttled_batches(stubbed):
+    stubber, _ = stubbed
+    stubber.add_client_error('put_metric_data', 'Throttling', http_status_code=400)
+    stubber.add_response('put_metric_data', {})
+
+    assert cloudwatch.publish_metrics(RESULTS, NAMESPACE, batch_size=20, workers=1) == (3, 0)
+
+def test_publish_metrics_counts_rejected_batches_as_failed(stubbed, capsys):
+    stubber, _ = stubbed
+    stubber.add_client_error('put_metric_data', 'AccessDenied', http_status_code=403)
+
+    assert cloudwatch.publish_metrics(RESULTS, NAMESPACE, batch_size=20, workers=1) == (0, 3)
+    assert 'Failed to publish 3 metrics' in capsys.readouterr().err
@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+from recorded import load_fixture, model
+from config import SSLConfig
+from discovery import discover_azure
+
+SUBSCRIPTION = '0b6f5c1e-0000-4000-8000-000000000001'
+DATETIMES = ('expiration_date', 'issue_date')
+
+def web_client():
+    recorded = load_fixture('azure/app_service_certificates.json')
+    return SimpleNamespace(certificates=SimpleNamespace(list=lambda: model(recorded, DATETIMES)))
+
+def network_client():
+    recorded = load_fixture('azure/application_gateways.json')
+    return SimpleNamespace(application_gateways=SimpleNamespace(list_all=lambda: model(recorded, DATETIMES)))
+
+def cdn_client():
+    recorded = load_fixture('azure/front_door.json')
+    return SimpleNamespace(
+        profiles=SimpleNamespace(list=lambda: model(recorded['profiles'], DATETIMES)),
+        secrets=SimpleNamespace(
+            list_by_profile=lambda group, name: model(recorded['secrets'].get(name, []), DATETIMES)),
+        afd_custom_domains=SimpleNamespace(
+            list_by_profile=lambda group, name: model(recorded['custom_domains'].get(name, []), DATETIMES)))
+
+def test_app_service_domains_one_record_per_host_name():
+    domains = discover_azure.app_service_domains(web_client(), SUBSCRIPTION)
+
+    assert [d['hostname'] for d in domains] == ['shop.example.com', 'www.shop.example.com']
+    assert domains[0] == {
+        'hostname': 'shop.example.com',
+        'source': 'azure',
+        'subscription': SUBSCRIPTION,
+        'surface': 'app_service',
+        'expires_at': '2026-11-02T23:59:59+00:00',
+        'certificate': 'shop-2026',
+        'thumbprint': '9F3A1C0B7E2D4A5B6C7D8E9F0A1B2C3D4E5F6A7B'
+    }
+
+def test_app_gateway_domains_only_https_listeners_without_expiry():
+    domains = discover_azure.app_gateway_domains(network_client(), SUBSCRIPTION)
+
+    assert [d['hostname'] for d in domains] == ['api.example.com', 'auth.example.com', 'legacy.example.com']
+    assert all('expires_at' not in d and d['gateway'] == 'agw-prod' for d in domains)
+
+def test_front_door_domains_take_expiry_from_the_linked_secret():
+    domains = discover_azure.front_door_domains(cdn_client(), SUBSCRIPTION)
+
+    by_host = {d['hostname']: d for d in domains}
+    assert set(by_host) == {'www.example.com', 'status.example.com'}
+    # Secret ids are matched case-insensitively; classic CDN profiles are skipped
+    assert by_host['www.example.com']['expires_at'] == '2026-12-01T08:30:00+00:00'
+    assert 'expires_at' not in by_host['status.example.com']
+    assert by_host['www.example.com']['profile'] == 'fd-prod'
+
+def test_iter_cert_domains_fans_out_and_isolates_failures(monkeypatch, capsys):
+    def broken_network_client(credential, subscription):
+        if subscription == 'sub-b':
+            raise RuntimeError('AuthorizationFailed')
+        return network_client()
+
+    monkeypatch.setattr(SSLConfig, 'AZURE_SUBSCRIPTION_IDS', ['sub-a', 'sub-b'])
+    monkeypatch.setattr(SSLConfig, 'AZURE_DISCOVERY_SURFACES', ['app_service', 'app_gateway'])
+    monkeypatch.setattr(discover_azure, 'SURFACES', {
+        'app_service': (lambda credential, subscription: web_client(), discover_azure.app_service_domains),
+        'app_gateway': (broken_network_client, discover_azure.app_gateway_domains)
+    })
+
+    domains = list(discover_azure.iter_cert_domains(credential=object()))
+
+    assert sorted((d['subscription'], d['surface']) for d in domains) == sorted(
+        [('sub-a', 'app_service')] * 2 + [('sub-b', 'app_service')] * 2 + [('sub-a', 'app_gateway')] * 3)
+    assert 'Error listing Azure app_gateway in sub-b: AuthorizationFailed' in capsys.readouterr().err
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from recorded import load_fixture, model
+from config import SSLConfig
+from discovery import discover_gcp
+
+PROJECT = 'retail-prod'
+# Compute's proto field `type` is exposed as `type_` by the Python client
+RENAMES = {'type': 'type_'}
+
+def compute_client():
+    recorded = load_fixture('gcp/ssl_certificates_aggregated.json')
+
+    def aggregated_list(project):
+        # Scopes without certificates come back as an empty list next to a warning
+        return [(scope, model({'ssl_certificates': scoped.get('ssl_certificates', [])}, renames=RENAMES))
+                for scope, scoped in recorded['items'].items()]
+    return SimpleNamespace(aggregated_list=aggregated_list)
+
+def certificate_manager_client():
+    recorded = load_fixture('gcp/certificate_manager_certificates.json')
+    calls = []
+
+    def list_certificates(parent):
+        calls.append(parent)
+        return model(recorded, datetimes=('expire_time',))
+    return SimpleNamespace(list_certificates=list_certificates, calls=calls)
+
+def test_ssl_certificate_domains_use_managed_domains_or_sans():
+    domains = discover_gcp.ssl_certificate_domains(compute_client(), PROJECT)
+
+    by_host = {d['hostname']: d for d in domains}
+    assert set(by_host) == {'shop.example.com', 'www.shop.example.com', 'checkout.example.com',
+                            'api.internal.example.com'}
+    assert by_host['shop.example.com'] == {
+        'hostname': 'shop.example.com',
+        'source': 'gcp',
+        'project': PROJECT,
+        'surface': 'compute',
+        'expires_at': '2026-12-14T03:12:45.000-08:00',
+        'certificate': 'shop-managed',
+        'scope': 'global'
+    }
+    assert by_host['api.internal.example.com']['scope'] == 'regions/europe-west1'
+    # Still provisioning: no expiry yet, so the host is probed
+    assert 'expires_at' not in by_host['checkout.example.com']
+
+def test_certificate_manager_domains_list_every_location():
+    client = certificate_manager_client()
+    domains = discover_gcp.certificate_manager_domains(client, PROJECT)
+
+    assert client.calls == [f'projects/{PROJECT}/locations/-']
+    assert [(d['hostname'], d.get('expires_at')) for d in domains] == [
+        ('*.edge.example.com', '2026-11-05T09:00:00+00:00'),
+        ('edge.example.com', '2026-11-05T09:00:00+00:00'),
+        ('media.example.com', None)
+    ]
+
+def test_iter_cert_domains_builds_one_client_per_surface(monkeypatch, capsys):
+    built = []
+
+    def make_compute(credentials):
+        built.append('compute')
+        return compute_client()
+
+    def failing_certificate_manager(credentials):
+        raise RuntimeError('API not enabled')
+
+    monkeypatch.setattr(SSLConfig, 'GCP_PROJECTS', ['proj-a', 'proj-b'])
+    monkeypatch.setattr(SSLConfig, 'GCP_DISCOVERY_SURFACES', ['compute', 'certificate_manager'])
+    monkeypatch.setattr(discover_gcp, 'SURFACES', {
+        'compute': (make_compute, discover_gcp.ssl_certificate_domains),
+        'certificate_manager': (failing_certificate_manager, discover_gcp.certificate_manager_domains)
+    })
+
+    domains = list(discover_gcp.iter_cert_domains(credentials=object()))
+
+    assert built == ['compute']
+    assert sorted({d['project'] for d in domains}) == ['proj-a', 'proj-b']
+    assert len(domains) == 8
+    assert 'Error creating GCP certificate_manager client: API not enabled' in capsys.readouterr().err
@@ -0,0 +1,152 @@
+import json
+import sys
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from recorded import load_fixture, model
+from config import SSLConfig
+from discovery import discover_k8s
+
+def networking_api():
+    """Replay a two-page ingress listing, following continue tokens like the API server"""
+    pages = model(load_fixture('k8s/ingress_pages.json'))
+    calls = []
+
+    def list_ingress_for_all_namespaces(limit, _continue=None):
+        calls.append((limit, _continue))
+        return pages[0] if _continue is None else pages[1]
+    return SimpleNamespace(list_ingress_for_all_namespaces=list_ingress_for_all_namespaces, calls=calls)
+
+class ApiException(Exception):
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+@pytest.fixture
+def recorded_watch(monkeypatch):
+    """Stand in for kubernetes.watch, replaying recorded events and then raising `error` if set"""
+    replay = SimpleNamespace(events=[], error=None, calls=[])
+
+    class Watch:
+        def stream(self, func, **kwargs):
+            replay.calls.append(kwargs)
+            for event in replay.events:
+                # Like the client, ERROR events keep the raw Status instead of a model
+                raw = event['raw_object']
+                yield {'type': event['type'], 'raw_object': raw,
+                       'object': raw if event['type'] == 'ERROR' else model(raw)}
+            if replay.error:
+                raise replay.error
+
+    modules = {name: ModuleType(name) for name in
+               ('kubernetes', 'kubernetes.watch', 'kubernetes.client', 'kubernetes.client.rest')}
+    modules['kubernetes.watch'].Watch = Watch
+    modules['kubernetes.client.rest'].ApiException = ApiException
+    modules['kubernetes'].watch = modules['kubernetes.watch']
+    modules['kubernetes'].client = modules['kubernetes.client']
+    modules['kubernetes.client'].rest = modules['kubernetes.client.rest']
+    for name, module in modules.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    return replay
+
+def ingress(namespace, name, hosts, resource_version):
+    return model({'metadata': {'namespace': namespace, 'name': name, 'resource_version': resource_version},
+                  'spec': {'tls': [{'hosts': hosts}]}})
+
+def test_relist_follows_continue_tokens():
+    api = networking_api()
+    index = discover_k8s.IngressIndex('prod-eu')
+
+    assert index.relist(api, page_size=2) == 4
+    assert [limit for limit, _ in api.calls] == [2, 2]
+    assert api.calls[1][1].startswith('eyJ2Ijoi')
+    assert index.resource_version == '48120'
+    assert [(d['hostname'], d['namespace'], d['ingress']) for d in index.domains()] == [
+        ('shop.example.com', 'shop', 'storefront'),
+        ('www.shop.example.com', 'shop', 'storefront'),
+        ('checkout.example.com', 'shop', 'checkout'),
+        ('auth.example.com', 'platform', 'auth')
+    ]
+
+def test_apply_updates_only_the_changed_ingress():
+    index = discover_k8s.IngressIndex('prod-eu')
+    index.relist(networking_api(), page_size=2)
+
+    index.apply('MODIFIED', ingress('shop', 'checkout', ['pay.example.com'], '48130'))
+    index.apply('DELETED', ingress('platform', 'auth', ['auth.example.com'], '48131'))
+    index.apply('ADDED', ingress('docs', 'site', ['docs.example.com'], '48132'))
+
+    assert index.hosts['shop/checkout'] == ['pay.example.com']
+    assert 'platform/auth' not in index.hosts
+    assert index.hosts['docs/site'] == ['docs.example.com']
+    assert index.hosts['shop/storefront'] == ['shop.example.com', 'www.shop.example.com']
+    assert index.resource_version == '48132'
+
+def test_watch_replays_changes_from_the_stored_resource_version(recorded_watch):
+    index = discover_k8s.IngressIndex('prod-eu')
+    index.relist(networking_api(), page_size=2)
+    recorded_watch.events = load_fixture('k8s/ingress_watch_events.json')['changes']
+    api = networking_api()
+
+    index.sync(api, page_size=2, watch_seconds=30)
+
+    assert recorded_watch.calls == [{'resource_version': '48120', 'timeout_seconds': 30,
+                                     'allow_watch_bookmarks': True}]
+    assert api.calls == []
+    assert index.hosts == {
+        'shop/storefront': ['shop.example.com', 'www.shop.example.com'],
+        'shop/checkout': ['pay.example.com'],
+        'internal/metrics': [],
+        'docs/site': ['docs.example.com']
+    }
+    # The trailing bookmark moves the resume point past the last change
+    assert index.resource_version == '48155'
+
+@pytest.mark.parametrize('expiry', ['error_event', 'api_exception'])
+def test_sync_relists_when_the_resource_version_expired(recorded_watch, expiry):
+    index = discover_k8s.IngressIndex('prod-eu', hosts={'gone/ingress': ['old.example.com']},
+                                      resource_version='1200')
+    if expiry == 'error_event':
+        recorded_watch.events = load_fixture('k8s/ingress_watch_events.json')['expired']
+    else:
+        recorded_watch.error = ApiException(410, 'Gone')
+    api = networking_api()
+
+    index.sync(api, page_size=2, watch_seconds=30)
+
+    assert recorded_watch.calls[0]['resource_version'] == '1200'
+    assert len(api.calls) == 2
+    assert 'gone/ingress' not in index.hosts
+    assert index.resource_version == '48120'
+
+def test_other_watch_failures_are_not_treated_as_expiry(recorded_watch):
+    index = discover_k8s.IngressIndex('prod-eu', resource_version='48120')
+    recorded_watch.error = ApiException(403, 'Forbidden')
+
+    with pytest.raises(ApiException):
+        index.sync(networking_api(), page_size=2, watch_seconds=30)
+    assert index.resource_version == '48120'
+
+def test_discover_persists_indexes_and_isolates_failing_contexts(monkeypatch, tmp_path, capsys):
+    cache = tmp_path / 'k8s-index.json'
+
+    def sync_context(context):
+        if context == 'prod-us':
+            raise RuntimeError('Unauthorized')
+        index = discover_k8s.IngressIndex(context)
+        index.relist(networking_api(), page_size=2)
+        return index
+
+    monkeypatch.setattr(SSLConfig, 'K8S_CONTEXTS', ['prod-eu', ' prod-us', ''])
+    monkeypatch.setattr(SSLConfig, 'K8S_INDEX_CACHE', str(cache))
+    monkeypatch.setattr(discover_k8s, '_indexes', {})
+    monkeypatch.setattr(discover_k8s, '_sync_context', sync_context)
+
+    domains = discover_k8s.discover_k8s_domains()
+
+    assert {d['context'] for d in domains} == {'prod-eu'}
+    assert len(domains) == 4
+    assert json.loads(cache.read_text())['prod-eu']['resource_version'] == '48120'
+    assert 'Error discovering Kubernetes domains in prod-us: Unauthorized' in capsys.readouterr().err
@@ -0,0 +1,82 @@
+import io
+import json
+
+import pytest
+
+from discovery import discover_tf
+
+STATE = {
+    'version': 4,
+    'terraform_version': '1.9.5',
+    'serial': 1207,
+    'lineage': '3f7a1c2e-9b1d-4f55-8a0e-2c5d7e9f1a3b',
+    'outputs': {
+        'note': {'value': 'braces } ] { [ and an escaped \\" quote', 'type': 'string'},
+        'endpoints': {'value': [{'host': 'ünïcödé.example.com', 'port': 8443}], 'type': ['list', 'object']}
+    },
+    'resources': [
+        {'mode': 'managed', 'type': 'aws_s3_bucket', 'name': 'logs', 'provider': 'aws',
+         'instances': [{'attributes': {'bucket': 'skipped-bucket-marker', 'policy': '{"Statement": [{}]}'}}]},
+        {'mode': 'managed', 'type': 'aws_acm_certificate', 'name': 'shop', 'provider': 'aws',
+         'instances': [{'attributes': {'domain_name': 'shop.example.com',
+                                       'subject_alternative_names': ['www.shop.example.com'],
+                                       'not_after': '2026-12-01T00:00:00Z',
+                                       'tags': {'owner': 'équipe-paiement 支付'}}}]},
+        {'mode': 'managed', 'type': 'aws_lb', 'name': 'edge', 'provider': 'aws',
+         'instances': [{'attributes': {'arn': 'arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/app/edge/1',
+                                       'dns_name': 'edge-123456.eu-west-1.elb.amazonaws.com',
+                                       'idle_timeout': 60.25}}]},
+        {'mode': 'managed', 'type': 'aws_lb_listener', 'name': 'admin', 'provider': 'aws',
+         'instances': [{'attributes': {'load_balancer_arn':
+                                       'arn:aws:elasticloadbalancing:eu-west-1:1:loadbalancer/app/edge/1',
+                                       'protocol': 'HTTPS', 'port': 8443}}]}
+    ],
+    'check_results': None
+}
+
+def encoded(state=STATE):
+    return json.dumps(state, ensure_ascii=False, indent=2).encode()
+
+def resources(data, chunk_size):
+    return list(discover_tf.iter_state_resources(io.BytesIO(data), chunk_size=chunk_size))
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 20])
+def test_chunk_boundaries_do_not_change_the_result(chunk_size):
+    # Small chunks split numbers, escapes and multibyte UTF-8 across reads,
+    # and make every value larger than a chunk
+    got = resources(encoded(), chunk_size)
+
+    assert [r['type'] for r in got] == ['aws_acm_certificate', 'aws_lb', 'aws_lb_listener']
+    assert got[0]['instances'][0]['attributes']['tags'] == {'owner': 'équipe-paiement 支付'}
+    assert got[1]['instances'][0]['attributes']['idle_timeout'] == 60.25
+    assert got[2]['instances'][0]['attributes']['port'] == 8443
+
+def test_unwanted_values_are_skipped_without_decoding(monkeypatch):
+    decoded = []
+    raw_decode = json.JSONDecoder.raw_decode
+
+    def recording(self, s, idx=0):
+        value, end = raw_decode(self, s, idx)
+        decoded.append(value)
+        return value, end
+    monkeypatch.setattr(json.JSONDecoder, 'raw_decode', recording)
+
+    got = resources(encoded(), 16)
+
+    assert len(got) == 3
+    assert not any('skipped-bucket-marker' in repr(value) or 'escaped' in repr(value) for value in decoded)
+
+def test_empty_and_missing_resources():
+    assert resources(b'{"version": 4, "resources": []}', 3) == []
+    assert resources(b'{"version": 4, "outputs": {}}', 3) == []
+    assert resources(b'{}', 3) == []
+
+def test_truncated_state_is_an_error():
+    with pytest.raises(ValueError):
+        resources(encoded()[:-40], 5)
+
+def test_extract_domains_joins_listeners_to_their_load_balancer():
+    domains = discover_tf.extract_domains(resources(encoded(), 1 << 20), 'prod/terraform.tfstate')
+
+    assert [d['hostname'] for d in domains] == [
+        'shop.example.com', 'www.shop.example.com', 'edge-123456.eu-west-1.elb.amazonaws.com:8443']
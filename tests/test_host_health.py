@@ -0,0 +1,69 @@
+import pytest
+
+from host_health import HOUR, HostHealth
+
+NOW = 1792040400.0
+
+@pytest.fixture
+def health(tmp_path):
+    health = HostHealth(str(tmp_path / 'health.sqlite'), base_timeout=10, min_timeout=1,
+                        failure_threshold=3, breaker_hours=24, max_breaker_hours=72)
+    yield health
+    health.conn.close()
+
+def ok(connect_ms, handshake_ms):
+    return {'expiry_date': '2027-01-01T00:00:00', 'connect_ms': connect_ms, 'handshake_ms': handshake_ms}
+
+def failed(error='timed out'):
+    return {'expiry_date': None, 'error': error}
+
+def test_timeouts_need_history_and_follow_rfc6298_smoothing(health):
+    health.record('a.example.com', ok(400, 800), NOW)
+    health.record('a.example.com', ok(400, 800), NOW)
+    assert health.timeouts('a.example.com') == (None, None)
+
+    health.record('a.example.com', ok(400, 800), NOW)
+    state = health.get('a.example.com')
+    # srtt stays at the constant sample while rttvar decays from sample/2
+    assert state['connect_srtt'] == 400 and state['connect_rttvar'] == pytest.approx(200 * 0.75 ** 2)
+    connect, handshake = health.timeouts('a.example.com')
+    assert connect == pytest.approx(3 * (400 + 4 * 200 * 0.75 ** 2) / 1000)
+    assert handshake == pytest.approx(3 * (800 + 4 * 400 * 0.75 ** 2) / 1000)
+
+def test_timeouts_are_clamped_to_the_configured_range(health):
+    for _ in range(3):
+        health.record('fast.example.com', ok(1, 2), NOW)
+        health.record('slow.example.com', ok(5000, 9000), NOW)
+
+    assert health.timeouts('fast.example.com') == (1, 1)
+    assert health.timeouts('slow.example.com') == (10, 10)
+
+def test_breaker_opens_after_consecutive_failures_and_backs_off(health):
+    for _ in range(2):
+        health.record('down.example.com', failed(), NOW)
+    assert not health.is_open('down.example.com') and health.allows('down.example.com', NOW)
+
+    health.record('down.example.com', failed(), NOW)
+    assert health.is_open('down.example.com')
+    assert not health.allows('down.example.com', NOW + 23 * HOUR)
+    assert health.allows('down.example.com', NOW + 24 * HOUR)
+
+    # Each further failure doubles the wait, up to max_breaker_hours
+    waits = []
+    for _ in range(3):
+        health.record('down.example.com', failed(), NOW)
+        waits.append((health.get('down.example.com')['next_probe'] - NOW) / HOUR)
+    assert waits == [48, 72, 72]
+    assert health.get('down.example.com')['last_error'] == 'timed out'
+
+def test_a_success_closes_the_breaker_and_state_persists(health, tmp_path):
+    for _ in range(4):
+        health.record('flaky.example.com', failed('connection reset'), NOW)
+    health.record('flaky.example.com', ok(30, 60), NOW)
+    health.save()
+
+    reloaded = HostHealth(str(tmp_path / 'health.sqlite'), base_timeout=10)
+    state = reloaded.get('flaky.example.com')
+    assert (state['failures'], state['next_probe'], state['last_error'], state['samples']) == (0, None, None, 1)
+    assert not reloaded.is_open('flaky.example.com')
+    reloaded.conn.close()
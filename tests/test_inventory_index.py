@@ -0,0 +1,113 @@
+import time
+
+from inventory_index import InventoryIndex, normalize_hostname, san_matches, split_target
+
+WILDCARD = 'a' * 64
+SHOP = 'b' * 64
+
+def probe(hostname, fingerprint, address='203.0.113.7', sans=()):
+    return {'hostname': hostname, 'fingerprint': fingerprint, 'addresses': [address],
+            'sans': list(sans), 'status': 'PASS', 'days_left': 80, 'checked_via': 'probe'}
+
+def indexed(tmp_path=None):
+    """An index that has seen three hosts serve one wildcard cert from one load balancer"""
+    index = InventoryIndex(str(tmp_path / 'index.json') if tmp_path else None)
+    index.record([
+        probe('a.example.com', WILDCARD, sans=['*.example.com', 'example.com']),
+        probe('b.example.com', WILDCARD, sans=['*.example.com', 'example.com']),
+        probe('c.example.com', WILDCARD, sans=['*.example.com', 'example.com']),
+        probe('shop.example.net', SHOP, sans=['shop.example.net'])
+    ])
+    return index
+
+def hosts(domains):
+    return sorted(d['hostname'] for d in domains)
+
+def test_merge_normalises_and_keeps_the_earliest_expiry():
+    merged = InventoryIndex().merge([
+        {'hostname': 'WWW.Example.com.', 'source': 'aws', 'expires_at': '2027-01-01T00:00:00+00:00'},
+        {'hostname': 'www.example.com', 'source': 'k8s', 'expires_at': '2026-12-01T00:00:00Z', 'fingerprint': 'ff'},
+        {'hostname': 'bücher.example', 'source': 'static'}
+    ])
+
+    assert hosts(merged) == ['www.example.com', 'xn--bcher-kva.example']
+    www = next(d for d in merged if d['hostname'] == 'www.example.com')
+    assert (www['expires_at'], www['fingerprint']) == ('2026-12-01T00:00:00Z', 'ff')
+    assert [s['source'] for s in www['sources']] == ['aws', 'k8s']
+
+def test_plan_probes_one_representative_per_endpoint_and_certificate():
+    index = indexed()
+    domains = [{'hostname': h} for h in ('c.example.com', 'a.example.com', 'b.example.com',
+                                         'shop.example.net', 'new.example.com')]
+
+    to_probe, members, wildcards = index.plan(domains)
+
+    assert hosts(to_probe) == ['a.example.com', 'new.example.com', 'shop.example.net']
+    assert {rep: hosts(group) for rep, group in members.items()} == {
+        'a.example.com': ['b.example.com', 'c.example.com']}
+    assert wildcards == []
+
+def test_fan_out_copies_the_representative_result_while_its_cert_is_unchanged():
+    index = indexed()
+    _, members, _ = index.plan([{'hostname': h} for h in ('a.example.com', 'b.example.com', 'c.example.com')])
+
+    fanned, stale = index.fan_out([probe('a.example.com', WILDCARD)], members)
+    assert stale == []
+    assert [(r['hostname'], r['representative'], r['checked_via']) for r in fanned] == [
+        ('b.example.com', 'a.example.com', 'representative'),
+        ('c.example.com', 'a.example.com', 'representative')]
+
+    # The representative now serves another certificate: its members are probed themselves
+    fanned, stale = index.fan_out([probe('a.example.com', 'c' * 64)], members)
+    assert fanned == [] and hosts(stale) == ['b.example.com', 'c.example.com']
+
+def test_hosts_outside_the_cert_sans_are_not_grouped():
+    index = indexed()
+    # Same endpoint and certificate, but *.example.com does not cover a second label
+    index.record([probe('deep.sub.example.com', WILDCARD, sans=['*.example.com'])])
+
+    to_probe, members, _ = index.plan([{'hostname': 'a.example.com'}, {'hostname': 'deep.sub.example.com'}])
+
+    assert hosts(to_probe) == ['a.example.com', 'deep.sub.example.com'] and members == {}
+
+def test_wildcard_names_are_covered_by_a_probed_certificate():
+    index = indexed()
+    to_probe, _, wildcards = index.plan([{'hostname': '*.example.com'}, {'hostname': '*.example.org'}])
+    assert to_probe == [] and hosts(wildcards) == ['*.example.com', '*.example.org']
+
+    covered = index.cover_wildcards(wildcards, [probe('a.example.com', WILDCARD, sans=['*.example.com'])])
+
+    by_host = {r['hostname']: r for r in covered}
+    assert by_host['*.example.com']['representative'] == 'a.example.com'
+    assert by_host['*.example.org']['status'] == 'ERROR'
+
+def test_members_are_reverified_directly_and_samples_are_never_grouped():
+    index = indexed()
+    domains = [{'hostname': 'a.example.com'}, {'hostname': 'b.example.com'},
+               {'hostname': 'c.example.com', 'verify_sample': True}]
+
+    # Longer ago than the full re-verify interval, so every member is due
+    index.served['b.example.com']['verified_at'] = time.time() - 169 * 3600
+    to_probe, members, _ = index.plan(domains)
+
+    assert hosts(to_probe) == ['a.example.com', 'b.example.com', 'c.example.com'] and members == {}
+
+def test_endpoint_keeps_the_probed_port_and_state_round_trips(tmp_path):
+    index = indexed(tmp_path)
+    index.record([probe('admin.example.com:8443', WILDCARD, sans=['*.example.com']),
+                  probe('v6.example.com', SHOP, address='2001:db8::7', sans=['v6.example.com'])])
+    index.save()
+
+    reloaded = InventoryIndex(str(tmp_path / 'index.json'))
+    assert reloaded.served['admin.example.com:8443']['endpoint'] == '203.0.113.7:8443'
+    assert reloaded.served['v6.example.com']['endpoint'] == '[2001:db8::7]:443'
+    # host:port targets are matched against SANs without the port
+    assert reloaded._covers(WILDCARD, 'admin.example.com:8443')
+
+def test_name_helpers():
+    assert san_matches('*.example.com', 'a.example.com')
+    assert not san_matches('*.example.com', 'example.com')
+    assert not san_matches('*.example.com', 'a.b.example.com')
+    assert split_target('[2001:db8::1]:8443') == ('2001:db8::1', 8443)
+    assert split_target('2001:db8::1') == ('2001:db8::1', 443)
+    assert normalize_hostname(' Example.COM. ') == 'example.com'
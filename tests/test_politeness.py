@@ -0,0 +1,81 @@
+import asyncio
+
+from politeness import EndpointScheduler
+
+async def probe_all(scheduler, keys, hold=0.01):
+    """Run one probe per key; returns the grant order and peak in-flight counts"""
+    granted = []
+    active = {}
+    peak = {'total': 0}
+
+    async def probe(key):
+        async with scheduler.slot(key):
+            granted.append((key, asyncio.get_running_loop().time()))
+            active[key] = active.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), active[key])
+            peak['total'] = max(peak['total'], sum(active.values()))
+            await asyncio.sleep(hold)
+            active[key] -= 1
+
+    await asyncio.gather(*(probe(key) for key in keys))
+    return granted, peak
+
+def test_per_endpoint_and_global_caps_hold():
+    scheduler = EndpointScheduler(concurrency=6, per_endpoint=2)
+    keys = ['lb-a'] * 20 + ['lb-b'] * 20 + ['lb-c'] * 5
+
+    granted, peak = asyncio.run(probe_all(scheduler, keys))
+
+    assert len(granted) == len(keys)
+    assert peak['lb-a'] == peak['lb-b'] == peak['lb-c'] == 2
+    assert peak['total'] == 6
+    assert scheduler.free == 6
+
+def test_waiting_endpoints_are_served_round_robin():
+    async def scenario():
+        scheduler = EndpointScheduler(concurrency=1)
+        order = []
+        # Hold the only slot while both endpoints queue up, the crowded one first
+        await scheduler.acquire('blocker')
+
+        async def probe(key):
+            async with scheduler.slot(key):
+                order.append(key)
+                await asyncio.sleep(0)
+
+        tasks = [asyncio.create_task(probe(key)) for key in ['crowded'] * 5 + ['small'] * 2]
+        await asyncio.sleep(0)
+        scheduler.release('blocker')
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ['crowded', 'small', 'crowded', 'small', 'crowded', 'crowded', 'crowded']
+
+def test_rate_limit_spaces_new_handshakes_per_endpoint():
+    scheduler = EndpointScheduler(concurrency=50, rate=20, burst=2)
+
+    granted, _ = asyncio.run(probe_all(scheduler, ['lb-a'] * 6 + ['lb-b'] * 2, hold=0))
+
+    a = [when for key, when in granted if key == 'lb-a']
+    b = [when for key, when in granted if key == 'lb-b']
+    # A burst of two goes straight in, then one handshake every 50 ms
+    assert a[1] - a[0] < 0.04
+    assert all(later - earlier > 0.04 for earlier, later in zip(a[1:], a[2:]))
+    assert a[-1] - a[0] > 0.18
+    # Another endpoint is not held back by lb-a's rate
+    assert b[-1] - a[0] < 0.04
+
+def test_cancelled_waiters_give_their_turn_away():
+    async def scenario():
+        scheduler = EndpointScheduler(concurrency=1)
+        await scheduler.acquire('lb-a')
+        waiting = asyncio.create_task(scheduler.acquire('lb-a'))
+        behind = asyncio.create_task(scheduler.acquire('lb-b'))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        scheduler.release('lb-a')
+        await asyncio.wait_for(behind, 1)
+        scheduler.release('lb-b')
+        return scheduler.free
+
+    assert asyncio.run(scenario()) == 1
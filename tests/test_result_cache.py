@@ -0,0 +1,35 @@
+from result_cache import DAY, ResultCache, endpoint_key, next_due_at
+
+WEEK = 7 * DAY
+# A Monday 05:00 UTC scheduled run
+RUN_START = 1792040400.0
+
+def probe(hostname, days_left, expiry_date='2027-06-01T00:00:00'):
+    return {'hostname': hostname, 'status': 'PASS', 'days_left': days_left,
+            'expiry_date': expiry_date, 'fingerprint': 'aa11', 'checked_via': 'probe'}
+
+def test_far_hosts_are_due_on_the_next_weekly_run(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache.sqlite'))
+    # The probes finished forty minutes into the run; scheduling counts from its start
+    cache.store([probe('far.example.com', 200)], threshold_days=30, now=RUN_START)
+
+    # Next week's run starts a couple of minutes early
+    cached, due = cache.split_due([{'hostname': 'far.example.com'}], 30, now=RUN_START + WEEK - 120)
+    assert cached == []
+    assert [d['hostname'] for d in due] == ['far.example.com']
+
+    # A run in between still reuses it
+    cached, due = cache.split_due([{'hostname': 'far.example.com'}], 30, now=RUN_START + 3 * DAY)
+    assert [r['checked_via'] for r in cached] == ['cache'] and due == []
+    cache.close()
+
+def test_next_due_at_halves_the_margin_and_probes_near_hosts_every_run():
+    assert next_due_at(None, 30, RUN_START) == RUN_START
+    assert next_due_at(35, 30, RUN_START) == RUN_START
+    assert next_due_at(40, 30, RUN_START) == RUN_START + 5 * DAY
+    assert RUN_START + WEEK - 2 * 3600 < next_due_at(400, 30, RUN_START) < RUN_START + WEEK
+
+def test_endpoint_key_keeps_explicit_ports():
+    assert endpoint_key('example.com') == 'example.com:443'
+    assert endpoint_key('example.com:8443') == 'example.com:8443'
+    assert endpoint_key('[2001:db8::1]:8443') == '[2001:db8::1]:8443'
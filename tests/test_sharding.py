@@ -0,0 +1,37 @@
+import pytest
+
+from sharding import parse_shard, shard_of, shard_results_file
+
+HOSTS = [f"host{i}.example.com" for i in range(2000)]
+
+def test_shards_partition_the_inventory():
+    owners = {host: shard_of(host, 4) for host in HOSTS}
+
+    assert set(owners.values()) == {1, 2, 3, 4}
+    # Every host has exactly one owner, and the split is roughly even
+    counts = [sum(1 for shard in owners.values() if shard == index) for index in range(1, 5)]
+    assert sum(counts) == len(HOSTS)
+    assert all(400 < count < 600 for count in counts)
+
+def test_assignment_is_stable_across_calls_and_inventory_changes():
+    before = {host: shard_of(host, 4) for host in HOSTS[:1000]}
+    # Adding hosts does not move existing ones
+    after = {host: shard_of(host, 4) for host in HOSTS}
+
+    assert all(after[host] == shard for host, shard in before.items())
+
+def test_changing_the_shard_count_moves_only_hosts_won_by_the_new_shard():
+    four = {host: shard_of(host, 4) for host in HOSTS}
+    five = {host: shard_of(host, 5) for host in HOSTS}
+
+    moved = [host for host in HOSTS if four[host] != five[host]]
+    # Rendezvous hashing: a host only moves to the shard that was added
+    assert all(five[host] == 5 for host in moved)
+    assert 0.15 < len(moved) / len(HOSTS) < 0.25
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for value in ('0/4', '5/4', '2', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+    assert shard_results_file(2, 4) == 'cert-results.shard-2-of-4.json'
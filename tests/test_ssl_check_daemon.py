@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+import ssl_check_daemon
+from config import SSLConfig
+
+@pytest.fixture
+def daemon(monkeypatch, tmp_path):
+    monkeypatch.setattr(SSLConfig, 'SSL_TRACE_PATH', str(tmp_path / 'trace.jsonl'))
+    monkeypatch.setattr(SSLConfig, 'SSL_HEALTH_PATH', '')
+    return ssl_check_daemon.SSLCheckDaemon()
+
+def test_discovery_cycles_do_not_accumulate_trace_spans(daemon, monkeypatch, tmp_path):
+    def run_discovery():
+        daemon.runner.tracer.record('discovery', time.time(), 1.0, provider='static')
+        return [{'hostname': 'a.example.com', 'source': 'static'}]
+    monkeypatch.setattr(daemon.runner, 'run_discovery', run_discovery)
+
+    for _ in range(3):
+        daemon.discover()
+
+    assert len(daemon.runner.tracer.stages) == 1
+    assert (tmp_path / 'trace.jsonl').read_text() == ''
+
+def test_sampled_hosts_are_verified_against_the_inventory(daemon, monkeypatch):
+    async def check_cert_async(host, *args):
+        return {'hostname': host, 'expiry_date': '2027-03-01T00:00:00', 'days_left': 120, 'status': 'PASS'}
+    monkeypatch.setattr(ssl_check_daemon, 'check_cert_async', check_cert_async)
+    daemon.inventory = {'a.example.com': {'hostname': 'a.example.com', 'expires_at': '2027-06-01T00:00:00Z'}}
+
+    async def probe():
+        daemon.wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(1)
+        await semaphore.acquire()
+        await daemon.probe('a.example.com', semaphore)
+    asyncio.run(probe())
+
+    result = daemon.results['a.example.com']
+    assert result['served_cert_mismatch'] is True
+    assert result['inventory_expiry_date'] == '2027-06-01T00:00:00'